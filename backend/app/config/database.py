@@ -1,34 +1,83 @@
 import os
+from dataclasses import dataclass
+from typing import Optional
 from motor.motor_asyncio import AsyncIOMotorClient
 from pymongo.errors import ConnectionFailure
+from app.database.monitoring import command_metrics, pool_metrics
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@dataclass(frozen=True)
+class MongoSettings:
+    """MongoDB connection and pool configuration"""
+    uri: str = "mongodb://localhost:27017"
+    database_name: str = "sih_mcb_testing"
+    max_pool_size: int = 100
+    min_pool_size: int = 0
+    wait_queue_timeout_ms: Optional[int] = None
+    server_selection_timeout_ms: int = 30000
+
+    @classmethod
+    def from_env(cls) -> "MongoSettings":
+        wait_queue_timeout_ms = os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS")
+        return cls(
+            uri=os.getenv("MONGODB_URI", cls.uri),
+            database_name=os.getenv("MONGODB_DB_NAME", cls.database_name),
+            max_pool_size=int(os.getenv("MONGODB_MAX_POOL_SIZE", cls.max_pool_size)),
+            min_pool_size=int(os.getenv("MONGODB_MIN_POOL_SIZE", cls.min_pool_size)),
+            wait_queue_timeout_ms=int(wait_queue_timeout_ms) if wait_queue_timeout_ms else None,
+            server_selection_timeout_ms=int(
+                os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", cls.server_selection_timeout_ms)
+            ),
+        )
+
+    def client_options(self) -> dict:
+        """Keyword arguments for AsyncIOMotorClient"""
+        return {
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "event_listeners": [command_metrics, pool_metrics],
+        }
+
+    def describe(self) -> dict:
+        """Pool settings without the URI, which may contain credentials"""
+        return {
+            "database_name": self.database_name,
+            "max_pool_size": self.max_pool_size,
+            "min_pool_size": self.min_pool_size,
+            "wait_queue_timeout_ms": self.wait_queue_timeout_ms,
+            "server_selection_timeout_ms": self.server_selection_timeout_ms,
+        }
+
 class Database:
     client: AsyncIOMotorClient = None
     database = None
+    settings: MongoSettings = None
 
 db = Database()
 
 async def get_database():
     return db.database
 
-async def connect_to_mongo():
+async def connect_to_mongo(settings: Optional[MongoSettings] = None):
     """Create database connection"""
     try:
-        mongodb_uri = os.getenv("MONGODB_URI", "mongodb://localhost:27017")
-        db.client = AsyncIOMotorClient(mongodb_uri)
+        db.settings = settings or MongoSettings.from_env()
+        db.client = AsyncIOMotorClient(db.settings.uri, **db.settings.client_options())
         
         # Test the connection
         await db.client.admin.command('ping')
-        logger.info("Successfully connected to MongoDB")
+        logger.info(
+            f"Successfully connected to MongoDB "
+            f"(pool {db.settings.min_pool_size}-{db.settings.max_pool_size})"
+        )
         
-        # Get database name from URI or use default
-        db_name = "sih_mcb_testing"
-        db.database = db.client[db_name]
+        db.database = db.client[db.settings.database_name]
         
         return db.database
         
@@ -47,3 +96,11 @@ async def close_mongo_connection():
             logger.info("Disconnected from MongoDB")
     except Exception as e:
         logger.error(f"Error closing MongoDB connection: {e}")
+
+def get_database_metrics() -> dict:
+    """Pool settings, pool gauges and per-command latency histograms"""
+    return {
+        "settings": db.settings.describe() if db.settings else None,
+        "pool": pool_metrics.snapshot(),
+        **command_metrics.snapshot(),
+    }
@@ -0,0 +1,274 @@
+import asyncio
+import bisect
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError
+
+from app.database.monitoring import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+GROUP_COMMIT_MAX_BATCH = int(os.getenv("GROUP_COMMIT_MAX_BATCH", 500))
+GROUP_COMMIT_MAX_DELAY_MS = float(os.getenv("GROUP_COMMIT_MAX_DELAY_MS", 5))
+GROUP_COMMIT_MAX_UNACKED = int(os.getenv("GROUP_COMMIT_MAX_UNACKED", 2000))
+
+# Upper bounds of the batch size histogram buckets; the last bucket is open
+BATCH_SIZE_BUCKETS: List[int] = [1, 2, 5, 10, 20, 50, 100, 200, 500]
+
+
+class WriterClosed(RuntimeError):
+    """Raised for writes submitted after the writer has stopped"""
+
+
+class PendingWrite:
+    __slots__ = ("operation", "future", "queued_at", "replayable")
+
+    def __init__(self, operation: Any, future: asyncio.Future, replayable: bool = False):
+        self.operation = operation
+        self.future = future
+        self.queued_at = time.perf_counter()
+        self.replayable = replayable
+
+
+class GroupCommitWriter:
+    """Coalesces single-document writes from many coroutines into bulk_write calls
+
+    Each collection has its own queue. A queue is flushed as one unordered
+    bulk_write when it reaches max_batch operations, or max_delay_ms after
+    its oldest operation was queued, whichever comes first. Every write
+    gets its own future, resolved when its batch is acknowledged or failed
+    with that operation's own write error, so callers keep per-document
+    acknowledgement. stop() flushes everything still queued.
+
+    With a running spool attached, inserts in a batch MongoDB cannot take
+    (connection failure, or no acknowledgement within the spool's
+    divert_after) are acknowledged once they are on local disk instead, and
+    later batches go straight to the spool until its replay catches up.
+    Updates are spooled too when submitted as replayable, i.e. safe to
+    apply twice.
+    """
+
+    def __init__(self, max_batch: int = GROUP_COMMIT_MAX_BATCH, max_delay_ms: float = GROUP_COMMIT_MAX_DELAY_MS):
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.spool = None
+        self._database = None
+        self._queues: Dict[str, Deque[PendingWrite]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+        self._closed = False
+        self.batches = 0
+        self.operations = 0
+        self.failed = 0
+        self.spooled = 0
+        self.batch_sizes = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+        self.max_batch_seen = 0
+        self.flush_latency = LatencyHistogram()
+        self.commit_latency = LatencyHistogram()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, database, spool=None):
+        self._database = database
+        self.spool = spool
+        self._closed = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    def submit(self, collection_name: str, operation: Any, replayable: bool = False) -> asyncio.Future:
+        """Queue one write (an InsertOne, ReplaceOne, UpdateOne, ...) and return its future
+
+        replayable marks an idempotent UpdateOne that may be spooled during an outage.
+        """
+        if self._closed or not self.running:
+            raise WriterClosed("Group commit writer is not running")
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues.get(collection_name)
+        if queue is None:
+            queue = self._queues[collection_name] = deque()
+        queue.append(PendingWrite(operation, future, replayable))
+        if len(queue) == 1 or len(queue) >= self.max_batch:
+            self._wakeup.set()
+        return future
+
+    async def insert(self, collection_name: str, document: dict) -> Any:
+        """Insert one document through the next batch; returns its _id once acknowledged"""
+        await self.submit(collection_name, InsertOne(document))
+        return document["_id"]
+
+    async def insert_many(self, collection_name: str, documents: List[dict]) -> List[Any]:
+        futures = [self.submit(collection_name, InsertOne(document)) for document in documents]
+        await asyncio.gather(*futures)
+        return [document["_id"] for document in documents]
+
+    def _next_deadline(self) -> Optional[float]:
+        oldest = [queue[0].queued_at for queue in self._queues.values() if queue]
+        return min(oldest) + self.max_delay if oldest else None
+
+    def _take_due(self, force: bool = False) -> List[Tuple[str, List[PendingWrite]]]:
+        now = time.perf_counter()
+        due = []
+        for name, queue in self._queues.items():
+            while queue and (force or len(queue) >= self.max_batch or now - queue[0].queued_at >= self.max_delay):
+                batch = [queue.popleft() for _ in range(min(self.max_batch, len(queue)))]
+                due.append((name, batch))
+        return due
+
+    async def _flush_loop(self):
+        while True:
+            deadline = self._next_deadline()
+            timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            for name, batch in self._take_due():
+                self._spawn(name, batch)
+
+    def _spawn(self, collection_name: str, batch: List[PendingWrite]):
+        # Batches commit concurrently so one slow collection does not hold back the others
+        task = asyncio.create_task(self._commit(collection_name, batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _commit(self, collection_name: str, batch: List[PendingWrite]):
+        started = time.perf_counter()
+        failures: Dict[int, Exception] = {}
+        spool = self.spool if self.spool is not None and self.spool.running else None
+        if spool is not None and spool.degraded:
+            failures = await self._divert(collection_name, batch, spool)
+        else:
+            try:
+                write = self._database[collection_name].bulk_write([item.operation for item in batch], ordered=False)
+                if spool is not None:
+                    await asyncio.wait_for(write, spool.divert_after)
+                else:
+                    await write
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    failures[error["index"]] = BulkWriteError({"writeErrors": [error], "nInserted": 0})
+            except (ConnectionFailure, asyncio.TimeoutError) as e:
+                if spool is None:
+                    failures = {index: e for index in range(len(batch))}
+                else:
+                    spool.mark_degraded(e)
+                    failures = await self._divert(collection_name, batch, spool)
+            except PyMongoError as e:
+                failures = {index: e for index in range(len(batch))}
+        finished = time.perf_counter()
+
+        self.batches += 1
+        self.operations += len(batch)
+        self.failed += len(failures)
+        self.batch_sizes[bisect.bisect_left(BATCH_SIZE_BUCKETS, len(batch))] += 1
+        self.max_batch_seen = max(self.max_batch_seen, len(batch))
+        self.commit_latency.observe((finished - started) * 1000)
+        for index, item in enumerate(batch):
+            self.flush_latency.observe((finished - item.queued_at) * 1000)
+            if item.future.done():
+                continue
+            if index in failures:
+                item.future.set_exception(failures[index])
+            else:
+                item.future.set_result(None)
+        if failures and len(failures) == len(batch):
+            logger.error(f"Group commit of {len(batch)} writes to '{collection_name}' failed: {failures[0]}")
+
+    async def _divert(self, collection_name: str, batch: List[PendingWrite], spool) -> Dict[int, Exception]:
+        """Spool a batch's inserts and replayable updates; other operations cannot be replayed safely and fail"""
+        failures: Dict[int, Exception] = {}
+        writes = []
+        for index, item in enumerate(batch):
+            if isinstance(item.operation, InsertOne) or (item.replayable and isinstance(item.operation, UpdateOne)):
+                writes.append((collection_name, item.operation))
+            else:
+                failures[index] = ConnectionFailure("MongoDB unavailable and this write cannot be spooled")
+        try:
+            await spool.append(writes)
+        except OSError as e:
+            return {index: e for index in range(len(batch))}
+        self.spooled += len(writes)
+        return failures
+
+    async def flush(self):
+        """Commit everything queued so far and wait for it"""
+        for name, batch in self._take_due(force=True):
+            self._spawn(name, batch)
+        if self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+
+    async def stop(self):
+        """Refuse new writes, then flush and wait for every queued one"""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    def snapshot(self) -> dict:
+        labels = [f"le_{bound}" for bound in BATCH_SIZE_BUCKETS] + ["inf"]
+        return {
+            "running": self.running,
+            "max_batch": self.max_batch,
+            "max_delay_ms": self.max_delay * 1000,
+            "queued": {name: len(queue) for name, queue in self._queues.items() if queue},
+            "inflight_batches": len(self._inflight),
+            "batches": self.batches,
+            "operations": self.operations,
+            "failed": self.failed,
+            "spooled": self.spooled,
+            "batch_size": {
+                "avg": round(self.operations / self.batches, 1) if self.batches else 0.0,
+                "max": self.max_batch_seen,
+                "buckets": dict(zip(labels, self.batch_sizes)),
+            },
+            "flush_latency_ms": self.flush_latency.to_dict(),
+            "commit_latency_ms": self.commit_latency.to_dict(),
+        }
+
+
+class Acknowledgements:
+    """Futures of one producer's writes, checked as it goes and awaited at the end
+
+    The producer keeps streaming while its writes are in flight. Once
+    max_unacked are outstanding it waits for the oldest, which bounds
+    memory when the database falls behind. A failed write is raised at the
+    next add() or wait().
+    """
+
+    def __init__(self, max_unacked: int = GROUP_COMMIT_MAX_UNACKED):
+        self.max_unacked = max_unacked
+        self.pending: Deque[asyncio.Future] = deque()
+
+    async def add(self, futures: List[asyncio.Future]):
+        self.pending.extend(futures)
+        while self.pending and self.pending[0].done():
+            self.pending.popleft().result()
+        while len(self.pending) > self.max_unacked:
+            await self.pending.popleft()
+
+    async def wait(self):
+        while self.pending:
+            await self.pending.popleft()
+
+    def discard(self):
+        """Stop tracking writes of an abandoned stream, without leaving their errors unretrieved"""
+        while self.pending:
+            self.pending.popleft().add_done_callback(lambda future: future.cancelled() or future.exception())
+
+
+group_commit = GroupCommitWriter()
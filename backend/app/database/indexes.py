@@ -0,0 +1,108 @@
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Declarative index registry: collection name -> indexes that must exist.
+# Index names are fixed so create_indexes is idempotent across restarts.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("username", ASCENDING)], name="username_unique", unique=True),
+    ],
+    "settings": [
+        IndexModel([("mcbModel", ASCENDING)], name="mcbModel"),
+        IndexModel([("testDesignation", ASCENDING)], name="testDesignation"),
+        IndexModel([("prospectiveCurrent_A", ASCENDING)], name="prospectiveCurrent_A"),
+    ],
+    "test_results": [
+        IndexModel([("setting_id", ASCENDING), ("_id", DESCENDING)], name="setting_id"),
+        IndexModel([("setting_id", ASCENDING), ("analyzed_at", ASCENDING)], name="setting_id_analyzed_at"),
+        IndexModel([("analyzed_at", ASCENDING)], name="analyzed_at"),
+    ],
+    "test_runs": [
+        IndexModel([("setting_id", ASCENDING), ("started_at", DESCENDING)], name="setting_id_started_at"),
+        IndexModel([("status", ASCENDING)], name="status"),
+    ],
+    "measurement_chunks": [
+        IndexModel([("run_id", ASCENDING), ("bucket_start", ASCENDING)], name="run_id_bucket_start", unique=True),
+    ],
+    "revoked_tokens": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+        IndexModel([("revoked_at", ASCENDING)], name="revoked_at"),
+    ],
+}
+
+# Query shapes the application issues, checked with explain() so a missing
+# index shows up as a COLLSCAN instead of as slow logins in production
+QUERY_SHAPES: List[dict] = [
+    {"collection": "users", "filter": {"username": "operator"}},
+    {"collection": "settings", "filter": {"mcbModel": "16A, Type C"}},
+    {"collection": "settings", "filter": {"testDesignation": "Ics (Service Capacity)"}},
+    {"collection": "settings", "filter": {"prospectiveCurrent_A": {"$gte": 6000}}},
+    {"collection": "test_results", "filter": {"setting_id": "TC_ICS_6000A_16A_C"}},
+    {"collection": "test_results", "filter": {
+        "setting_id": "TC_ICS_6000A_16A_C",
+        "analyzed_at": {"$gte": datetime(2025, 1, 1)},
+    }},
+    {"collection": "test_results", "filter": {"analyzed_at": {"$gte": datetime(2025, 1, 1)}}},
+    {"collection": "test_runs", "filter": {"setting_id": "TC_ICS_6000A_16A_C"}},
+    {"collection": "test_runs", "filter": {"status": "ingesting"}},
+    {"collection": "measurement_chunks", "filter": {"run_id": "run-1", "bucket_start": {"$gte": 0}}},
+    {"collection": "revoked_tokens", "filter": {
+        "expires_at": {"$gt": datetime(2025, 1, 1)},
+        "revoked_at": {"$gte": datetime(2025, 1, 1)},
+    }},
+]
+
+
+async def ensure_indexes(database) -> Dict[str, List[str]]:
+    """Create every registered index that does not exist yet
+
+    Returns the index names per collection. A failing collection is logged
+    and skipped so one bad index (e.g. duplicate usernames) does not stop startup.
+    """
+    created = {}
+    for collection_name, indexes in INDEXES.items():
+        try:
+            created[collection_name] = await database[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            logger.error(f"Failed to create indexes on '{collection_name}': {e}")
+    logger.info(f"Ensured indexes on {len(created)} collections")
+    return created
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    """All stage names in a (possibly nested) explain plan"""
+    # MongoDB 7+ nests the stage tree under "queryPlan" for SBE plans
+    if "queryPlan" in plan:
+        plan = plan["queryPlan"]
+    stages = [plan["stage"]] if "stage" in plan else []
+    if "inputStage" in plan:
+        stages += _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+async def explain_query_shapes(database) -> List[dict]:
+    """Run explain() on every known query shape and report its plan stages"""
+    report = []
+    for shape in QUERY_SHAPES:
+        explain = await database.command(
+            {
+                "explain": {"find": shape["collection"], "filter": shape["filter"]},
+                "verbosity": "queryPlanner",
+            }
+        )
+        stages = _plan_stages(explain["queryPlanner"]["winningPlan"])
+        report.append({
+            "collection": shape["collection"],
+            "filter": shape["filter"],
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
@@ -0,0 +1,162 @@
+import bisect
+import threading
+import time
+from typing import Dict, List
+
+from pymongo import monitoring
+
+# Upper bounds (ms) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS_MS: List[float] = [0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with count, sum and max"""
+
+    def __init__(self, buckets: List[float] = LATENCY_BUCKETS_MS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, value_ms: float):
+        self.counts[bisect.bisect_left(self.buckets, value_ms)] += 1
+        self.count += 1
+        self.total_ms += value_ms
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def percentile(self, fraction: float) -> float:
+        """Upper bucket bound containing the given fraction of observations"""
+        if not self.count:
+            return 0.0
+        target = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        labels = [f"le_{bound}" for bound in self.buckets] + ["inf"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Per-command latency histograms fed by driver command events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.failures: Dict[str, int] = {}
+
+    def _observe(self, command_name: str, duration_micros: int):
+        with self._lock:
+            histogram = self.histograms.get(command_name)
+            if histogram is None:
+                histogram = self.histograms[command_name] = LatencyHistogram()
+            histogram.observe(duration_micros / 1000)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._observe(event.command_name, event.duration_micros)
+
+    def failed(self, event):
+        self._observe(event.command_name, event.duration_micros)
+        with self._lock:
+            self.failures[event.command_name] = self.failures.get(event.command_name, 0) + 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "commands": {name: h.to_dict() for name, h in sorted(self.histograms.items())},
+                "failures": dict(self.failures),
+            }
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool gauges and checkout wait times fed by pool events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checkout_wait = LatencyHistogram()
+        self.open_connections = 0
+        self.in_use = 0
+        self.max_in_use = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def _checkout_finished(self) -> float:
+        started = getattr(self._local, "checkout_started", None)
+        self._local.checkout_started = None
+        return (time.perf_counter() - started) * 1000 if started is not None else 0.0
+
+    # Checkout start and finish are emitted on the same driver thread
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        wait_ms = self._checkout_finished()
+        with self._lock:
+            self.checkout_wait.observe(wait_ms)
+            self.in_use += 1
+            self.max_in_use = max(self.max_in_use, self.in_use)
+
+    def connection_check_out_failed(self, event):
+        wait_ms = self._checkout_finished()
+        with self._lock:
+            self.checkout_wait.observe(wait_ms)
+            self.checkout_failures += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections -= 1
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "open_connections": self.open_connections,
+                "in_use": self.in_use,
+                "max_in_use": self.max_in_use,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+                "checkout_wait": self.checkout_wait.to_dict(),
+            }
+
+
+command_metrics = CommandMetrics()
+pool_metrics = PoolMetrics()
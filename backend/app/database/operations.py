@@ -0,0 +1,332 @@
+import asyncio
+import time
+from datetime import datetime
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import InsertOne, ReplaceOne, ReturnDocument, UpdateOne
+
+from app.database.monitoring import LatencyHistogram
+from app.utils.principal_cache import principal_cache
+
+# Largest id list sent in a single $in query
+IN_BATCH_SIZE = 500
+
+# Field projections. Anything that does not need the password hash must not fetch it.
+USER_PUBLIC_FIELDS = {"username": 1, "email": 1, "role": 1, "is_active": 1, "created_at": 1, "updated_at": 1}
+USER_AUTH_FIELDS = {"username": 1, "email": 1, "role": 1, "is_active": 1, "hashed_password": 1}
+USER_ROLE_FIELDS = {"username": 1, "role": 1, "is_active": 1}
+SETTING_CATALOG_FIELDS = {"_contentHash": 0}
+SETTING_SUMMARY_FIELDS = {"mcbModel": 1, "testDesignation": 1, "prospectiveCurrent_A": 1, "operatingDuty": 1}
+
+# Per repository method latency, e.g. "users.get_by_username"
+operation_metrics: Dict[str, LatencyHistogram] = {}
+
+
+def timed(operation: str):
+    """Record the latency of a repository coroutine under 'collection.operation'"""
+    def decorator(fn):
+        @wraps(fn)
+        async def wrapper(self, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(self, *args, **kwargs)
+            finally:
+                key = f"{self.collection_name}.{operation}"
+                histogram = operation_metrics.get(key)
+                if histogram is None:
+                    histogram = operation_metrics[key] = LatencyHistogram()
+                histogram.observe((time.perf_counter() - started) * 1000)
+        return wrapper
+    return decorator
+
+
+def get_operation_metrics() -> dict:
+    return {key: histogram.to_dict() for key, histogram in sorted(operation_metrics.items())}
+
+
+def chunked(values: List[Any], size: int = IN_BATCH_SIZE) -> Iterable[List[Any]]:
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class BatchLoader:
+    """DataLoader-style coalescer for lookups by key.
+
+    Every load() issued during the same event loop iteration is collected
+    and resolved with one batch_fn call. Concurrent loads of the same key
+    share a single future, so identical lookups cost one query.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[Any]], Awaitable[Dict[Any, dict]]]):
+        self.batch_fn = batch_fn
+        self._pending: Dict[Any, asyncio.Future] = {}
+        self.batches = 0
+        self.loads = 0
+
+    def load(self, key: Any) -> "asyncio.Future":
+        self.loads += 1
+        future = self._pending.get(key)
+        if future is not None:
+            return future
+
+        loop = asyncio.get_running_loop()
+        if not self._pending:
+            loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+        future = self._pending[key] = loop.create_future()
+        return future
+
+    async def load_many(self, keys: List[Any]) -> List[Optional[dict]]:
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    async def _dispatch(self):
+        pending, self._pending = self._pending, {}
+        self.batches += 1
+        try:
+            found = await self.batch_fn(list(pending))
+        except Exception as e:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key, future in pending.items():
+            if not future.done():
+                future.set_result(found.get(key))
+
+
+class Repository:
+    """Base async repository bound to one collection of a Motor database"""
+
+    collection_name: str = ""
+    _instances: Dict[tuple, "Repository"] = {}
+
+    def __init__(self, database):
+        self.database = database
+        self.collection = database[self.collection_name]
+
+    @classmethod
+    def for_database(cls, database) -> "Repository":
+        """Shared instance per database so batch loaders see all concurrent callers"""
+        key = (cls, id(database))
+        instance = Repository._instances.get(key)
+        if instance is None or instance.database is not database:
+            instance = Repository._instances[key] = cls(database)
+        return instance
+
+    @timed("get_by_id")
+    async def get_by_id(self, document_id: Any, projection: Optional[dict] = None) -> Optional[dict]:
+        return await self.collection.find_one({"_id": document_id}, projection)
+
+    @timed("get_many_by_ids")
+    async def get_many_by_ids(self, document_ids: List[Any], projection: Optional[dict] = None) -> Dict[Any, dict]:
+        """Documents by id, fetched with one $in query per IN_BATCH_SIZE ids"""
+        found = {}
+        unique_ids = list(dict.fromkeys(document_ids))
+        for batch in chunked(unique_ids):
+            async for document in self.collection.find({"_id": {"$in": batch}}, projection):
+                found[document["_id"]] = document
+        return found
+
+    @timed("insert")
+    async def insert(self, document: dict) -> Any:
+        result = await self.collection.insert_one(document)
+        return result.inserted_id
+
+    @timed("insert_many")
+    async def insert_many(self, documents: List[dict]) -> List[Any]:
+        if not documents:
+            return []
+        result = await self.collection.insert_many(documents, ordered=False)
+        return result.inserted_ids
+
+    @timed("bulk_write")
+    async def bulk_write(self, requests: List[Any], ordered: bool = False):
+        if not requests:
+            return None
+        return await self.collection.bulk_write(requests, ordered=ordered)
+
+
+def _to_object_id(value: Any) -> Any:
+    if isinstance(value, str):
+        try:
+            return ObjectId(value)
+        except InvalidId:
+            return value
+    return value
+
+
+class UserRepository(Repository):
+    collection_name = "users"
+
+    def __init__(self, database):
+        super().__init__(database)
+        self._username_loader = BatchLoader(self._load_by_usernames)
+
+    async def _load_by_usernames(self, usernames: List[str]) -> Dict[str, dict]:
+        found = {}
+        for batch in chunked(usernames):
+            async for user in self.collection.find({"username": {"$in": batch}}, USER_PUBLIC_FIELDS):
+                found[user["username"]] = user
+        return found
+
+    @timed("get_by_username")
+    async def get_by_username(self, username: str, projection: Optional[dict] = USER_PUBLIC_FIELDS) -> Optional[dict]:
+        return await self.collection.find_one({"username": username}, projection)
+
+    @timed("load_by_username")
+    async def load_by_username(self, username: str) -> Optional[dict]:
+        """Public user fields, coalesced with concurrent lookups of other users"""
+        user = await self._username_loader.load(username)
+        return dict(user) if user is not None else None
+
+    async def get_for_auth(self, username: str) -> Optional[dict]:
+        """The only lookup that fetches the password hash"""
+        return await self.get_by_username(username, USER_AUTH_FIELDS)
+
+    async def get_role(self, username: str) -> Optional[dict]:
+        return await self.get_by_username(username, USER_ROLE_FIELDS)
+
+    async def get_many(self, user_ids: List[Any]) -> Dict[Any, dict]:
+        return await self.get_many_by_ids([_to_object_id(i) for i in user_ids], USER_PUBLIC_FIELDS)
+
+    @timed("update")
+    async def update(self, username: str, fields: dict) -> bool:
+        """Update a user and drop their cached principals"""
+        fields = {**fields, "updated_at": datetime.utcnow()}
+        result = await self.collection.update_one({"username": username}, {"$set": fields})
+        principal_cache.invalidate_user(username)
+        return result.matched_count > 0
+
+    async def set_active(self, username: str, is_active: bool) -> bool:
+        return await self.update(username, {"is_active": is_active})
+
+    @timed("bulk_set_active")
+    async def bulk_set_active(self, usernames: List[str], is_active: bool) -> int:
+        now = datetime.utcnow()
+        result = await self.bulk_write([
+            UpdateOne({"username": username}, {"$set": {"is_active": is_active, "updated_at": now}})
+            for username in usernames
+        ])
+        for username in usernames:
+            principal_cache.invalidate_user(username)
+        return result.modified_count if result else 0
+
+
+class SettingsRepository(Repository):
+    collection_name = "settings"
+
+    def __init__(self, database):
+        super().__init__(database)
+        self._id_loader = BatchLoader(lambda ids: self.get_many_by_ids(ids, SETTING_CATALOG_FIELDS))
+
+    async def load(self, setting_id: str) -> Optional[dict]:
+        """Setting by id, coalesced with concurrent lookups"""
+        return await self._id_loader.load(setting_id)
+
+    @timed("find")
+    async def find(self, filters: Optional[dict] = None, projection: Optional[dict] = None) -> List[dict]:
+        return await self.collection.find(filters or {}, projection).to_list(length=None)
+
+    async def list_summaries(self) -> List[dict]:
+        return await self.find({}, SETTING_SUMMARY_FIELDS)
+
+    async def bulk_upsert(self, settings: List[dict]):
+        return await self.bulk_write([
+            ReplaceOne({"_id": setting["_id"]}, setting, upsert=True) for setting in settings
+        ])
+
+
+class TestResultRepository(Repository):
+    collection_name = "test_results"
+
+    @timed("find_by_setting")
+    async def find_by_setting(self, setting_id: str, projection: Optional[dict] = None, limit: int = 0) -> List[dict]:
+        cursor = self.collection.find({"setting_id": setting_id}, projection).sort("_id", -1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return await cursor.to_list(length=None)
+
+    async def bulk_insert(self, results: List[dict]):
+        return await self.bulk_write([InsertOne(result) for result in results])
+
+    @timed("record_for_run")
+    async def record_for_run(self, run_id: str, result: dict) -> Optional[dict]:
+        """Store a run's result (one per run); returns the "passed" field it replaced, if any"""
+        return await self.collection.find_one_and_replace(
+            {"_id": run_id}, {**result, "_id": run_id},
+            projection={"passed": 1}, upsert=True, return_document=ReturnDocument.BEFORE,
+        )
+
+    @timed("tally")
+    async def tally(self) -> dict:
+        """Executed and passed counts over every stored result"""
+        cursor = self.collection.aggregate([
+            {"$group": {"_id": None, "executed": {"$sum": 1}, "passed": {"$sum": {"$cond": ["$passed", 1, 0]}}}}
+        ])
+        totals = await cursor.to_list(length=1)
+        return totals[0] if totals else {"executed": 0, "passed": 0}
+
+    @timed("count_matching")
+    async def count_matching(self, query: dict) -> int:
+        return await self.collection.count_documents(query)
+
+    def iter_analyzed(self, query: dict, batch_size: int = 500):
+        """Cursor over matching results in analysis order, read batch_size at a time"""
+        return self.collection.find(query).sort([("analyzed_at", 1), ("_id", 1)]).batch_size(batch_size)
+
+    @timed("fingerprint")
+    async def fingerprint(self, query: dict) -> dict:
+        """Count and latest analyzed_at of matching results; changes whenever one is added or replaced"""
+        cursor = self.collection.aggregate([
+            {"$match": query},
+            {"$group": {"_id": None, "count": {"$sum": 1}, "latest": {"$max": "$analyzed_at"}}},
+        ])
+        found = await cursor.to_list(length=1)
+        return {"count": found[0]["count"], "latest": found[0]["latest"]} if found else {"count": 0, "latest": None}
+
+
+class RunRepository(Repository):
+    collection_name = "test_runs"
+
+    @timed("set_status")
+    async def set_status(self, run_id: str, status: str):
+        await self.collection.update_one(
+            {"_id": run_id}, {"$set": {"status": status, "updated_at": datetime.utcnow()}}
+        )
+
+    @timed("claim_for_ingest")
+    async def claim_for_ingest(self, run_id: str) -> bool:
+        """Move an open run to "ingesting"; False if it is not open, so each run is ingested once"""
+        result = await self.collection.update_one(
+            {"_id": run_id, "status": "open"},
+            {"$set": {"status": "ingesting", "updated_at": datetime.utcnow()}},
+        )
+        return result.matched_count > 0
+
+    @timed("count_by_status")
+    async def count_by_status(self, status: str) -> int:
+        return await self.collection.count_documents({"status": status})
+
+    @staticmethod
+    def ingest_update(run_id: str, samples: int, status: str, archive: Optional[dict] = None) -> UpdateOne:
+        """How an ingest ended, as a plain $set: a run is ingested once, so applying it twice is harmless"""
+        fields = {"status": status, "samples_ingested": samples, "updated_at": datetime.utcnow()}
+        if archive is not None:
+            fields["archive"] = archive
+        return UpdateOne({"_id": run_id}, {"$set": fields})
+
+    @timed("record_ingest")
+    async def record_ingest(self, run_id: str, samples: int, status: str, archive: Optional[dict] = None):
+        """Record ingested samples; archive is the waveform archive index the samples were written to"""
+        await self.collection.bulk_write([self.ingest_update(run_id, samples, status, archive)])
+
+
+class MeasurementChunkRepository(Repository):
+    collection_name = "measurement_chunks"
+
+    @timed("find_by_run")
+    async def find_by_run(self, run_id: str, projection: Optional[dict] = None) -> List[dict]:
+        cursor = self.collection.find({"run_id": run_id}, projection).sort("bucket_start", 1)
+        return await cursor.to_list(length=None)
@@ -0,0 +1,155 @@
+import hashlib
+import json
+import time
+from typing import IO, Dict, Iterator, List, Optional
+
+from pymongo import DeleteOne, ReplaceOne
+
+CONTENT_HASH_FIELD = "_contentHash"
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(file: IO[str], chunk_size: int = READ_CHUNK_SIZE) -> Iterator[dict]:
+    """Yield the elements of a top-level JSON array without loading the whole file"""
+    decoder = json.JSONDecoder()
+    buffer = ""
+    eof = False
+
+    def fill():
+        nonlocal buffer, eof
+        chunk = file.read(chunk_size)
+        if chunk:
+            buffer += chunk
+        else:
+            eof = True
+
+    while not buffer.lstrip():
+        if eof:
+            raise ValueError("Settings file is empty")
+        fill()
+    buffer = buffer.lstrip()
+    if buffer[0] != "[":
+        raise ValueError("Settings file must contain a JSON array")
+    buffer = buffer[1:]
+
+    while True:
+        buffer = buffer.lstrip(", \t\r\n")
+        if buffer.startswith("]"):
+            return
+        if not buffer:
+            if eof:
+                raise ValueError("Settings file ends inside the JSON array")
+            fill()
+            continue
+
+        try:
+            element, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            # The element continues in the next chunk
+            fill()
+            continue
+        if end == len(buffer) and not eof:
+            # A bare number could still continue in the next chunk
+            fill()
+            continue
+
+        yield element
+        buffer = buffer[end:]
+
+
+def content_hash(document: dict) -> str:
+    """Stable hash of a settings document's content, ignoring the stored hash"""
+    content = {key: value for key, value in document.items() if key != CONTENT_HASH_FIELD}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ImportPlan:
+    """Diff between a settings file and the collection, plus timing stats"""
+
+    def __init__(self):
+        self.added: List[str] = []
+        self.changed: List[str] = []
+        self.changed_documents: Dict[str, dict] = {}
+        self.unchanged = 0
+        self.deleted: List[str] = []
+        self.operations: List = []
+        self.stats: Dict[str, float] = {}
+
+    @property
+    def has_changes(self) -> bool:
+        return bool(self.operations)
+
+    def summary(self) -> dict:
+        return {
+            "added": len(self.added),
+            "changed": len(self.changed),
+            "unchanged": self.unchanged,
+            "deleted": len(self.deleted),
+            **self.stats,
+        }
+
+
+async def plan_import(collection, file: IO[str], delete_missing: bool = True) -> ImportPlan:
+    """Stream the file and compare content hashes against the collection
+
+    Only documents whose hash differs become ReplaceOne upserts. Ids absent
+    from the file become DeleteOne operations, ordered after every upsert.
+    """
+    plan = ImportPlan()
+    started = time.perf_counter()
+
+    existing: Dict[str, Optional[str]] = {}
+    async for document in collection.find({}, {CONTENT_HASH_FIELD: 1}):
+        existing[document["_id"]] = document.get(CONTENT_HASH_FIELD)
+    plan.stats["existing_load_s"] = round(time.perf_counter() - started, 3)
+
+    parse_started = time.perf_counter()
+    seen = set()
+    parsed = 0
+    for setting in iter_json_array(file):
+        parsed += 1
+        setting_id = setting["_id"]
+        if setting_id in seen:
+            raise ValueError(f"Duplicate _id in settings file: {setting_id}")
+        seen.add(setting_id)
+
+        digest = content_hash(setting)
+        if setting_id not in existing:
+            plan.added.append(setting_id)
+        elif existing[setting_id] != digest:
+            plan.changed.append(setting_id)
+            plan.changed_documents[setting_id] = setting
+        else:
+            plan.unchanged += 1
+            continue
+        setting[CONTENT_HASH_FIELD] = digest
+        plan.operations.append(ReplaceOne({"_id": setting_id}, setting, upsert=True))
+
+    if parsed == 0 and existing:
+        raise ValueError("Settings file is empty; refusing to delete every existing setting")
+
+    if delete_missing:
+        plan.deleted = [setting_id for setting_id in existing if setting_id not in seen]
+        plan.operations.extend(DeleteOne({"_id": setting_id}) for setting_id in plan.deleted)
+
+    parse_s = time.perf_counter() - parse_started
+    plan.stats["parsed"] = parsed
+    plan.stats["parse_s"] = round(parse_s, 3)
+    plan.stats["parse_docs_per_s"] = round(parsed / parse_s) if parse_s > 0 else parsed
+    return plan
+
+
+async def apply_import(collection, plan: ImportPlan):
+    """Write the planned upserts and deletes with one ordered bulk_write"""
+    if not plan.has_changes:
+        plan.stats["write_s"] = 0.0
+        return None
+    started = time.perf_counter()
+    result = await collection.bulk_write(plan.operations, ordered=True)
+    write_s = time.perf_counter() - started
+    plan.stats["write_s"] = round(write_s, 3)
+    plan.stats["write_ops_per_s"] = round(len(plan.operations) / write_s) if write_s > 0 else len(plan.operations)
+    return result
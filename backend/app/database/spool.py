@@ -0,0 +1,342 @@
+import asyncio
+import logging
+import os
+import struct
+import time
+import zlib
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
+
+import bson
+from bson import ObjectId
+from pymongo import InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.database.monitoring import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+SPOOL_DIR = os.getenv("SPOOL_DIR", "spool")
+SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", 64 * 1024 * 1024))
+SPOOL_FSYNC_MS = float(os.getenv("SPOOL_FSYNC_MS", 10))
+SPOOL_REPLAY_BATCH = int(os.getenv("SPOOL_REPLAY_BATCH", 500))
+SPOOL_RETRY_SECONDS = float(os.getenv("SPOOL_RETRY_SECONDS", 5))
+SPOOL_DIVERT_AFTER_MS = float(os.getenv("SPOOL_DIVERT_AFTER_MS", 2000))
+
+# magic, payload length, CRC-32 of the payload; the payload is BSON {"c": collection, "d": document}
+# for an insert, or {"c": collection, "f": filter, "u": update} for an update
+RECORD_HEADER = struct.Struct("<4sII")
+RECORD_MAGIC = b"MCBS"
+SEGMENT_PREFIX = "spool-"
+SEGMENT_SUFFIX = ".log"
+DUPLICATE_KEY = 11000
+
+
+SpooledWrite = Union[InsertOne, UpdateOne]
+
+
+def encode_record(collection_name: str, operation: SpooledWrite) -> bytes:
+    if isinstance(operation, UpdateOne):
+        record = {"c": collection_name, "f": operation._filter, "u": operation._doc}
+    else:
+        record = {"c": collection_name, "d": operation._doc}
+    payload = bson.encode(record)
+    return RECORD_HEADER.pack(RECORD_MAGIC, len(payload), zlib.crc32(payload)) + payload
+
+
+def read_records(path: str) -> Iterator[Tuple[int, str, SpooledWrite]]:
+    """(end offset, collection, operation) for each intact record, stopping at the first bad one"""
+    with open(path, "rb") as file:
+        offset = 0
+        while True:
+            header = file.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            magic, length, checksum = RECORD_HEADER.unpack(header)
+            if magic != RECORD_MAGIC:
+                return
+            payload = file.read(length)
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                return
+            offset += RECORD_HEADER.size + length
+            record = bson.decode(payload)
+            if "u" in record:
+                yield offset, record["c"], UpdateOne(record["f"], record["u"])
+            else:
+                yield offset, record["c"], InsertOne(record["d"])
+
+
+class Segment:
+    __slots__ = ("sequence", "path", "records", "bytes")
+
+    def __init__(self, sequence: int, path: str, records: int = 0, size: int = 0):
+        self.sequence = sequence
+        self.path = path
+        self.records = records
+        self.bytes = size
+
+
+class WriteSpool:
+    """Append-only local write-ahead spool for writes MongoDB cannot take right now
+
+    Records are length-prefixed and checksummed BSON, appended to numbered
+    segment files. Appends return once an fsync covering them has finished;
+    fsyncs are batched every fsync_ms, so many concurrent appends share one.
+    On start, every segment is scanned, and a torn or corrupt tail (e.g. a
+    crash mid-append) is truncated back to the last intact record.
+
+    A replay task retries every SPOOL_RETRY_SECONDS: it pings MongoDB, then
+    bulk-writes sealed segments oldest first and deletes each one once all
+    its records are acknowledged. Documents get their _id before they are
+    spooled and duplicate-key errors count as done, so replaying a segment
+    twice after a crash inserts nothing twice. A spooled update may also be
+    applied twice, so only idempotent ones (plain $set, no $inc) are spooled.
+    """
+
+    def __init__(
+        self,
+        directory: str = SPOOL_DIR,
+        segment_bytes: int = SPOOL_SEGMENT_BYTES,
+        fsync_ms: float = SPOOL_FSYNC_MS,
+        replay_batch: int = SPOOL_REPLAY_BATCH,
+        retry_interval: float = SPOOL_RETRY_SECONDS,
+        divert_after_ms: float = SPOOL_DIVERT_AFTER_MS,
+    ):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_ms / 1000
+        self.replay_batch = replay_batch
+        self.retry_interval = retry_interval
+        # A write MongoDB has not acknowledged within this long is spooled instead
+        self.divert_after = divert_after_ms / 1000
+        self.segments: List[Segment] = []
+        self._file = None
+        self._database = None
+        self._waiters: List[asyncio.Future] = []
+        self._syncs: Set[asyncio.Task] = set()
+        self._replay_task: Optional[asyncio.Task] = None
+        self._sync_lock: Optional[asyncio.Lock] = None
+        # MongoDB is considered down from a failed write until a replay succeeds
+        self.degraded = False
+        self.appended = 0
+        self.replayed = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.truncated_bytes = 0
+        self.fsyncs = 0
+        self.fsync_latency = LatencyHistogram()
+        self.last_replay: Optional[dict] = None
+
+    @property
+    def running(self) -> bool:
+        return self._replay_task is not None and not self._replay_task.done()
+
+    @property
+    def active(self) -> Optional[Segment]:
+        return self.segments[-1] if self.segments else None
+
+    @property
+    def depth(self) -> int:
+        return sum(segment.records for segment in self.segments)
+
+    def _segment_path(self, sequence: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{sequence:08d}{SEGMENT_SUFFIX}")
+
+    def _recover(self):
+        """Scan existing segments, truncating any torn or corrupt tail"""
+        os.makedirs(self.directory, exist_ok=True)
+        names = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+        for name in names:
+            path = os.path.join(self.directory, name)
+            records, good = 0, 0
+            for good, _, _ in read_records(path):
+                records += 1
+            size = os.path.getsize(path)
+            if size > good:
+                logger.warning(f"Spool segment {name}: truncating {size - good} bytes after the last intact record")
+                self.truncated_bytes += size - good
+                with open(path, "r+b") as file:
+                    file.truncate(good)
+                    os.fsync(file.fileno())
+            sequence = int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+            self.segments.append(Segment(sequence, path, records, good))
+        if self.segments:
+            self.degraded = True
+            logger.warning(f"Spool holds {self.depth} records from a previous run; they will be replayed")
+
+    def _open_segment(self):
+        sequence = self.active.sequence + 1 if self.active else 1
+        segment = Segment(sequence, self._segment_path(sequence))
+        self._file = open(segment.path, "ab")
+        self.segments.append(segment)
+
+    def _sync(self):
+        """Flush and fsync the active segment; runs in a worker thread"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _rotate(self):
+        """Seal the active segment so it can be replayed"""
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._open_segment()
+
+    async def append(self, writes: List[Tuple[str, SpooledWrite]]):
+        """Spool (collection, InsertOne or UpdateOne) writes; returns once they are on disk"""
+        data = []
+        for collection_name, operation in writes:
+            if isinstance(operation, InsertOne):
+                operation._doc.setdefault("_id", ObjectId())
+            data.append(encode_record(collection_name, operation))
+        if self.active.bytes >= self.segment_bytes:
+            async with self._sync_lock:
+                self._rotate()
+        payload = b"".join(data)
+        self._file.write(payload)
+        self.active.records += len(writes)
+        self.active.bytes += len(payload)
+        self.appended += len(writes)
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        if len(self._waiters) == 1:
+            task = asyncio.create_task(self._sync_soon())
+            self._syncs.add(task)
+            task.add_done_callback(self._syncs.discard)
+        await waiter
+
+    async def _sync_soon(self):
+        """Group fsync: everything appended within fsync_interval shares one"""
+        await asyncio.sleep(self.fsync_interval)
+        async with self._sync_lock:
+            waiters, self._waiters = self._waiters, []
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._sync)
+            except OSError as e:
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                return
+            self.fsyncs += 1
+            self.fsync_latency.observe((time.perf_counter() - started) * 1000)
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def _replay_segment(self, segment: Segment):
+        """Apply one sealed segment's records; raises if MongoDB goes away again"""
+        batches: Dict[str, List[SpooledWrite]] = {}
+
+        async def commit(collection_name: str):
+            operations = batches.pop(collection_name)
+            try:
+                await self._database[collection_name].bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    if error.get("code") == DUPLICATE_KEY:
+                        self.duplicates += 1
+                    else:
+                        self.dropped += 1
+                        logger.error(f"Spooled write to '{collection_name}' rejected: {error.get('errmsg')}")
+            self.replayed += len(operations)
+
+        for _, collection_name, operation in read_records(segment.path):
+            batch = batches.setdefault(collection_name, [])
+            batch.append(operation)
+            if len(batch) >= self.replay_batch:
+                await commit(collection_name)
+        for collection_name in list(batches):
+            await commit(collection_name)
+
+    async def replay(self) -> int:
+        """Replay every sealed segment to MongoDB; returns the records replayed"""
+        if not self.depth:
+            self.degraded = False
+            return 0
+        await self._database.command("ping")
+        async with self._sync_lock:
+            if self.active.records:
+                self._rotate()
+        started = time.perf_counter()
+        replayed = 0
+        while len(self.segments) > 1:
+            segment = self.segments[0]
+            await self._replay_segment(segment)
+            replayed += segment.records
+            os.remove(segment.path)
+            self.segments.pop(0)
+        elapsed = time.perf_counter() - started
+        self.last_replay = {
+            "records": replayed,
+            "elapsed_s": round(elapsed, 3),
+            "records_per_s": round(replayed / elapsed) if elapsed > 0 else None,
+        }
+        logger.info(f"Replayed {replayed} spooled writes in {elapsed:.2f}s")
+        self.degraded = bool(self.depth)
+        return replayed
+
+    async def _replay_loop(self):
+        while True:
+            await asyncio.sleep(self.retry_interval)
+            if not self.depth:
+                self.degraded = False
+                continue
+            try:
+                await self.replay()
+            except PyMongoError as e:
+                logger.warning(f"Spool replay deferred, MongoDB still unavailable: {e}")
+
+    def mark_degraded(self, reason: Exception):
+        if not self.degraded:
+            logger.error(f"MongoDB writes failing, spooling to {self.directory}: {type(reason).__name__} {reason}")
+        self.degraded = True
+
+    async def start(self, database):
+        self._database = database
+        self._sync_lock = asyncio.Lock()
+        self._recover()
+        self._open_segment()
+        self._replay_task = asyncio.create_task(self._replay_loop())
+
+    async def stop(self):
+        """Finish pending fsyncs and close; unreplayed records stay on disk for the next start"""
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+            try:
+                await self._replay_task
+            except asyncio.CancelledError:
+                pass
+            self._replay_task = None
+        if self._syncs:
+            await asyncio.gather(*list(self._syncs), return_exceptions=True)
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+            if not self.active.records:
+                os.remove(self.active.path)
+                self.segments.pop()
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self.running,
+            "degraded": self.degraded,
+            "depth_records": self.depth,
+            "depth_bytes": sum(segment.bytes for segment in self.segments),
+            "segments": len(self.segments),
+            "appended": self.appended,
+            "replayed": self.replayed,
+            "duplicates_skipped": self.duplicates,
+            "dropped": self.dropped,
+            "truncated_bytes": self.truncated_bytes,
+            "fsyncs": self.fsyncs,
+            "fsync_latency_ms": self.fsync_latency.to_dict(),
+            "last_replay": self.last_replay,
+        }
+
+
+write_spool = WriteSpool()
@@ -0,0 +1,11 @@
+from datetime import datetime
+from pydantic import BaseModel
+from typing import Literal, Optional
+
+class ReportRequest(BaseModel):
+    format: Literal["csv", "html", "pdf"] = "pdf"
+    setting_id: Optional[str] = None
+    # Results analyzed in [since, until), UTC
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    passed: Optional[bool] = None
@@ -0,0 +1,58 @@
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Optional, Union
+
+class MimicState(BaseModel):
+    r_blinks: int = Field(..., ge=0)
+    xl_blinks: int = Field(..., ge=0)
+
+class RigStatusUpdate(BaseModel):
+    state: str
+    setting_id: Optional[str] = None
+    run_id: Optional[str] = None
+    # Bank codes and mimic pattern default to the setting's own when omitted
+    r_config_code: Optional[str] = None
+    xl_config_code: Optional[str] = None
+    mimic: Optional[MimicState] = None
+    message: Optional[str] = None
+
+class DutyCompileRequest(BaseModel):
+    duty: str = Field(..., max_length=200)
+    dwell_s: Optional[float] = Field(None, ge=0)
+
+class DutyStartRequest(BaseModel):
+    # Either a setting, whose operatingDuty is used, or an explicit duty string
+    setting_id: Optional[str] = None
+    duty: Optional[str] = Field(None, max_length=200)
+    dwell_s: Optional[float] = Field(None, ge=0)
+
+Ohms = Annotated[float, Field(ge=0)]
+
+class BankInventory(BaseModel):
+    # Series steps in ohms; reactor steps are [reactance, winding resistance] or a bare reactance
+    resistor_steps: List[Ohms] = Field(..., min_length=1)
+    reactor_steps: List[Union[Ohms, Annotated[List[Ohms], Field(min_length=2, max_length=2)]]] = Field(..., min_length=1)
+    source_r: float = Field(0.0, ge=0)
+    source_x: float = Field(0.0, ge=0)
+
+class BankSolveRequest(BaseModel):
+    prospectiveCurrent_A: float = Field(..., gt=0)
+    powerFactor_cos_phi: float = Field(..., gt=0, le=1)
+    testVoltage_V: float = Field(..., gt=0)
+    top_k: int = Field(5, ge=1, le=50)
+    # The rig's own inventory is used when omitted
+    inventory: Optional[BankInventory] = None
+
+class BatchTest(BaseModel):
+    setting_id: str
+    samples: int = Field(1, ge=1, le=1000)
+
+class BatchRig(BaseModel):
+    rig_id: str
+    # Bank configuration the rig is currently switched to, if known
+    r_config_code: Optional[str] = None
+    xl_config_code: Optional[str] = None
+
+class BatchPlanRequest(BaseModel):
+    tests: List[BatchTest] = Field(..., min_length=1, max_length=500)
+    rigs: List[BatchRig] = Field(..., min_length=1, max_length=50)
+    strategy: str = "grouped"
@@ -0,0 +1,16 @@
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+class RunCreate(BaseModel):
+    setting_id: str
+    run_id: Optional[str] = None
+    sample_rate: float = Field(..., gt=0)
+    channels: List[str] = Field(default_factory=lambda: ["voltage", "current"], min_length=1, max_length=32)
+    dtype: Literal["float32", "int16"] = "float32"
+    # Physical units per ADC count for int16 captures, one per channel
+    scale: Optional[List[float]] = None
+    # ADC resolution per channel for float32 captures; stored chunks are quantized to it
+    resolution: Optional[List[float]] = None
+    # Longest capture expected; samples beyond it are refused by the archive
+    duration_s: Optional[float] = Field(None, gt=0)
+    notes: Optional[str] = None
@@ -7,9 +7,15 @@ class UserBase(BaseModel):
     email: Optional[EmailStr] = None
     role: Optional[str] = "user"
 
-class UserCreate(UserBase):
+class UserCreate(BaseModel):
+    """Self-registration; there is no role field, new accounts always get "user"."""
+    username: str = Field(..., min_length=3, max_length=50)
+    email: Optional[EmailStr] = None
     password: str = Field(..., min_length=6)
 
+class RoleUpdate(BaseModel):
+    role: str
+
 class UserUpdate(BaseModel):
     username: Optional[str] = None
     email: Optional[EmailStr] = None
@@ -45,3 +51,9 @@ class TokenData(BaseModel):
 class LoginRequest(BaseModel):
     username: str
     password: str
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
@@ -0,0 +1,146 @@
+from fastapi import APIRouter, Depends
+from app.config.database import get_database_metrics
+from app.database.group_commit import group_commit
+from app.database.operations import get_operation_metrics
+from app.database.spool import write_spool
+from app.services.broadcast import broadcast_hub
+from app.services.compute import compute_executor
+from app.services.dashboard_stats import dashboard_stats
+from app.services.duty_sequencer import duty_sequencer
+from app.services.live_telemetry import live_telemetry
+from app.services.reports import report_jobs
+from app.services.settings_catalog import settings_catalog
+from app.services.waveform_archive import waveform_archive
+from app.utils.auth import require_permission
+from app.utils.permissions import Permission
+from app.utils.hashing import password_hasher
+from app.utils.principal_cache import principal_cache
+from app.utils.revocation import revocation_store
+
+router = APIRouter(dependencies=[Depends(require_permission(Permission.VIEW_METRICS))])
+
+@router.get("/metrics/hashing")
+async def get_hashing_metrics():
+    """Password hashing pool state and per-call timing"""
+    return {
+        "success": True,
+        "data": password_hasher.snapshot(),
+        "message": "Hashing metrics retrieved successfully"
+    }
+
+@router.get("/metrics/principal-cache")
+async def get_principal_cache_metrics():
+    """Authenticated principal cache size and hit/miss counters"""
+    return {
+        "success": True,
+        "data": principal_cache.snapshot(),
+        "message": "Principal cache metrics retrieved successfully"
+    }
+
+@router.get("/metrics/revocations")
+async def get_revocation_metrics():
+    """Size and sync state of the in-process token revocation set"""
+    return {
+        "success": True,
+        "data": revocation_store.snapshot(),
+        "message": "Revocation metrics retrieved successfully"
+    }
+
+@router.get("/metrics/live")
+async def get_live_metrics():
+    """Live telemetry viewers, queued and dropped frames"""
+    return {
+        "success": True,
+        "data": live_telemetry.snapshot(),
+        "message": "Live telemetry metrics retrieved successfully"
+    }
+
+@router.get("/metrics/broadcast")
+async def get_broadcast_metrics():
+    """Event hub subscribers, replay buffer and lag counters"""
+    return {
+        "success": True,
+        "data": broadcast_hub.snapshot(),
+        "message": "Broadcast metrics retrieved successfully"
+    }
+
+@router.get("/metrics/dashboard-stats")
+async def get_dashboard_stats_metrics():
+    """Dashboard stats cache hits, reads and last reconciliation drift"""
+    return {
+        "success": True,
+        "data": dashboard_stats.snapshot(),
+        "message": "Dashboard stats metrics retrieved successfully"
+    }
+
+@router.get("/metrics/sequencer")
+async def get_sequencer_metrics():
+    """Rig sequences by status, step jitter histogram and plan cache counters"""
+    return {
+        "success": True,
+        "data": duty_sequencer.snapshot(),
+        "message": "Sequencer metrics retrieved successfully"
+    }
+
+@router.get("/metrics/reports")
+async def get_report_metrics():
+    """Report jobs by status and report cache usage"""
+    return {
+        "success": True,
+        "data": report_jobs.snapshot(),
+        "message": "Report metrics retrieved successfully"
+    }
+
+@router.get("/metrics/database")
+async def get_database_pool_metrics():
+    """MongoDB pool gauges, checkout waits and per-command/per-repository latency histograms"""
+    return {
+        "success": True,
+        "data": {**get_database_metrics(), "operations": get_operation_metrics()},
+        "message": "Database metrics retrieved successfully"
+    }
+
+@router.get("/metrics/group-commit")
+async def get_group_commit_metrics():
+    """Queued writes, batch size distribution and flush latency of the group-commit writer"""
+    return {
+        "success": True,
+        "data": group_commit.snapshot(),
+        "message": "Group commit metrics retrieved successfully"
+    }
+
+@router.get("/metrics/spool")
+async def get_spool_metrics():
+    """Write-ahead spool depth, fsync latency and replay throughput"""
+    return {
+        "success": True,
+        "data": write_spool.snapshot(),
+        "message": "Spool metrics retrieved successfully"
+    }
+
+@router.get("/metrics/waveform-archive")
+async def get_waveform_archive_metrics():
+    """Archived runs written, mapped runs kept open and window bytes served"""
+    return {
+        "success": True,
+        "data": waveform_archive.snapshot(),
+        "message": "Waveform archive metrics retrieved successfully"
+    }
+
+@router.get("/metrics/settings-catalog")
+async def get_settings_catalog_metrics():
+    """Settings catalog size, version and cached response bodies"""
+    return {
+        "success": True,
+        "data": settings_catalog.snapshot(),
+        "message": "Settings catalog metrics retrieved successfully"
+    }
+
+@router.get("/metrics/compute")
+async def get_compute_metrics():
+    """Compute pool queue depth, task counters and latency histograms"""
+    return {
+        "success": True,
+        "data": compute_executor.snapshot(),
+        "message": "Compute metrics retrieved successfully"
+    }
@@ -1,14 +1,25 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
+from pymongo.errors import DuplicateKeyError
 from datetime import timedelta
-from app.models.user import LoginRequest, Token, User, UserCreate
+from typing import Optional
+from app.models.user import LoginRequest, LogoutRequest, RefreshRequest, RoleUpdate, Token, User, UserCreate
 from app.utils.auth import (
     authenticate_user, 
     create_access_token, 
+    create_refresh_token,
+    decode_token,
     get_current_user,
-    get_password_hash
+    get_user_by_username,
+    get_password_hash_async,
+    oauth2_scheme,
+    require_permission,
+    revoke_token
 )
 from app.config.database import get_database
+from app.database.operations import USER_ROLE_FIELDS, UserRepository
+from app.utils.permissions import ROLE_PERMISSIONS, Permission
+from app.utils.principal_cache import principal_cache
 import os
 
 router = APIRouter()
@@ -21,13 +32,14 @@ async def login(login_data: LoginRequest, db=Depends(get_database)):
         if login_data.username == "admin" and login_data.password == "admin":
             access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30)))
             access_token = create_access_token(
-                data={"sub": "admin"}, expires_delta=access_token_expires
+                data={"sub": "admin", "role": "admin"}, expires_delta=access_token_expires
             )
             
             return {
                 "success": True,
                 "message": "Login successful",
                 "token": access_token,
+                "refresh_token": create_refresh_token("admin"),
                 "user": {
                     "id": "admin",
                     "username": "admin",
@@ -46,13 +58,15 @@ async def login(login_data: LoginRequest, db=Depends(get_database)):
         
         access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30)))
         access_token = create_access_token(
-            data={"sub": user["username"]}, expires_delta=access_token_expires
+            data={"sub": user["username"], "role": user.get("role", "user")},
+            expires_delta=access_token_expires
         )
         
         return {
             "success": True,
             "message": "Login successful",
             "token": access_token,
+            "refresh_token": create_refresh_token(user["username"]),
             "user": {
                 "id": str(user["_id"]),
                 "username": user["username"],
@@ -60,21 +74,63 @@ async def login(login_data: LoginRequest, db=Depends(get_database)):
                 "role": user.get("role", "user")
             }
         }
-        
+
+    except HTTPException:
+        # e.g. 503 with Retry-After from a saturated PasswordHasher
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Login failed: {str(e)}"
         )
 
+@router.post("/refresh", response_model=dict)
+async def refresh(refresh_data: RefreshRequest, db=Depends(get_database)):
+    """Exchange a refresh token for a new access token
+    
+    The user's role is re-read here, so role changes and deactivations reach
+    the permission claims no later than the next refresh.
+    """
+    payload = decode_token(refresh_data.refresh_token, token_type="refresh")
+    username = payload["sub"]
+    
+    if username == "admin":
+        role = "admin"
+    else:
+        user = await get_user_by_username(db, username, USER_ROLE_FIELDS)
+        if user is None or not user.get("is_active", True):
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Could not validate credentials",
+                headers={"WWW-Authenticate": "Bearer"},
+            )
+        role = user.get("role", "user")
+    
+    access_token_expires = timedelta(minutes=int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30)))
+    access_token = create_access_token(
+        data={"sub": username, "role": role}, expires_delta=access_token_expires
+    )
+    
+    return {
+        "success": True,
+        "message": "Token refreshed",
+        "token": access_token
+    }
+
 @router.post("/logout")
-async def logout(current_user: dict = Depends(get_current_user)):
+async def logout(
+    logout_data: Optional[LogoutRequest] = None,
+    current_user: dict = Depends(get_current_user),
+    token: str = Depends(oauth2_scheme)
+):
     """Logout endpoint - invalidate token"""
     try:
-        # In a production environment, you would:
-        # 1. Add the token to a blacklist stored in Redis/Database
-        # 2. Or implement token revocation
-        # For now, we'll just return success as the frontend handles token removal
+        principal_cache.invalidate_token(token)
+        
+        # Revoke the access token (and the refresh token, if sent) until expiry
+        await revoke_token(decode_token(token))
+        if logout_data and logout_data.refresh_token:
+            await revoke_token(decode_token(logout_data.refresh_token, token_type="refresh"))
         
         return {
             "success": True, 
@@ -95,26 +151,27 @@ async def read_users_me(current_user: dict = Depends(get_current_user)):
 async def register(user_data: UserCreate, db=Depends(get_database)):
     """Register new user"""
     try:
-        # Check if user already exists
-        existing_user = await db.users.find_one({"username": user_data.username})
-        if existing_user:
-            return {
-                "success": False,
-                "message": "Username already exists"
-            }
-        
         # Hash password and create user
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         user_dict = user_data.dict(exclude={"password"})
         user_dict["hashed_password"] = hashed_password
+        # Self-registered accounts never choose their own role; see set_user_role
+        user_dict["role"] = "user"
         
-        result = await db.users.insert_one(user_dict)
+        # The unique username index rejects duplicates atomically
+        try:
+            inserted_id = await UserRepository.for_database(db).insert(user_dict)
+        except DuplicateKeyError:
+            return {
+                "success": False,
+                "message": "Username already exists"
+            }
         
-        if result.inserted_id:
+        if inserted_id:
             return {
                 "success": True,
                 "message": "User registered successfully",
-                "user_id": str(result.inserted_id)
+                "user_id": str(inserted_id)
             }
         else:
             return {
@@ -122,8 +179,31 @@ async def register(user_data: UserCreate, db=Depends(get_database)):
                 "message": "Failed to register user"
             }
             
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Registration failed: {str(e)}"
         )
+
+@router.put("/users/{username}/role", response_model=dict)
+async def set_user_role(
+    username: str,
+    role_data: RoleUpdate,
+    db=Depends(get_database),
+    claims: dict = Depends(require_permission(Permission.MANAGE_USERS))
+):
+    """Change a user's role; it reaches their token claims on the next refresh"""
+    if role_data.role not in ROLE_PERMISSIONS:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown role '{role_data.role}', expected one of {', '.join(ROLE_PERMISSIONS)}"
+        )
+    if not await UserRepository.for_database(db).update(username, {"role": role_data.role}):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+    
+    return {
+        "success": True,
+        "message": f"Role of {username} set to {role_data.role}"
+    }
@@ -0,0 +1,104 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.models.rig import BankSolveRequest
+from app.services.bank_solver import (
+    MAX_REQUEST_BANK_STEPS,
+    BankError,
+    BankIndex,
+    default_index,
+    solve_setting,
+)
+from app.services.settings_catalog import settings_catalog
+from app.utils.auth import require_permission
+from app.utils.permissions import Permission, has_permissions
+
+router = APIRouter()
+
+def _build_index(inventory: dict = None) -> BankIndex:
+    try:
+        if inventory is None:
+            return default_index()
+        return BankIndex.from_dict(inventory, max_steps=MAX_REQUEST_BANK_STEPS)
+    except (BankError, ValueError, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Invalid bank inventory: {e}"
+        )
+
+async def index_or_422(inventory: dict = None) -> BankIndex:
+    """The bank index, built off the event loop: indexing a new inventory is O(2^steps)"""
+    return await asyncio.to_thread(_build_index, inventory)
+
+@router.get("/inventory", response_model=dict)
+async def get_inventory(claims: dict = Depends(require_permission(Permission.VIEW_SETTINGS))):
+    """The rig's R and XL bank steps and the range of their combinations"""
+    return {
+        "success": True,
+        "data": (await index_or_422()).describe(),
+        "message": "Bank inventory retrieved successfully"
+    }
+
+@router.post("/solve", response_model=dict)
+async def solve_banks(
+    request: BankSolveRequest,
+    claims: dict = Depends(require_permission(Permission.VIEW_SETTINGS))
+):
+    """Best R/XL tap combinations for a target current, power factor and voltage
+
+    A custom inventory is indexed and cached server-side, so it needs
+    MANAGE_SETTINGS and at most MAX_REQUEST_BANK_STEPS steps per bank.
+    """
+    if request.inventory is not None and not has_permissions(claims.get("perms", 0), Permission.MANAGE_SETTINGS):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions to solve for a custom inventory"
+        )
+    index = await index_or_422(request.inventory.model_dump() if request.inventory else None)
+    try:
+        solutions = index.solve(
+            request.prospectiveCurrent_A, request.powerFactor_cos_phi, request.testVoltage_V, request.top_k
+        )
+    except BankError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    return {
+        "success": True,
+        "data": solutions,
+        "message": f"Found {len(solutions)} bank configurations"
+    }
+
+@router.get("/solve/{setting_id}", response_model=dict)
+async def solve_setting_banks(
+    setting_id: str,
+    top_k: int = Query(5, ge=1, le=50),
+    claims: dict = Depends(require_permission(Permission.VIEW_SETTINGS))
+):
+    """Bank configurations for a test setting, next to its hand-picked codes"""
+    setting = settings_catalog.get(setting_id)
+    if setting is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Test setting '{setting_id}' not found"
+        )
+    try:
+        solutions = solve_setting(setting, await index_or_422(), top_k)
+    except BankError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Setting '{setting_id}' has no short-circuit target: {e}"
+        )
+    return {
+        "success": True,
+        "data": {
+            "setting_id": setting_id,
+            "current": {
+                "r_config_code": setting.get("r_config_code"),
+                "xl_config_code": setting.get("xl_config_code"),
+                "mimic": setting.get("mimic"),
+            },
+            "solutions": solutions,
+        },
+        "message": f"Found {len(solutions)} bank configurations"
+    }
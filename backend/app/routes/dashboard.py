@@ -1,25 +1,20 @@
 from fastapi import APIRouter, Depends
 from app.config.database import get_database
-from app.utils.auth import get_current_user
+from app.services.dashboard_stats import dashboard_stats, to_response
+from app.utils.auth import require_permission
+from app.utils.permissions import Permission
 
 router = APIRouter()
 
 @router.get("/stats")
 async def get_dashboard_stats(
-    current_user: dict = Depends(get_current_user),
+    claims: dict = Depends(require_permission(Permission.VIEW_DASHBOARD)),
     db=Depends(get_database)
 ):
     """Get dashboard statistics for MCB testing system"""
     try:
-        # In a real application, these would come from your database
-        # For now, return mock data that matches the frontend expectations
-        
-        stats = {
-            "testsExecuted": 1247,
-            "activeSessions": 3,
-            "systemUptime": 99.8,
-            "complianceRate": 98.5
-        }
+        # One small materialized document, cached in-process for a few seconds
+        stats = await dashboard_stats.get(db)
         
         return {
             "success": True,
@@ -30,11 +25,6 @@ async def get_dashboard_stats(
     except Exception as e:
         return {
             "success": False,
-            "data": {
-                "testsExecuted": 1247,
-                "activeSessions": 3,
-                "systemUptime": 99.8,
-                "complianceRate": 98.5
-            },
+            "data": to_response(None),
             "message": f"Error retrieving stats, using default values: {str(e)}"
         }
@@ -0,0 +1,135 @@
+import asyncio
+import json
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from app.models.rig import RigStatusUpdate
+from app.services.broadcast import BROADCAST_HEARTBEAT_SECONDS, broadcast_hub
+from app.services.settings_catalog import settings_catalog
+from app.utils.auth import authorize_token, require_permission
+from app.utils.permissions import Permission
+
+router = APIRouter()
+
+def parse_topics(topics: Optional[str]) -> Optional[List[str]]:
+    return [topic.strip() for topic in topics.split(",") if topic.strip()] if topics else None
+
+def parse_event_id(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+@router.get("/stream")
+async def stream_events(
+    token: str = Query(...),
+    topics: Optional[str] = Query(None, description="Comma-separated topic filter, e.g. rig,run.status"),
+    last_event_id: Optional[str] = Header(None),
+):
+    """Server-Sent Events stream of rig, mimic panel and run events
+
+    The token is a query parameter because EventSource cannot send headers.
+    Browsers resend Last-Event-ID on reconnect to replay missed events.
+    """
+    authorize_token(token, Permission.VIEW_DASHBOARD)
+    subscription = broadcast_hub.subscribe(parse_topics(topics), parse_event_id(last_event_id))
+    
+    async def events():
+        try:
+            while True:
+                event = await subscription.get(timeout=BROADCAST_HEARTBEAT_SECONDS)
+                if event is not None:
+                    yield event.sse
+                elif subscription.closed:
+                    return
+                else:
+                    yield b": keepalive\n\n"
+        finally:
+            broadcast_hub.unsubscribe(subscription)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.websocket("/ws")
+async def stream_events_ws(
+    websocket: WebSocket,
+    token: str = Query(...),
+    topics: Optional[str] = Query(None),
+    last_event_id: Optional[str] = Query(None),
+):
+    """The same event stream over a WebSocket, one JSON text message per event"""
+    try:
+        authorize_token(token, Permission.VIEW_DASHBOARD)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+    
+    await websocket.accept()
+    subscription = broadcast_hub.subscribe(parse_topics(topics), parse_event_id(last_event_id))
+    
+    async def close_on_disconnect():
+        try:
+            while True:
+                await websocket.receive_text()
+        except WebSocketDisconnect:
+            broadcast_hub.unsubscribe(subscription)
+    
+    receiver = asyncio.create_task(close_on_disconnect())
+    try:
+        while True:
+            event = await subscription.get()
+            if event is None:
+                break
+            await websocket.send_text(event.json)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        broadcast_hub.unsubscribe(subscription)
+        receiver.cancel()
+
+@router.get("/rig", response_model=dict)
+async def get_rig_status(claims: dict = Depends(require_permission(Permission.VIEW_DASHBOARD))):
+    """Last published rig status, for clients that have not subscribed yet"""
+    event = broadcast_hub.latest.get("rig.status")
+    return {
+        "success": True,
+        "data": json.loads(event.json) if event else None,
+        "message": "Rig status retrieved successfully" if event else "No rig status published yet"
+    }
+
+@router.post("/rig", response_model=dict)
+async def publish_rig_status(
+    update: RigStatusUpdate,
+    claims: dict = Depends(require_permission(Permission.RUN_TESTS))
+):
+    """Publish rig state and the resulting mimic panel pattern to every subscriber"""
+    rig = update.dict()
+    if update.setting_id is not None:
+        setting = settings_catalog.get(update.setting_id)
+        if setting is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Test setting '{update.setting_id}' not found"
+            )
+        rig["r_config_code"] = update.r_config_code or setting.get("r_config_code")
+        rig["xl_config_code"] = update.xl_config_code or setting.get("xl_config_code")
+        rig["mimic"] = rig["mimic"] or setting.get("mimic")
+    rig["updated_by"] = claims["sub"]
+    
+    event = broadcast_hub.publish("rig.status", rig)
+    if rig["mimic"] is not None or rig["r_config_code"] or rig["xl_config_code"]:
+        broadcast_hub.publish("rig.mimic", {
+            "setting_id": rig["setting_id"],
+            "r_config_code": rig["r_config_code"],
+            "xl_config_code": rig["xl_config_code"],
+            "mimic": rig["mimic"],
+        })
+    
+    return {
+        "success": True,
+        "data": {"event_id": event.id, **rig},
+        "message": "Rig status published successfully"
+    }
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import math
+from typing import Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from app.config.database import get_database
+from app.routes.runs import get_run_or_404
+from app.services.live_telemetry import LIVE_MAX_PX, live_telemetry
+from app.utils.auth import authorize_token
+from app.utils.permissions import Permission
+
+router = APIRouter()
+
+def run_status(run: dict) -> dict:
+    return {
+        "run_id": run["_id"],
+        "status": run.get("status"),
+        "samples_ingested": run.get("samples_ingested", 0),
+        "sample_rate": run["sample_rate"],
+        "channels": run["channels"],
+    }
+
+def parse_resolution(text: str, px: int, window: float) -> Optional[Tuple[int, float]]:
+    """New (px, window) from a viewer's text message, or None if the message is not a valid resolution"""
+    try:
+        message = json.loads(text)
+        px = int(message.get("px", px))
+        window = float(message.get("window", window))
+    except (ValueError, TypeError, AttributeError, OverflowError):
+        return None
+    if not 1 <= px <= LIVE_MAX_PX or not math.isfinite(window) or window <= 0:
+        return None
+    return px, window
+
+async def send_frames(websocket: WebSocket, subscriber):
+    while True:
+        frame = await subscriber.next_frame()
+        if frame is None:
+            return
+        await websocket.send_bytes(frame)
+
+@router.websocket("/runs/{run_id}")
+async def watch_run(
+    websocket: WebSocket,
+    run_id: str,
+    token: str = Query(...),
+    px: int = Query(1000, ge=1),
+    window: float = Query(1.0, gt=0),
+    db=Depends(get_database)
+):
+    """Live min/max-decimated waveform and status frames for a run (see app/services/live_telemetry.py)
+
+    px buckets span window seconds. Send {"px": ..., "window": ...} as a
+    text message to change the resolution; a message that is not valid
+    JSON, or has px outside 1..LIVE_MAX_PX or a window that is not a
+    positive number, is ignored and the current resolution kept.
+    """
+    try:
+        authorize_token(token, Permission.VIEW_RESULTS)
+        run = await get_run_or_404(db, run_id)
+    except HTTPException as e:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason=str(e.detail))
+        return
+    
+    await websocket.accept()
+    subscriber = live_telemetry.subscribe(run, live_telemetry.resolution(run, px, window), run_status(run))
+    sender = asyncio.create_task(send_frames(websocket, subscriber))
+    
+    try:
+        while True:
+            resolution = parse_resolution(await websocket.receive_text(), px, window)
+            if resolution is None:
+                continue
+            px, window = resolution
+            # Frames queued at the old resolution are discarded
+            live_telemetry.unsubscribe(run_id, subscriber)
+            sender.cancel()
+            subscriber = live_telemetry.subscribe(run, live_telemetry.resolution(run, px, window))
+            sender = asyncio.create_task(send_frames(websocket, subscriber))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        live_telemetry.unsubscribe(run_id, subscriber)
+        sender.cancel()
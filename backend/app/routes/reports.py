@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from fastapi.responses import FileResponse, StreamingResponse
+from app.config.database import get_database
+from app.models.report import ReportRequest
+from app.services.reports import WRITERS, ReportQuery, generate_report, report_cache, report_jobs, report_key
+from app.utils.auth import require_permission
+from app.utils.permissions import Permission
+
+router = APIRouter()
+
+def report_headers(key: str, report_format: str, cache: str) -> dict:
+    return {
+        "ETag": f'"{key}"',
+        "Content-Disposition": f'attachment; filename="compliance-{key[:12]}.{WRITERS[report_format].extension}"',
+        "X-Report-Cache": cache,
+    }
+
+def get_job_or_404(job_id: str):
+    job = report_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Report job '{job_id}' not found"
+        )
+    return job
+
+@router.get("/compliance")
+async def stream_compliance_report(
+    format: Literal["csv", "html", "pdf"] = Query("csv"),
+    setting_id: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    passed: Optional[bool] = None,
+    if_none_match: Optional[str] = Header(default=None),
+    claims: dict = Depends(require_permission(Permission.GENERATE_REPORTS)),
+    db=Depends(get_database)
+):
+    """Compliance report streamed as it is generated, or served from the report cache"""
+    query = ReportQuery(setting_id, since, until, passed)
+    key = await report_key(db, query, format)
+    if if_none_match is not None and key in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": f'"{key}"'})
+    
+    cached = report_cache.get(key, format)
+    if cached is not None:
+        return FileResponse(cached, media_type=WRITERS[format].media_type, headers=report_headers(key, format, "hit"))
+    return StreamingResponse(
+        report_cache.store(key, format, generate_report(db, query, format)),
+        media_type=WRITERS[format].media_type,
+        headers=report_headers(key, format, "miss"),
+    )
+
+@router.post("/jobs", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
+async def create_report_job(
+    request: ReportRequest,
+    claims: dict = Depends(require_permission(Permission.GENERATE_REPORTS)),
+    db=Depends(get_database)
+):
+    """Generate a report in the background; poll the job for progress"""
+    query = ReportQuery(request.setting_id, request.since, request.until, request.passed)
+    job = await report_jobs.submit(db, query, request.format, claims["sub"])
+    return {
+        "success": True,
+        "data": job.to_dict(),
+        "message": "Report served from cache" if job.status == "completed" else "Report job accepted"
+    }
+
+@router.get("/jobs/{job_id}", response_model=dict)
+async def get_report_job(
+    job_id: str,
+    claims: dict = Depends(require_permission(Permission.GENERATE_REPORTS))
+):
+    """Status and progress of a report job"""
+    return {
+        "success": True,
+        "data": get_job_or_404(job_id).to_dict(),
+        "message": "Report job retrieved successfully"
+    }
+
+@router.get("/jobs/{job_id}/download")
+async def download_report(
+    job_id: str,
+    claims: dict = Depends(require_permission(Permission.GENERATE_REPORTS))
+):
+    """The finished report of a completed job"""
+    job = get_job_or_404(job_id)
+    if job.status != "completed":
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Report job is {job.status}"
+        )
+    path = report_cache.get(job.key, job.format)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Report was evicted from the cache; submit the job again"
+        )
+    return FileResponse(path, media_type=WRITERS[job.format].media_type, headers=report_headers(job.key, job.format, "hit"))
@@ -0,0 +1,424 @@
+import asyncio
+import uuid
+from datetime import datetime
+from typing import Dict, List, Literal, Optional
+import numpy as np
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, status
+from fastapi.responses import StreamingResponse
+from pymongo import InsertOne
+from pymongo.errors import ConnectionFailure, DuplicateKeyError
+from app.config.database import get_database
+from app.database.group_commit import Acknowledgements, group_commit
+from app.database.operations import MeasurementChunkRepository, RunRepository, TestResultRepository
+from app.models.run import RunCreate
+from app.services.broadcast import broadcast_hub
+from app.services.compute import ComputeSaturated, run_cpu
+from app.services.dashboard_stats import dashboard_stats
+from app.services.live_telemetry import live_telemetry
+from app.services.settings_catalog import settings_catalog
+from app.services.waveform_analysis import analyze_capture, run_arrays
+from app.services.waveform_archive import ARCHIVE_MAX_WINDOW_SAMPLES, iter_window_bytes, waveform_archive
+from app.services.waveform_codecs import chunk_codec
+from app.services.waveform_ingest import FrameError, IngestSession
+from app.services.waveform_pyramid import WAVEFORM_MAX_PX, render
+from app.utils.auth import authorize_token, require_permission
+from app.utils.permissions import Permission
+
+router = APIRouter()
+
+def publish_run_status(run_id: str, run_status: str, **details):
+    """Tell live viewers of the run and every dashboard subscriber about a status change"""
+    event = {"run_id": run_id, "status": run_status, **details}
+    live_telemetry.publish_status(run_id, event)
+    broadcast_hub.publish("run.status", event)
+
+def database_unavailable(e: Exception) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=f"Database unavailable, please retry shortly: {type(e).__name__}",
+        headers={"Retry-After": "5"},
+    )
+
+async def start_ingest(db, run_id: str):
+    """Claim an open run for ingest; a run that was already ingested or is being ingested is refused"""
+    try:
+        claimed = await RunRepository.for_database(db).claim_for_ingest(run_id)
+    except ConnectionFailure as e:
+        raise database_unavailable(e)
+    if not claimed:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Run '{run_id}' is not open; only open runs accept samples"
+        )
+    await dashboard_stats.session_started(db)
+    publish_run_status(run_id, "ingesting")
+
+def open_session(run: dict) -> IngestSession:
+    return IngestSession(
+        run,
+        on_samples=live_telemetry.samples_listener(run["_id"]),
+        archive=waveform_archive.writer(run),
+        store_chunks=waveform_archive.stores_chunks,
+        codec=chunk_codec,
+    )
+
+async def store_buckets(session: IngestSession, buckets: List[tuple]) -> List[dict]:
+    """Archive and encode closed buckets in a worker thread, off the event loop
+
+    zlib/lzma compression and .npy writes of a bucket take milliseconds,
+    which at high sample rates would otherwise stall every other request.
+    """
+    if not buckets:
+        return []
+    return await asyncio.to_thread(session.store, buckets)
+
+async def archive_session(session: IngestSession) -> Optional[dict]:
+    """Publish the session's archive; returns its index, or None when runs are not archived"""
+    if session.archive is None:
+        return None
+    return await asyncio.to_thread(waveform_archive.finish, session.archive)
+
+async def finish_ingest(db, run_id: str, session: Optional[IngestSession], run_status: str,
+                        index: Optional[dict] = None, **details):
+    """Record how an ingest ended; a failed one's archive is discarded. Always ends the session.
+
+    The status goes through the group-commit writer like the chunks, so
+    during a MongoDB outage it is spooled with them and the run still ends
+    captured once the spool replays.
+    """
+    try:
+        samples = 0
+        if session is not None:
+            samples = session.samples
+            if run_status != "captured" and session.archive is not None:
+                session.archive.abort()
+        if group_commit.running:
+            await group_commit.submit(
+                RunRepository.collection_name,
+                RunRepository.ingest_update(run_id, samples, run_status, archive=index),
+                replayable=True,
+            )
+        else:
+            await RunRepository.for_database(db).record_ingest(run_id, samples, run_status, archive=index)
+    finally:
+        await dashboard_stats.session_ended(db)
+        publish_run_status(run_id, run_status, **details)
+
+def write_chunks(db, documents: List[dict]) -> List[asyncio.Future]:
+    """Queue measurement chunks on the group-commit writer, or insert them directly when it is not running"""
+    if not documents:
+        return []
+    if group_commit.running:
+        return [group_commit.submit(MeasurementChunkRepository.collection_name, InsertOne(document)) for document in documents]
+    return [asyncio.ensure_future(MeasurementChunkRepository.for_database(db).insert_many(documents))]
+
+async def load_run_arrays(db, run: dict) -> Dict[str, np.ndarray]:
+    """A run's channels in physical units, from its archive when it has one"""
+    if run.get("archive"):
+        archived = waveform_archive.open(run["_id"])
+        if archived is not None:
+            return archived.arrays()
+    chunks = await MeasurementChunkRepository.for_database(db).find_by_run(run["_id"])
+    return run_arrays(run, chunks)
+
+async def get_run_or_404(db, run_id: str) -> dict:
+    try:
+        run = await RunRepository.for_database(db).get_by_id(run_id)
+    except ConnectionFailure as e:
+        raise database_unavailable(e)
+    if run is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Run '{run_id}' not found"
+        )
+    return run
+
+@router.post("", response_model=dict)
+async def create_run(
+    run_data: RunCreate,
+    claims: dict = Depends(require_permission(Permission.INGEST_DATA)),
+    db=Depends(get_database)
+):
+    """Open a test run for a settings entry; its samples are then streamed to /ingest"""
+    if settings_catalog.get(run_data.setting_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Test setting '{run_data.setting_id}' not found"
+        )
+    if run_data.scale is not None and len(run_data.scale) != len(run_data.channels):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="scale must have one entry per channel"
+        )
+    if run_data.resolution is not None and (
+        len(run_data.resolution) != len(run_data.channels) or min(run_data.resolution) <= 0
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="resolution must have one positive entry per channel"
+        )
+    
+    run = run_data.dict(exclude={"run_id"})
+    run.update({
+        "_id": run_data.run_id or uuid.uuid4().hex,
+        "status": "open",
+        "samples_ingested": 0,
+        "started_at": datetime.utcnow(),
+        "created_by": claims["sub"],
+    })
+    try:
+        await RunRepository.for_database(db).insert(run)
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Run '{run['_id']}' already exists"
+        )
+    
+    publish_run_status(run["_id"], "open", setting_id=run["setting_id"])
+    return {
+        "success": True,
+        "data": run,
+        "message": "Run created successfully"
+    }
+
+@router.get("/{run_id}", response_model=dict)
+async def get_run(
+    run_id: str,
+    claims: dict = Depends(require_permission(Permission.VIEW_RESULTS)),
+    db=Depends(get_database)
+):
+    """Get a run's metadata and ingest progress"""
+    return {
+        "success": True,
+        "data": await get_run_or_404(db, run_id),
+        "message": "Run retrieved successfully"
+    }
+
+@router.get("/{run_id}/analysis", response_model=dict)
+async def analyze_run_data(
+    run_id: str,
+    claims: dict = Depends(require_permission(Permission.VIEW_RESULTS)),
+    db=Depends(get_database)
+):
+    """Analyze a captured run against its test setting on the compute pool"""
+    run = await get_run_or_404(db, run_id)
+    arrays = await load_run_arrays(db, run)
+    if "current" not in arrays or "voltage" not in arrays:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Run must record 'current' and 'voltage' channels"
+        )
+    if arrays["current"].size == 0:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Run '{run_id}' has no samples yet"
+        )
+    
+    try:
+        result = await run_cpu(
+            analyze_capture,
+            arrays["current"],
+            arrays["voltage"],
+            run["sample_rate"],
+            source_voltage=arrays.get("source_voltage"),
+            setting=settings_catalog.get(run["setting_id"]),
+        )
+    except ComputeSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Analysis workers are busy, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    
+    passed = result.get("verification", {}).get("passed", False)
+    previous = await TestResultRepository.for_database(db).record_for_run(run_id, {
+        "setting_id": run["setting_id"],
+        "run_id": run_id,
+        "passed": passed,
+        "result": result,
+        "analyzed_at": datetime.utcnow(),
+        "analyzed_by": claims["sub"],
+    })
+    await dashboard_stats.record_result(db, passed, previous)
+    
+    return {
+        "success": True,
+        "data": result,
+        "message": "Run analyzed successfully"
+    }
+
+async def get_archived_or_404(db, run_id: str, channels: Optional[List[str]]):
+    run = await get_run_or_404(db, run_id)
+    archived = waveform_archive.open(run_id) if run.get("archive") else None
+    if archived is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Run '{run_id}' has no archived samples"
+        )
+    unknown = [name for name in channels or [] if name not in archived.channels]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown channels: {', '.join(unknown)}"
+        )
+    return archived
+
+@router.get("/{run_id}/waveform", response_model=dict)
+async def get_run_waveform(
+    run_id: str,
+    t0: Optional[float] = Query(None, description="Plot start, seconds since sample 0"),
+    t1: Optional[float] = Query(None, description="Plot end, seconds since sample 0"),
+    px: int = Query(1000, ge=16, le=WAVEFORM_MAX_PX, description="Plot width in pixels"),
+    mode: Literal["lttb", "minmax"] = "lttb",
+    channels: Optional[List[str]] = Query(None),
+    claims: dict = Depends(require_permission(Permission.VIEW_RESULTS)),
+    db=Depends(get_database)
+):
+    """Plot-ready points of an archived run, from the coarsest pyramid level with at least px in view"""
+    archived = await get_archived_or_404(db, run_id, channels)
+    start, stop = archived.sample_range(t0, t1)
+    # Slicing a stored level is cheap, but runs without one are decimated from raw samples
+    data = await asyncio.to_thread(render, archived, start, stop, px, mode, channels or list(archived.channels))
+    return {
+        "success": True,
+        "data": {"run_id": run_id, **data},
+        "message": "Waveform retrieved successfully"
+    }
+
+@router.get("/{run_id}/window")
+async def get_run_window(
+    run_id: str,
+    t0: Optional[float] = Query(None, description="Window start, seconds since sample 0"),
+    t1: Optional[float] = Query(None, description="Window end, seconds since sample 0"),
+    channels: Optional[List[str]] = Query(None),
+    claims: dict = Depends(require_permission(Permission.VIEW_RESULTS)),
+    db=Depends(get_database)
+):
+    """Raw samples of an archived run between t0 and t1, as planar little-endian arrays
+
+    The body holds each requested channel's samples in turn, in stored
+    units (ADC counts for int16 runs, multiply by X-Scale). X-Start-Sample,
+    X-Samples, X-Sample-Rate, X-Channels and X-Dtype describe the layout.
+    """
+    archived = await get_archived_or_404(db, run_id, channels)
+    start, stop = archived.sample_range(t0, t1)
+    if stop - start > ARCHIVE_MAX_WINDOW_SAMPLES:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Window of {stop - start} samples exceeds {ARCHIVE_MAX_WINDOW_SAMPLES}, narrow t0..t1"
+        )
+    
+    window = archived.window(start, stop, channels)
+    waveform_archive.record_window(sum(data.nbytes for data in window.values()))
+    headers = {
+        "X-Start-Sample": str(archived.start_sample + start),
+        "X-Samples": str(stop - start),
+        "X-Sample-Rate": str(archived.sample_rate),
+        "X-Channels": ",".join(window),
+        "X-Dtype": archived.index["dtype"],
+    }
+    if archived.index.get("scale"):
+        headers["X-Scale"] = ",".join(str(archived.scale(name)) for name in window)
+    return StreamingResponse(iter_window_bytes(window), media_type="application/octet-stream", headers=headers)
+
+@router.post("/{run_id}/ingest", response_model=dict)
+async def ingest_run_data(
+    run_id: str,
+    request: Request,
+    claims: dict = Depends(require_permission(Permission.INGEST_DATA)),
+    db=Depends(get_database)
+):
+    """Ingest a chunked HTTP body of binary sample frames (see app/services/waveform_ingest.py)"""
+    run = await get_run_or_404(db, run_id)
+    await start_ingest(db, run_id)
+    
+    session, index = None, None
+    run_status, details = "failed", {}
+    acks = Acknowledgements()
+    try:
+        session = open_session(run)
+        async for body_chunk in request.stream():
+            await acks.add(write_chunks(db, await store_buckets(session, session.take(body_chunk))))
+        await acks.add(write_chunks(db, await store_buckets(session, session.drain())))
+        await acks.wait()
+        index = await archive_session(session)
+        run_status, details = "captured", session.stats()
+    except FrameError as e:
+        details = {"error": str(e)}
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid sample stream: {str(e)}"
+        )
+    except Exception as e:
+        # Failed chunk writes, a client disconnect, archive I/O errors
+        details = {"error": f"{type(e).__name__}: {e}"}
+        raise
+    finally:
+        if run_status != "captured":
+            acks.discard()
+        await finish_ingest(db, run_id, session, run_status, index, **details)
+    
+    return {
+        "success": True,
+        "data": details,
+        "message": "Samples ingested successfully"
+    }
+
+@router.websocket("/{run_id}/ingest/ws")
+async def ingest_run_data_ws(
+    websocket: WebSocket,
+    run_id: str,
+    token: str = Query(...),
+    db=Depends(get_database)
+):
+    """Ingest binary sample frames, one or more whole frames per binary WebSocket message
+
+    The client ends the run by closing with code 1000; any other close
+    marks the run failed, as does a text message or a malformed frame.
+    """
+    try:
+        authorize_token(token, Permission.INGEST_DATA)
+        run = await get_run_or_404(db, run_id)
+        await start_ingest(db, run_id)
+    except HTTPException as e:
+        code = status.WS_1013_TRY_AGAIN_LATER if e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE else status.WS_1008_POLICY_VIOLATION
+        await websocket.close(code=code, reason=str(e.detail))
+        return
+    
+    session, index = None, None
+    run_status, details = "failed", {}
+    acks = Acknowledgements()
+    connected = False
+    try:
+        await websocket.accept()
+        connected = True
+        session = open_session(run)
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                connected = False
+                code = message.get("code", status.WS_1000_NORMAL_CLOSURE)
+                if code != status.WS_1000_NORMAL_CLOSURE:
+                    details = {"error": f"Connection closed with code {code} before the run ended"}
+                    return
+                break
+            if message.get("bytes") is None:
+                raise FrameError("Text message received; send sample frames as binary messages")
+            await acks.add(write_chunks(db, await store_buckets(session, session.take(message["bytes"]))))
+        await acks.add(write_chunks(db, await store_buckets(session, session.drain())))
+        await acks.wait()
+        index = await archive_session(session)
+        run_status, details = "captured", session.stats()
+    except FrameError as e:
+        details = {"error": str(e)}
+        if connected:
+            await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA, reason=str(e)[:120])
+    except Exception as e:
+        details = {"error": f"{type(e).__name__}: {e}"}
+        if connected:
+            await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        raise
+    finally:
+        if run_status != "captured":
+            acks.discard()
+        await finish_ingest(db, run_id, session, run_status, index, **details)
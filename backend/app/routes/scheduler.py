@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from app.models.rig import BatchPlanRequest
+from app.services.batch_scheduler import ScheduleError, plan_batch
+from app.services.settings_catalog import settings_catalog
+from app.utils.auth import require_permission
+from app.utils.permissions import Permission
+
+router = APIRouter()
+
+@router.post("/plans", response_model=dict)
+async def plan_tests(
+    request: BatchPlanRequest,
+    claims: dict = Depends(require_permission(Permission.RUN_TESTS))
+):
+    """Order a queue of tests across rigs, grouping by bank configuration"""
+    tests = []
+    for test in request.tests:
+        setting = settings_catalog.get(test.setting_id)
+        if setting is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Test setting '{test.setting_id}' not found"
+            )
+        tests.append((setting, test.samples))
+    
+    rig_ids = [rig.rig_id for rig in request.rigs]
+    if len(set(rig_ids)) != len(rig_ids):
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Rig ids must be unique"
+        )
+    rigs = [(rig.rig_id, (rig.r_config_code, rig.xl_config_code)) for rig in request.rigs]
+    
+    try:
+        plan = plan_batch(tests, rigs, request.strategy)
+    except ScheduleError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    return {
+        "success": True,
+        "data": plan,
+        "message": f"Planned {plan['samples']} samples on {len(rigs)} rigs, makespan {plan['makespan_s'] / 3600:.1f} h"
+    }
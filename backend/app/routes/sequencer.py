@@ -0,0 +1,131 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.models.rig import DutyCompileRequest, DutyStartRequest
+from app.services.broadcast import broadcast_hub
+from app.services.duty_sequencer import DUTY_DWELL_SECONDS, DutyError, PlanStep, compile_duty, duty_sequencer
+from app.services.settings_catalog import settings_catalog
+from app.utils.auth import require_permission
+from app.utils.permissions import Permission
+
+router = APIRouter()
+
+def compile_or_422(duty: str, dwell_s: Optional[float]):
+    try:
+        return compile_duty(duty, DUTY_DWELL_SECONDS if dwell_s is None else dwell_s)
+    except DutyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+
+def setting_duty(setting_id: str) -> str:
+    setting = settings_catalog.get(setting_id)
+    if setting is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Test setting '{setting_id}' not found"
+        )
+    return setting.get("operatingDuty", "")
+
+async def publish_operation(rig_id: str, step: PlanStep):
+    """Default step handler: announce each operation to rig event subscribers"""
+    broadcast_hub.publish("rig.operation", {"rig_id": rig_id, "index": step.index, "operation": step.operation})
+
+@router.post("/plans", response_model=dict)
+async def compile_plan(
+    request: DutyCompileRequest,
+    claims: dict = Depends(require_permission(Permission.VIEW_SETTINGS))
+):
+    """Compile an operating duty string into its timed plan"""
+    return {
+        "success": True,
+        "data": compile_or_422(request.duty, request.dwell_s).to_dict(),
+        "message": "Operating duty compiled successfully"
+    }
+
+@router.get("/plans/{setting_id}", response_model=dict)
+async def get_setting_plan(
+    setting_id: str,
+    dwell_s: Optional[float] = Query(None, ge=0),
+    claims: dict = Depends(require_permission(Permission.VIEW_SETTINGS))
+):
+    """Timed plan for a test setting's operatingDuty"""
+    return {
+        "success": True,
+        "data": compile_or_422(setting_duty(setting_id), dwell_s).to_dict(),
+        "message": "Operating duty compiled successfully"
+    }
+
+@router.post("/rigs/{rig_id}/start", response_model=dict)
+async def start_sequence(
+    rig_id: str,
+    request: DutyStartRequest,
+    claims: dict = Depends(require_permission(Permission.RUN_TESTS))
+):
+    """Start running an operating duty on a rig"""
+    if request.duty is None and request.setting_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Provide setting_id or duty"
+        )
+    duty = request.duty if request.duty is not None else setting_duty(request.setting_id)
+    plan = compile_or_422(duty, request.dwell_s)
+    try:
+        execution = duty_sequencer.start(rig_id, plan, publish_operation)
+    except DutyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    
+    return {
+        "success": True,
+        "data": {**execution.to_dict(), "plan": plan.to_dict()},
+        "message": "Operating duty started"
+    }
+
+@router.post("/rigs/{rig_id}/cancel", response_model=dict)
+async def cancel_sequence(
+    rig_id: str,
+    claims: dict = Depends(require_permission(Permission.RUN_TESTS))
+):
+    """Cancel the operating duty running on a rig"""
+    execution = await duty_sequencer.cancel(rig_id)
+    if execution is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No sequence on rig '{rig_id}'"
+        )
+    return {
+        "success": True,
+        "data": execution.to_dict(),
+        "message": "Operating duty cancelled"
+    }
+
+@router.get("/rigs", response_model=dict)
+async def list_sequences(claims: dict = Depends(require_permission(Permission.VIEW_DASHBOARD))):
+    """Every rig's current or last sequence, with per-step timing jitter"""
+    executions = [execution.to_dict() for execution in duty_sequencer.executions.values()]
+    return {
+        "success": True,
+        "data": executions,
+        "message": f"Retrieved {len(executions)} rig sequences"
+    }
+
+@router.get("/rigs/{rig_id}", response_model=dict)
+async def get_sequence(
+    rig_id: str,
+    claims: dict = Depends(require_permission(Permission.VIEW_DASHBOARD))
+):
+    """A rig's current or last sequence, with per-step timing jitter"""
+    execution = duty_sequencer.executions.get(rig_id)
+    if execution is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No sequence on rig '{rig_id}'"
+        )
+    return {
+        "success": True,
+        "data": execution.to_dict(),
+        "message": "Rig sequence retrieved successfully"
+    }
@@ -0,0 +1,54 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from app.config.database import get_database
+from app.services.settings_catalog import CachedBody, bump_catalog_version, settings_catalog
+from app.utils.auth import require_permission
+from app.utils.permissions import Permission
+
+router = APIRouter()
+
+def cached_response(cached: CachedBody, if_none_match: Optional[str]) -> Response:
+    """304 when the client already holds this body, otherwise the pre-serialized JSON"""
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if if_none_match is not None and cached.etag in if_none_match:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+@router.get("")
+async def list_settings(
+    mcbModel: Optional[str] = None,
+    testDesignation: Optional[str] = None,
+    if_none_match: Optional[str] = Header(default=None),
+    claims: dict = Depends(require_permission(Permission.VIEW_SETTINGS))
+):
+    """List test settings, optionally filtered by MCB model and test designation"""
+    return cached_response(settings_catalog.list_body(mcbModel, testDesignation), if_none_match)
+
+@router.post("/refresh")
+async def refresh_settings(
+    claims: dict = Depends(require_permission(Permission.MANAGE_SETTINGS)),
+    db=Depends(get_database)
+):
+    """Reload the catalog here and signal every other worker to reload"""
+    version = await bump_catalog_version(db)
+    await settings_catalog.reload()
+    return {
+        "success": True,
+        "data": settings_catalog.snapshot(),
+        "message": f"Settings catalog refreshed to version {version}"
+    }
+
+@router.get("/{setting_id}")
+async def get_setting(
+    setting_id: str,
+    if_none_match: Optional[str] = Header(default=None),
+    claims: dict = Depends(require_permission(Permission.VIEW_SETTINGS))
+):
+    """Get a single test setting by its _id"""
+    cached = settings_catalog.item_body(setting_id)
+    if cached is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Test setting '{setting_id}' not found"
+        )
+    return cached_response(cached, if_none_match)
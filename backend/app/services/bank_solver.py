@@ -0,0 +1,200 @@
+import json
+import math
+import os
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Environment variables
+BANK_INVENTORY_FILE = os.getenv("BANK_INVENTORY_FILE")
+
+# Every subset of a bank's steps is indexed, so steps per bank are capped
+MAX_BANK_STEPS = 20
+# Tighter cap for inventories supplied with a request rather than by the rig
+MAX_REQUEST_BANK_STEPS = int(os.getenv("MAX_REQUEST_BANK_STEPS", 14))
+# Reactor combinations examined around the target reactance per query
+CANDIDATE_WINDOW = 16
+
+# Binary-weighted series steps give uniform resolution over the range.
+# Reactor steps are (reactance, winding resistance) pairs, in ohms.
+DEFAULT_RESISTOR_STEPS: Tuple[float, ...] = tuple(round(0.001 * 2 ** k, 6) for k in range(13))
+DEFAULT_REACTOR_STEPS: Tuple[Tuple[float, float], ...] = tuple(
+    (round(0.001 * 2 ** k, 6), round(0.00005 * 2 ** k, 7)) for k in range(13)
+)
+
+
+class BankError(ValueError):
+    """Raised for an unusable bank inventory or target"""
+
+
+def _subset_sums(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sum of every subset of values, as (masks, sums) with bit i meaning step i is in
+
+    Built by doubling: the subsets with step i are those without it plus
+    values[i], so memory stays O(2^n) instead of an (2^n, n) bit matrix.
+    """
+    sums = np.zeros(1 << len(values), dtype=np.float64)
+    for step, value in enumerate(values):
+        size = 1 << step
+        np.add(sums[:size], value, out=sums[size:2 * size])
+    return np.arange(len(sums), dtype=np.int64), sums
+
+
+def tap_list(mask: int) -> List[int]:
+    return [step for step in range(mask.bit_length()) if mask >> step & 1]
+
+
+class BankIndex:
+    """Sorted impedance index over every tap combination of a rig's R and XL banks
+
+    Resistor subsets are sorted by resistance and reactor subsets by
+    reactance, each with its tap mask alongside. A query bisects the reactor
+    index for the target reactance, then, for each of the nearest reactor
+    combinations, bisects the resistor index for the resistance still
+    needed after the reactors' winding resistance. That is
+    O(CANDIDATE_WINDOW * log N) per query instead of a scan of every
+    (R, XL) pair.
+    """
+
+    def __init__(
+        self,
+        resistor_steps: Sequence[float],
+        reactor_steps: Sequence[Tuple[float, float]],
+        source_r: float = 0.0,
+        source_x: float = 0.0,
+    ):
+        if not resistor_steps or not reactor_steps:
+            raise BankError("Both banks need at least one step")
+        if len(resistor_steps) > MAX_BANK_STEPS or len(reactor_steps) > MAX_BANK_STEPS:
+            raise BankError(f"At most {MAX_BANK_STEPS} steps per bank can be indexed")
+        if min(resistor_steps) < 0 or min(min(step) for step in reactor_steps) < 0:
+            raise BankError("Bank steps cannot be negative")
+        self.resistor_steps = tuple(float(r) for r in resistor_steps)
+        self.reactor_steps = tuple((float(x), float(r)) for x, r in reactor_steps)
+        self.source_r = source_r
+        self.source_x = source_x
+
+        masks, sums = _subset_sums(np.array(self.resistor_steps))
+        order = np.argsort(sums, kind="stable")
+        self.r_masks, self.r_values = masks[order], sums[order]
+
+        reactor = np.array(self.reactor_steps)
+        masks, x_sums = _subset_sums(reactor[:, 0])
+        _, winding = _subset_sums(reactor[:, 1])
+        order = np.argsort(x_sums, kind="stable")
+        self.x_masks, self.x_values, self.x_winding = masks[order], x_sums[order], winding[order]
+
+    @classmethod
+    def from_dict(cls, inventory: dict, max_steps: int = MAX_BANK_STEPS) -> "BankIndex":
+        if len(inventory["resistor_steps"]) > max_steps or len(inventory["reactor_steps"]) > max_steps:
+            raise BankError(f"At most {max_steps} steps per bank are accepted here")
+        reactor_steps = tuple(
+            tuple(step) if isinstance(step, (list, tuple)) else (step, 0.0) for step in inventory["reactor_steps"]
+        )
+        if any(len(step) != 2 for step in reactor_steps):
+            raise BankError("Reactor steps are [reactance, winding resistance] pairs or bare reactances")
+        return cached_index(
+            tuple(inventory["resistor_steps"]),
+            reactor_steps,
+            inventory.get("source_r", 0.0),
+            inventory.get("source_x", 0.0),
+        )
+
+    @property
+    def combinations(self) -> int:
+        return len(self.r_values) * len(self.x_values)
+
+    def solve(self, current_a: float, power_factor: float, voltage_v: float, top_k: int = 5) -> List[dict]:
+        """Best tap combinations for a prospective current, power factor and voltage"""
+        if current_a <= 0 or voltage_v <= 0 or not 0 < power_factor <= 1:
+            raise BankError("Target needs current > 0, voltage > 0 and 0 < power factor <= 1")
+        impedance = voltage_v / current_a
+        target_r = impedance * power_factor - self.source_r
+        target_x = impedance * math.sin(math.acos(power_factor)) - self.source_x
+
+        # Nearest reactor combinations by reactance
+        position = int(np.searchsorted(self.x_values, target_x))
+        window = slice(max(0, position - CANDIDATE_WINDOW // 2), min(len(self.x_values), position + CANDIDATE_WINDOW // 2))
+        x_masks, x_values, x_winding = self.x_masks[window], self.x_values[window], self.x_winding[window]
+
+        # For each, the two resistor combinations around the resistance still needed
+        needed = target_r - x_winding
+        positions = np.searchsorted(self.r_values, needed)
+        r_index = np.concatenate([np.clip(positions - 1, 0, len(self.r_values) - 1), np.clip(positions, 0, len(self.r_values) - 1)])
+        x_index = np.concatenate([np.arange(len(x_values))] * 2)
+
+        total_r = self.r_values[r_index] + x_winding[x_index] + self.source_r
+        total_x = x_values[x_index] + self.source_x
+        total_z = np.hypot(total_r, total_x)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            achieved_current = np.where(total_z > 0, voltage_v / total_z, np.inf)
+            achieved_pf = np.where(total_z > 0, total_r / total_z, 1.0)
+        current_error = np.abs(achieved_current / current_a - 1)
+        pf_error = np.abs(achieved_pf - power_factor)
+        score = current_error + pf_error
+
+        solutions = []
+        seen = set()
+        for candidate in np.argsort(score, kind="stable"):
+            key = (int(self.r_masks[r_index[candidate]]), int(x_masks[x_index[candidate]]))
+            if key in seen:
+                continue
+            seen.add(key)
+            r_mask, x_mask = key
+            solutions.append({
+                "r_taps": tap_list(r_mask),
+                "xl_taps": tap_list(x_mask),
+                "r_ohm": round(float(total_r[candidate]), 6),
+                "x_ohm": round(float(total_x[candidate]), 6),
+                "current_A": round(float(achieved_current[candidate]), 2),
+                "power_factor": round(float(achieved_pf[candidate]), 4),
+                "current_error_pct": round(float(current_error[candidate]) * 100, 3),
+                "power_factor_error": round(float(pf_error[candidate]), 4),
+                # Mimic panel convention: one blink per step switched in
+                "mimic": {"r_blinks": bin(r_mask).count("1"), "xl_blinks": bin(x_mask).count("1")},
+            })
+            if len(solutions) == top_k:
+                break
+        return solutions
+
+    def describe(self) -> dict:
+        return {
+            "resistor_steps": list(self.resistor_steps),
+            "reactor_steps": [list(step) for step in self.reactor_steps],
+            "source_r": self.source_r,
+            "source_x": self.source_x,
+            "combinations": self.combinations,
+            "r_range_ohm": [float(self.r_values[0]), float(self.r_values[-1])],
+            "x_range_ohm": [float(self.x_values[0]), float(self.x_values[-1])],
+        }
+
+
+@lru_cache(maxsize=8)
+def cached_index(
+    resistor_steps: Tuple[float, ...],
+    reactor_steps: Tuple[Tuple[float, float], ...],
+    source_r: float = 0.0,
+    source_x: float = 0.0,
+) -> BankIndex:
+    """Build an index once per distinct inventory"""
+    return BankIndex(resistor_steps, reactor_steps, source_r, source_x)
+
+
+@lru_cache(maxsize=1)
+def default_index() -> BankIndex:
+    """The rig's own inventory: BANK_INVENTORY_FILE if set, else the built-in banks"""
+    if BANK_INVENTORY_FILE:
+        with open(BANK_INVENTORY_FILE, "r", encoding="utf-8") as file:
+            return BankIndex.from_dict(json.load(file))
+    return cached_index(DEFAULT_RESISTOR_STEPS, DEFAULT_REACTOR_STEPS)
+
+
+def solve_setting(setting: dict, index: Optional[BankIndex] = None, top_k: int = 5) -> List[dict]:
+    index = index or default_index()
+    return index.solve(
+        setting.get("prospectiveCurrent_A", 0),
+        setting.get("powerFactor_cos_phi", 1.0),
+        setting.get("testVoltage_V", 0),
+        top_k,
+    )
@@ -0,0 +1,275 @@
+import heapq
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from app.services.duty_sequencer import DutyError, compile_duty
+
+# Environment variables
+# Manual bank switching times, in seconds, for each bank that changes code
+BANK_SWITCH_R_SECONDS = float(os.getenv("BANK_SWITCH_R_SECONDS", 300))
+BANK_SWITCH_XL_SECONDS = float(os.getenv("BANK_SWITCH_XL_SECONDS", 300))
+# Mounting, wiring and removing one MCB sample
+SAMPLE_HANDLING_SECONDS = float(os.getenv("SAMPLE_HANDLING_SECONDS", 120))
+# Bank cooldown after a sample at BANK_COOLDOWN_REF_A, scaled with I^2
+BANK_COOLDOWN_SECONDS = float(os.getenv("BANK_COOLDOWN_SECONDS", 600))
+BANK_COOLDOWN_REF_A = float(os.getenv("BANK_COOLDOWN_REF_A", 10000))
+
+# Durations of operating duties that are not switching sequences
+NON_SWITCHING_DUTY_SECONDS = {
+    "THERMAL_TEST": 3600.0,
+    "DIELECTRIC_1MIN": 60.0,
+    "INSULATION_TEST": 60.0,
+}
+DEFAULT_NON_SWITCHING_SECONDS = 300.0
+
+GROUPED = "grouped"
+FIFO = "fifo"
+STRATEGIES = (GROUPED, FIFO)
+
+Config = Tuple[Optional[str], Optional[str]]
+
+
+class ScheduleError(ValueError):
+    """Raised for a test queue or rig set that cannot be planned"""
+
+
+class TestJob:
+    """Requested samples of one setting, with its per-sample cost model"""
+
+    __slots__ = ("setting_id", "samples", "config", "sample_s", "cooldown_s")
+
+    def __init__(self, setting_id: str, samples: int, config: Config, sample_s: float, cooldown_s: float):
+        self.setting_id = setting_id
+        self.samples = samples
+        self.config = config
+        self.sample_s = sample_s
+        self.cooldown_s = cooldown_s
+
+    @classmethod
+    def from_setting(cls, setting: dict, samples: int) -> "TestJob":
+        current = setting.get("prospectiveCurrent_A", 0) or 0
+        return cls(
+            setting["_id"],
+            samples,
+            (setting.get("r_config_code"), setting.get("xl_config_code")),
+            SAMPLE_HANDLING_SECONDS + duty_seconds(setting.get("operatingDuty", "")),
+            BANK_COOLDOWN_SECONDS * (current / BANK_COOLDOWN_REF_A) ** 2,
+        )
+
+    def split(self, samples: int) -> "TestJob":
+        return TestJob(self.setting_id, samples, self.config, self.sample_s, self.cooldown_s)
+
+    @property
+    def work_s(self) -> float:
+        return self.samples * self.sample_s + (self.samples - 1) * self.cooldown_s
+
+
+def duty_seconds(duty: str) -> float:
+    try:
+        return compile_duty(duty).total_s
+    except DutyError:
+        return NON_SWITCHING_DUTY_SECONDS.get(duty, DEFAULT_NON_SWITCHING_SECONDS)
+
+
+def switch_seconds(current: Config, target: Config) -> float:
+    """Time to move the banks from one configuration to another"""
+    seconds = 0.0
+    if current[0] != target[0]:
+        seconds += BANK_SWITCH_R_SECONDS
+    if current[1] != target[1]:
+        seconds += BANK_SWITCH_XL_SECONDS
+    return seconds
+
+
+class RigTimeline:
+    """Planned occupancy of one rig
+
+    Each sample starts once the banks are switched to its configuration
+    and have cooled down from the previous sample; switching happens
+    during the cooldown, so only the longer of the two delays the rig.
+    """
+
+    def __init__(self, rig_id: str, config: Config = (None, None)):
+        self.rig_id = rig_id
+        self.config = config
+        self.free_at = 0.0
+        self.cool_at = 0.0
+        self.switches = 0
+        self.switch_s = 0.0
+        self.busy_s = 0.0
+        self.steps: List[dict] = []
+
+    def append(self, job: TestJob):
+        switch = switch_seconds(self.config, job.config)
+        start = max(self.free_at + switch, self.cool_at)
+        end = start + job.work_s
+        if switch:
+            self.switches += 1
+            self.switch_s += switch
+        if self.steps and not switch and self.steps[-1]["setting_id"] == job.setting_id:
+            # Consecutive samples of one setting stay one step
+            step = self.steps[-1]
+            step["samples"] += job.samples
+            step["end_s"] = end
+        else:
+            self.steps.append({
+                "setting_id": job.setting_id,
+                "samples": job.samples,
+                "r_config_code": job.config[0],
+                "xl_config_code": job.config[1],
+                "reconfigure": bool(switch),
+                "switch_s": switch,
+                "start_s": start,
+                "end_s": end,
+            })
+        self.config = job.config
+        self.busy_s += job.samples * job.sample_s
+        self.free_at = end
+        self.cool_at = end + job.cooldown_s
+
+    def to_dict(self) -> dict:
+        return {
+            "rig_id": self.rig_id,
+            "finish_s": round(self.free_at, 1),
+            "busy_s": round(self.busy_s, 1),
+            "switches": self.switches,
+            "switch_s": round(self.switch_s, 1),
+            "steps": [
+                {**step, "start_s": round(step["start_s"], 1), "end_s": round(step["end_s"], 1)}
+                for step in self.steps
+            ],
+        }
+
+
+def schedule_fifo(jobs: Sequence[TestJob], rigs: List[RigTimeline]) -> List[RigTimeline]:
+    """Queue order: every sample goes to whichever rig frees up first"""
+    free = [(rig.free_at, index) for index, rig in enumerate(rigs)]
+    heapq.heapify(free)
+    for job in jobs:
+        for _ in range(job.samples):
+            _, index = heapq.heappop(free)
+            rigs[index].append(job.split(1))
+            heapq.heappush(free, (rigs[index].free_at, index))
+    return rigs
+
+
+def schedule_grouped(jobs: Sequence[TestJob], rigs: List[RigTimeline]) -> List[RigTimeline]:
+    """Group by bank configuration, then place groups longest first
+
+    Jobs sharing an (r_config_code, xl_config_code) pair run back to back
+    so the banks are switched once per group. Groups larger than an even
+    share of the total work are split across rigs so one configuration
+    cannot hold back the makespan. Each piece goes to the rig that would
+    finish it earliest, after each rig already on a configuration has
+    taken that configuration's largest piece.
+    Finally each rig's pieces are ordered so equal R codes are adjacent and
+    only the XL bank changes between them.
+    """
+    groups: Dict[Config, List[TestJob]] = {}
+    for job in jobs:
+        groups.setdefault(job.config, []).append(job)
+
+    total = sum(job.work_s for job in jobs)
+    share = total / len(rigs)
+    pieces: List[List[TestJob]] = []
+    for config, members in groups.items():
+        piece: List[TestJob] = []
+        piece_s = 0.0
+        for job in members:
+            remaining = job.samples
+            while remaining:
+                per_sample = job.sample_s + job.cooldown_s
+                fits = max(1, int((share - piece_s) // per_sample)) if piece_s < share else 0
+                if not fits:
+                    pieces.append(piece)
+                    piece, piece_s = [], 0.0
+                    continue
+                take = min(remaining, fits)
+                piece.append(job.split(take))
+                piece_s += take * per_sample
+                remaining -= take
+        if piece:
+            pieces.append(piece)
+
+    pieces.sort(key=lambda piece: sum(job.work_s for job in piece), reverse=True)
+    assigned: List[List[List[TestJob]]] = [[] for _ in rigs]
+    # Placement runs on scratch timelines; the real ones are built in rig order below
+    scratch = [RigTimeline(rig.rig_id, rig.config) for rig in rigs]
+    # A rig already switched to a configuration starts with that configuration's largest piece
+    for index, rig in enumerate(rigs):
+        matching = [piece for piece in pieces if piece[0].config == rig.config]
+        if matching:
+            pieces.remove(matching[0])
+            assigned[index].append(matching[0])
+            for job in matching[0]:
+                scratch[index].append(job)
+    for piece in pieces:
+        best = min(
+            range(len(rigs)),
+            key=lambda index: (_finish_with_piece(scratch[index], piece), scratch[index].free_at),
+        )
+        assigned[best].append(piece)
+        for job in piece:
+            scratch[best].append(job)
+
+    for rig, rig_pieces in zip(rigs, assigned):
+        start = rig.config
+        # Pieces already on the rig's configuration first, then sorted by R code, then XL code
+        rig_pieces.sort(key=lambda piece: (piece[0].config != start, str(piece[0].config[0]), str(piece[0].config[1])))
+        for piece in rig_pieces:
+            for job in piece:
+                rig.append(job)
+    return rigs
+
+
+def _finish_with_piece(rig: RigTimeline, piece: List[TestJob]) -> float:
+    """When the rig would be done if piece were appended next"""
+    free_at, cool_at, config = rig.free_at, rig.cool_at, rig.config
+    for job in piece:
+        free_at = max(free_at + switch_seconds(config, job.config), cool_at) + job.work_s
+        cool_at = free_at + job.cooldown_s
+        config = job.config
+    return free_at
+
+
+def build_jobs(tests: Sequence[Tuple[dict, int]]) -> List[TestJob]:
+    jobs = [TestJob.from_setting(setting, samples) for setting, samples in tests if samples > 0]
+    if not jobs:
+        raise ScheduleError("The test queue is empty")
+    return jobs
+
+
+def plan_batch(
+    tests: Sequence[Tuple[dict, int]],
+    rigs: Sequence[Tuple[str, Config]],
+    strategy: str = GROUPED,
+) -> dict:
+    """Ordered per-rig plan for (setting, samples) pairs, with its makespan
+
+    rigs are (rig_id, (r_config_code, xl_config_code)) pairs giving each
+    rig's current bank configuration. The FIFO makespan is always computed
+    too, for comparison.
+    """
+    if strategy not in STRATEGIES:
+        raise ScheduleError(f"Unknown strategy '{strategy}'")
+    if not rigs:
+        raise ScheduleError("At least one rig is required")
+    jobs = build_jobs(tests)
+
+    fifo = schedule_fifo(jobs, [RigTimeline(rig_id, config) for rig_id, config in rigs])
+    timelines = fifo if strategy == FIFO else schedule_grouped(
+        jobs, [RigTimeline(rig_id, config) for rig_id, config in rigs]
+    )
+    makespan = max(rig.free_at for rig in timelines)
+    fifo_makespan = max(rig.free_at for rig in fifo)
+    samples = sum(job.samples for job in jobs)
+    return {
+        "strategy": strategy,
+        "samples": samples,
+        "makespan_s": round(makespan, 1),
+        "switches": sum(rig.switches for rig in timelines),
+        "samples_per_hour": round(samples * 3600 / makespan, 2) if makespan else None,
+        "fifo_makespan_s": round(fifo_makespan, 1),
+        "fifo_switches": sum(rig.switches for rig in fifo),
+        "rigs": [rig.to_dict() for rig in timelines],
+    }
@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional
+
+from app.services.settings_catalog import serialize
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+BROADCAST_QUEUE_SIZE = int(os.getenv("BROADCAST_QUEUE_SIZE", 64))
+BROADCAST_REPLAY_SIZE = int(os.getenv("BROADCAST_REPLAY_SIZE", 256))
+BROADCAST_HEARTBEAT_SECONDS = float(os.getenv("BROADCAST_HEARTBEAT_SECONDS", 15))
+
+
+class Event:
+    """One published event, serialized once for every subscriber and transport"""
+
+    __slots__ = ("id", "topic", "json", "sse")
+
+    def __init__(self, event_id: int, topic: str, data):
+        self.id = event_id
+        self.topic = topic
+        body = serialize({"id": event_id, "topic": topic, "ts": time.time(), "data": data})
+        self.json = body.decode()
+        self.sse = b"id: %d\nevent: %s\ndata: %s\n\n" % (event_id, topic.encode(), body)
+
+
+def topic_matches(patterns: Optional[List[str]], topic: str) -> bool:
+    """True if topic is selected by a filter such as ["rig", "run.status"]
+
+    A pattern selects the topic itself and everything below it, so "rig"
+    matches "rig.status" and "rig.mimic". No filter matches every topic.
+    """
+    if not patterns:
+        return True
+    for pattern in patterns:
+        if topic == pattern or topic.startswith(pattern + "."):
+            return True
+    return False
+
+
+class Subscription:
+    """A subscriber's bounded queue of shared Event objects
+
+    When a subscriber falls queue_size events behind, its oldest events are
+    dropped and counted in lagged; the gap in event ids tells the client.
+    """
+
+    def __init__(self, topics: Optional[List[str]], queue_size: int):
+        self.topics = topics
+        self.queue_size = max(1, queue_size)
+        self.delivered = 0
+        self.lagged = 0
+        self._events: Deque[Event] = deque()
+        self._ready = asyncio.Event()
+        self.closed = False
+
+    def push(self, event: Event):
+        if len(self._events) >= self.queue_size:
+            self._events.popleft()
+            self.lagged += 1
+        self._events.append(event)
+        self._ready.set()
+
+    async def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event; None when the subscription closes or timeout passes first"""
+        if not self._events and not self.closed:
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return None
+        if not self._events:
+            return None
+        self.delivered += 1
+        return self._events.popleft()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+
+class BroadcastHub:
+    """In-process pub/sub for rig status, mimic panel and run events
+
+    publish() serializes the event once and appends the same object to each
+    matching subscriber's queue; it never awaits a subscriber. The last
+    replay_size events are kept so a reconnecting client that sends its
+    last event id receives what it missed. Events only reach subscribers of
+    the worker that published them.
+    """
+
+    def __init__(self, queue_size: int = BROADCAST_QUEUE_SIZE, replay_size: int = BROADCAST_REPLAY_SIZE):
+        self.queue_size = queue_size
+        self.replay: Deque[Event] = deque(maxlen=max(0, replay_size))
+        self.latest: Dict[str, Event] = {}
+        self.subscriptions: List[Subscription] = []
+        self.last_id = 0
+        self.published = 0
+        self.lagged = 0
+
+    def publish(self, topic: str, data) -> Event:
+        self.last_id += 1
+        event = Event(self.last_id, topic, data)
+        self.replay.append(event)
+        self.latest[topic] = event
+        self.published += 1
+        for subscription in self.subscriptions:
+            if topic_matches(subscription.topics, topic):
+                lagged = subscription.lagged
+                subscription.push(event)
+                self.lagged += subscription.lagged - lagged
+        return event
+
+    def subscribe(self, topics: Optional[Iterable[str]] = None, last_event_id: Optional[int] = None) -> Subscription:
+        """Register a subscriber, first replaying buffered events after last_event_id"""
+        subscription = Subscription(list(topics) if topics else None, self.queue_size)
+        if last_event_id is not None:
+            if self.replay and self.replay[0].id > last_event_id + 1:
+                # Some of the missed events already left the replay buffer
+                subscription.lagged += self.replay[0].id - last_event_id - 1
+            for event in self.replay:
+                if event.id > last_event_id and topic_matches(subscription.topics, event.topic):
+                    subscription.push(event)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscription.close()
+        if subscription in self.subscriptions:
+            self.subscriptions.remove(subscription)
+
+    def snapshot(self) -> dict:
+        return {
+            "subscribers": len(self.subscriptions),
+            "last_event_id": self.last_id,
+            "published": self.published,
+            "replay_buffered": len(self.replay),
+            "lagged_total": self.lagged,
+            "queued": sum(len(s) for s in self.subscriptions),
+            "max_subscriber_lag": max((s.lagged for s in self.subscriptions), default=0),
+        }
+
+
+broadcast_hub = BroadcastHub()
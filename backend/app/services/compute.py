@@ -0,0 +1,212 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from app.database.monitoring import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", max(1, (os.cpu_count() or 2) - 1)))
+COMPUTE_QUEUE_SIZE = int(os.getenv("COMPUTE_QUEUE_SIZE", 16))
+COMPUTE_START_METHOD = os.getenv("COMPUTE_START_METHOD", "spawn")
+# Arrays smaller than this are pickled; copying them into shared memory costs more than it saves
+COMPUTE_SHM_MIN_BYTES = int(os.getenv("COMPUTE_SHM_MIN_BYTES", 64 * 1024))
+
+
+class ComputeSaturated(Exception):
+    """Raised when the compute pool has no free worker or queue slot"""
+
+
+class SharedArray:
+    """Picklable handle to an ndarray placed in a shared memory block"""
+
+    __slots__ = ("name", "shape", "dtype")
+
+    def __init__(self, name: str, shape: tuple, dtype: str):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+    def __getstate__(self):
+        return (self.name, self.shape, self.dtype)
+
+    def __setstate__(self, state):
+        self.name, self.shape, self.dtype = state
+
+
+def _share(value: Any, blocks: List[shared_memory.SharedMemory]) -> Any:
+    """Copy a large ndarray into a new shared memory block and return its handle"""
+    if not isinstance(value, np.ndarray) or value.nbytes < COMPUTE_SHM_MIN_BYTES or value.dtype.hasobject:
+        return value
+    block = shared_memory.SharedMemory(create=True, size=value.nbytes)
+    blocks.append(block)
+    np.ndarray(value.shape, dtype=value.dtype, buffer=block.buf)[...] = value
+    return SharedArray(block.name, value.shape, value.dtype.str)
+
+
+def _attach(value: Any, blocks: List[shared_memory.SharedMemory]) -> Any:
+    """Worker side of _share: a read-only view over the parent's block"""
+    if not isinstance(value, SharedArray):
+        return value
+    block = shared_memory.SharedMemory(name=value.name)
+    blocks.append(block)
+    array = np.ndarray(value.shape, dtype=np.dtype(value.dtype), buffer=block.buf)
+    array.flags.writeable = False
+    return array
+
+
+def _run_task(fn: Callable, args: tuple, kwargs: dict, submitted_at: float):
+    """Run fn in a worker process and report how long it queued and ran"""
+    started_at = time.perf_counter()
+    blocks: List[shared_memory.SharedMemory] = []
+    try:
+        args = tuple(_attach(value, blocks) for value in args)
+        kwargs = {key: _attach(value, blocks) for key, value in kwargs.items()}
+        result = fn(*args, **kwargs)
+    finally:
+        args = kwargs = None
+        for block in blocks:
+            try:
+                block.close()
+            except BufferError:
+                # The result still references the block; it closes when collected
+                pass
+    return result, started_at - submitted_at, time.perf_counter() - started_at
+
+
+def _noop():
+    return None
+
+
+class ComputeExecutor:
+    """Bounded process pool for CPU-bound work such as waveform analysis.
+
+    Large ndarray arguments travel through multiprocessing.shared_memory:
+    the parent copies each one into a block once and the worker maps it,
+    so nothing array-sized is pickled. At most ``workers + queue_size``
+    tasks are admitted at once; beyond that run() raises ComputeSaturated.
+    """
+
+    def __init__(
+        self,
+        workers: int = COMPUTE_WORKERS,
+        queue_size: int = COMPUTE_QUEUE_SIZE,
+        start_method: str = COMPUTE_START_METHOD,
+    ):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.start_method = start_method
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.shared_bytes = 0
+        self.wait_ms = LatencyHistogram()
+        self.run_ms = LatencyHistogram()
+        self.by_function: Dict[str, LatencyHistogram] = {}
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    @property
+    def queue_depth(self) -> int:
+        """Admitted tasks not yet picked up by a worker"""
+        return max(0, self._in_flight - self.workers)
+
+    def start(self):
+        """Create the process pool and start its workers"""
+        if self._executor is not None:
+            return
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+        )
+        # Workers are otherwise spawned on first use, inside a request
+        for _ in range(self.workers):
+            self._executor.submit(_noop)
+        logger.info(
+            f"Compute pool started ({self.start_method}, {self.workers} workers, queue {self.queue_size})"
+        )
+
+    def shutdown(self):
+        """Stop the process pool, waiting for tasks already admitted"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) in a worker process without blocking the event loop
+
+        fn must be importable at module level. ndarray arguments of at least
+        COMPUTE_SHM_MIN_BYTES are passed through shared memory.
+        """
+        if self._in_flight >= self.capacity:
+            self.rejected += 1
+            raise ComputeSaturated("Compute pool is saturated")
+
+        self.start()
+        self._in_flight += 1
+        blocks: List[shared_memory.SharedMemory] = []
+        try:
+            args = tuple(_share(value, blocks) for value in args)
+            kwargs = {key: _share(value, blocks) for key, value in kwargs.items()}
+            self.shared_bytes += sum(block.size for block in blocks)
+
+            loop = asyncio.get_running_loop()
+            result, wait_s, run_s = await loop.run_in_executor(
+                self._executor, _run_task, fn, args, kwargs, time.perf_counter()
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        self.completed += 1
+        self.wait_ms.observe(wait_s * 1000)
+        self.run_ms.observe(run_s * 1000)
+        name = f"{fn.__module__}.{fn.__qualname__}"
+        histogram = self.by_function.get(name)
+        if histogram is None:
+            histogram = self.by_function[name] = LatencyHistogram()
+        histogram.observe(run_s * 1000)
+        return result
+
+    def snapshot(self) -> dict:
+        """Current pool state, queue depth and task latency histograms"""
+        return {
+            "start_method": self.start_method,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "running": self._executor is not None,
+            "in_flight": self._in_flight,
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "shared_bytes": self.shared_bytes,
+            "queue_wait_ms": self.wait_ms.to_dict(),
+            "run_ms": self.run_ms.to_dict(),
+            "functions": {name: histogram.to_dict() for name, histogram in sorted(self.by_function.items())},
+        }
+
+
+compute_executor = ComputeExecutor()
+
+
+async def run_cpu(fn: Callable, *args, **kwargs) -> Any:
+    """Run CPU-bound fn on the shared compute pool"""
+    return await compute_executor.run(fn, *args, **kwargs)
@@ -0,0 +1,208 @@
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
+
+from app.database.operations import RunRepository, TestResultRepository
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+DASHBOARD_STATS_TTL_SECONDS = float(os.getenv("DASHBOARD_STATS_TTL_SECONDS", 2))
+DASHBOARD_RECONCILE_SECONDS = float(os.getenv("DASHBOARD_RECONCILE_SECONDS", 300))
+DASHBOARD_HEARTBEAT_SECONDS = float(os.getenv("DASHBOARD_HEARTBEAT_SECONDS", 60))
+# A counter update not acknowledged within this long is dropped and left to reconciliation
+DASHBOARD_WRITE_TIMEOUT_MS = float(os.getenv("DASHBOARD_WRITE_TIMEOUT_MS", 2000))
+
+STATS_COLLECTION = "dashboard_stats"
+STATS_ID = "global"
+
+# Run status counted as an active test session
+ACTIVE_RUN_STATUS = "ingesting"
+
+
+def to_response(document: Optional[dict]) -> dict:
+    """Materialized counters in the shape the dashboard expects"""
+    document = document or {}
+    executed = document.get("testsExecuted", 0)
+    passed = document.get("testsPassed", 0)
+
+    uptime = 100.0
+    first = document.get("firstHeartbeatAt")
+    if first is not None:
+        observed = (datetime.utcnow() - first).total_seconds()
+        expected = observed / DASHBOARD_HEARTBEAT_SECONDS
+        if expected >= 1:
+            uptime = min(100.0, 100.0 * document.get("heartbeats", 0) / expected)
+
+    return {
+        "testsExecuted": executed,
+        "activeSessions": max(0, document.get("activeSessions", 0)),
+        "systemUptime": round(uptime, 1),
+        "complianceRate": round(100.0 * passed / executed, 1) if executed else 0.0,
+    }
+
+
+class DashboardStats:
+    """One materialized stats document, kept current with $inc
+
+    Writers call record_result() and session_started()/session_ended() as
+    results and ingest sessions happen. The endpoint reads the document at
+    most once per ttl seconds per worker, so polling costs one small
+    find_one however many results exist. A periodic reconciliation recounts
+    from the source collections to repair any drift, e.g. after a crash
+    between a write and its $inc. A counter update that fails or times out,
+    e.g. during a MongoDB outage, is logged and skipped rather than failing
+    the request; the next reconciliation repairs it.
+    """
+
+    def __init__(
+        self,
+        ttl: float = DASHBOARD_STATS_TTL_SECONDS,
+        reconcile_interval: float = DASHBOARD_RECONCILE_SECONDS,
+        heartbeat_interval: float = DASHBOARD_HEARTBEAT_SECONDS,
+        write_timeout_ms: float = DASHBOARD_WRITE_TIMEOUT_MS,
+    ):
+        self.ttl = ttl
+        self.reconcile_interval = reconcile_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.write_timeout = write_timeout_ms / 1000
+        self._cached: Optional[dict] = None
+        self._cached_at = 0.0
+        self._refresh: Optional[asyncio.Future] = None
+        self._database = None
+        self._tasks: List[asyncio.Task] = []
+        self.reads = 0
+        self.cache_hits = 0
+        self.reconciliations = 0
+        self.skipped_increments = 0
+        self.last_drift: Optional[dict] = None
+
+    @property
+    def collection(self):
+        return self._database[STATS_COLLECTION]
+
+    async def _increment(self, database, fields: dict):
+        try:
+            await asyncio.wait_for(
+                database[STATS_COLLECTION].update_one(
+                    {"_id": STATS_ID}, {"$inc": fields, "$set": {"updated_at": datetime.utcnow()}}, upsert=True
+                ),
+                self.write_timeout,
+            )
+        except (PyMongoError, asyncio.TimeoutError) as e:
+            self.skipped_increments += 1
+            logger.warning(f"Dashboard stats increment {fields} skipped until reconciliation: {type(e).__name__} {e}")
+        self._cached = None
+
+    async def record_result(self, database, passed: bool, previous: Optional[dict] = None):
+        """Count a stored result; previous is the result it replaced, if any"""
+        if previous is None:
+            await self._increment(database, {"testsExecuted": 1, "testsPassed": int(passed)})
+        elif bool(previous.get("passed")) != passed:
+            await self._increment(database, {"testsPassed": 1 if passed else -1})
+
+    async def session_started(self, database):
+        await self._increment(database, {"activeSessions": 1})
+
+    async def session_ended(self, database):
+        await self._increment(database, {"activeSessions": -1})
+
+    async def _read(self) -> dict:
+        self.reads += 1
+        document = await self.collection.find_one({"_id": STATS_ID})
+        self._cached = to_response(document)
+        self._cached_at = time.monotonic()
+        return self._cached
+
+    async def get(self, database=None) -> dict:
+        """Dashboard stats, from the in-process copy while it is younger than ttl"""
+        if database is not None:
+            self._database = database
+        if self._cached is not None and time.monotonic() - self._cached_at < self.ttl:
+            self.cache_hits += 1
+            return self._cached
+        # Concurrent pollers after expiry share one read
+        if self._refresh is None or self._refresh.done():
+            self._refresh = asyncio.ensure_future(self._read())
+        return await asyncio.shield(self._refresh)
+
+    async def reconcile(self) -> dict:
+        """Recount from test_results and test_runs and overwrite the counters"""
+        totals = await TestResultRepository.for_database(self._database).tally()
+        active = await RunRepository.for_database(self._database).count_by_status(ACTIVE_RUN_STATUS)
+        before = await self.collection.find_one_and_update(
+            {"_id": STATS_ID},
+            {"$set": {
+                "testsExecuted": totals["executed"],
+                "testsPassed": totals["passed"],
+                "activeSessions": active,
+                "reconciled_at": datetime.utcnow(),
+            }},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE,
+        ) or {}
+        self.reconciliations += 1
+        self.last_drift = {
+            "testsExecuted": totals["executed"] - before.get("testsExecuted", 0),
+            "testsPassed": totals["passed"] - before.get("testsPassed", 0),
+            "activeSessions": active - before.get("activeSessions", 0),
+        }
+        if any(self.last_drift.values()):
+            logger.warning(f"Dashboard stats drift corrected: {self.last_drift}")
+        self._cached = None
+        return self.last_drift
+
+    async def heartbeat(self):
+        """Count one heartbeat per interval across all workers, for systemUptime"""
+        now = datetime.utcnow()
+        due = now - timedelta(seconds=self.heartbeat_interval * 0.9)
+        await self.collection.update_one({"_id": STATS_ID}, {"$setOnInsert": {"created_at": now}}, upsert=True)
+        # Only the first worker to arrive in each interval matches the filter
+        await self.collection.update_one(
+            {"_id": STATS_ID, "$or": [{"lastHeartbeatAt": {"$exists": False}}, {"lastHeartbeatAt": {"$lte": due}}]},
+            {"$inc": {"heartbeats": 1}, "$set": {"lastHeartbeatAt": now}, "$min": {"firstHeartbeatAt": now}},
+        )
+
+    async def _every(self, interval: float, job, name: str):
+        while True:
+            try:
+                await job()
+            except PyMongoError as e:
+                logger.error(f"Dashboard stats {name} failed: {e}")
+            await asyncio.sleep(interval)
+
+    async def start(self, database):
+        self._database = database
+        self._tasks = [
+            asyncio.create_task(self._every(self.reconcile_interval, self.reconcile, "reconciliation")),
+            asyncio.create_task(self._every(self.heartbeat_interval, self.heartbeat, "heartbeat")),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def snapshot(self) -> dict:
+        return {
+            "cached": self._cached,
+            "reads": self.reads,
+            "cache_hits": self.cache_hits,
+            "reconciliations": self.reconciliations,
+            "skipped_increments": self.skipped_increments,
+            "last_drift": self.last_drift,
+        }
+
+
+dashboard_stats = DashboardStats()
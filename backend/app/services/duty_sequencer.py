@@ -0,0 +1,261 @@
+import asyncio
+import logging
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.database.monitoring import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+# Interval "t" between operations; IEC 60898-1 uses 3 minutes
+DUTY_DWELL_SECONDS = float(os.getenv("DUTY_DWELL_SECONDS", 180))
+# Most operations one duty may compile to; plans are cached, so this also bounds their memory
+DUTY_MAX_STEPS = int(os.getenv("DUTY_MAX_STEPS", 100))
+
+OPEN = "O"
+CLOSE_OPEN = "CO"
+OPERATIONS = (OPEN, CLOSE_OPEN)
+DWELL = "t"
+
+# "6xO", "CO", "3xCO": an optional repeat count of up to 3 digits in front of an operation
+_COUNTED = re.compile(r"^(?:(\d{1,3})x)?(O|CO)$")
+
+
+class DutyError(ValueError):
+    """Raised when an operating duty string cannot be compiled"""
+
+
+@dataclass(frozen=True)
+class PlanStep:
+    """One operation, offset_s seconds after the sequence starts"""
+    index: int
+    operation: str
+    offset_s: float
+
+
+@dataclass(frozen=True)
+class DutyPlan:
+    """Compiled operating duty: operations and their planned start offsets"""
+    duty: str
+    dwell_s: float
+    steps: Tuple[PlanStep, ...]
+
+    @property
+    def total_s(self) -> float:
+        return self.steps[-1].offset_s if self.steps else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "duty": self.duty,
+            "dwell_s": self.dwell_s,
+            "total_s": self.total_s,
+            "steps": [{"index": s.index, "operation": s.operation, "offset_s": s.offset_s} for s in self.steps],
+        }
+
+
+def _tokens(duty: str) -> List[str]:
+    """Operations and dwells of a duty string, e.g. ["O", "t", "O", "t", "CO"]
+
+    Two spellings are accepted: the explicit sequence "O-t-O-t-CO", and
+    counted groups "6xO_3xCO", where every operation is separated by t.
+    Either may hold at most DUTY_MAX_STEPS operations.
+    """
+    if "-" in duty:
+        tokens = duty.split("-")
+        for token in tokens:
+            if token not in OPERATIONS and token != DWELL:
+                raise DutyError(f"Unknown token '{token}' in operating duty '{duty}'")
+        if sum(token in OPERATIONS for token in tokens) > DUTY_MAX_STEPS:
+            raise DutyError(f"Operating duty '{duty[:40]}' has more than {DUTY_MAX_STEPS} operations")
+        return tokens
+
+    operations = []
+    for group in duty.split("_"):
+        match = _COUNTED.match(group)
+        if match is None:
+            raise DutyError(f"Operating duty '{duty[:40]}' is not a switching sequence")
+        count = int(match.group(1) or 1)
+        if count < 1:
+            raise DutyError(f"Repeat count must be positive in '{group}'")
+        if len(operations) + count > DUTY_MAX_STEPS:
+            raise DutyError(f"Operating duty '{duty[:40]}' has more than {DUTY_MAX_STEPS} operations")
+        operations.extend([match.group(2)] * count)
+
+    tokens = []
+    for operation in operations:
+        if tokens:
+            tokens.append(DWELL)
+        tokens.append(operation)
+    return tokens
+
+
+@lru_cache(maxsize=256)
+def compile_duty(duty: str, dwell_s: float = DUTY_DWELL_SECONDS) -> DutyPlan:
+    """Compile a duty string into an immutable plan; repeated calls hit the cache"""
+    duty = duty.strip()
+    tokens = _tokens(duty)
+    if not tokens or tokens[0] not in OPERATIONS or tokens[-1] not in OPERATIONS:
+        raise DutyError(f"Operating duty '{duty}' must start and end with an operation")
+
+    steps = []
+    offset = 0.0
+    for token in tokens:
+        if token == DWELL:
+            offset += dwell_s
+        else:
+            steps.append(PlanStep(len(steps), token, offset))
+    return DutyPlan(duty, dwell_s, tuple(steps))
+
+
+@dataclass(frozen=True)
+class StepTiming:
+    """Planned versus actual start of one executed step"""
+    index: int
+    operation: str
+    planned_s: float
+    actual_s: float
+
+    @property
+    def jitter_ms(self) -> float:
+        return (self.actual_s - self.planned_s) * 1000
+
+
+# Called for every step at its deadline, as a task of its own, so its duration does not delay later steps
+StepHandler = Callable[[str, PlanStep], Awaitable[None]]
+
+
+class DutyExecution:
+    """One rig running one plan against monotonic deadlines
+
+    Every step's deadline is start + offset_s on the event loop's monotonic
+    clock, so a late wake-up never pushes later steps back the way chained
+    sleep(dwell) calls would. Each step's handler runs as its own task, so
+    a handler slower than the dwell does not delay the next step either.
+    The run waits for all handlers before it completes, fails at the next
+    step after a handler raises, and cancels handlers still running when
+    it is cancelled.
+    """
+
+    def __init__(self, rig_id: str, plan: DutyPlan, handler: Optional[StepHandler] = None):
+        self.rig_id = rig_id
+        self.plan = plan
+        self.handler = handler
+        self.timings: List[StepTiming] = []
+        self.status = "pending"
+        self.error: Optional[str] = None
+        self.started_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._handlers: List[asyncio.Task] = []
+
+    def _check_handlers(self):
+        """Raise the error of the first finished handler that failed"""
+        running = []
+        for task in self._handlers:
+            if task.done():
+                task.result()
+            else:
+                running.append(task)
+        self._handlers = running
+
+    async def run(self, jitter: Optional[LatencyHistogram] = None):
+        loop = asyncio.get_running_loop()
+        self.started_at = loop.time()
+        self.status = "running"
+        try:
+            for step in self.plan.steps:
+                deadline = self.started_at + step.offset_s
+                delay = deadline - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self._check_handlers()
+                timing = StepTiming(step.index, step.operation, step.offset_s, loop.time() - self.started_at)
+                self.timings.append(timing)
+                if jitter is not None:
+                    jitter.observe(abs(timing.jitter_ms))
+                if self.handler is not None:
+                    self._handlers.append(asyncio.create_task(self.handler(self.rig_id, step)))
+            while self._handlers:
+                await asyncio.wait(self._handlers)
+                self._check_handlers()
+            self.status = "completed"
+        except asyncio.CancelledError:
+            self.status = "cancelled"
+            await self._cancel_handlers()
+            raise
+        except Exception as e:
+            await self._cancel_handlers()
+            self.status = "failed"
+            self.error = str(e)
+            logger.error(f"Duty sequence on rig '{self.rig_id}' failed at step {len(self.timings)}: {e}")
+
+    async def _cancel_handlers(self):
+        for task in self._handlers:
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        self._handlers = []
+
+    def to_dict(self) -> dict:
+        jitters = [timing.jitter_ms for timing in self.timings]
+        return {
+            "rig_id": self.rig_id,
+            "duty": self.plan.duty,
+            "status": self.status,
+            "error": self.error,
+            "steps_done": len(self.timings),
+            "steps_total": len(self.plan.steps),
+            "max_jitter_ms": round(max(jitters, key=abs), 3) if jitters else None,
+            "timings": [
+                {"index": t.index, "operation": t.operation, "planned_s": t.planned_s,
+                 "actual_s": round(t.actual_s, 6), "jitter_ms": round(t.jitter_ms, 3)}
+                for t in self.timings
+            ],
+        }
+
+
+class DutySequencer:
+    """Runs duty plans for many rigs concurrently on one event loop"""
+
+    def __init__(self):
+        self.executions: Dict[str, DutyExecution] = {}
+        self.jitter = LatencyHistogram()
+
+    def start(self, rig_id: str, plan: DutyPlan, handler: Optional[StepHandler] = None) -> DutyExecution:
+        current = self.executions.get(rig_id)
+        if current is not None and current.status in ("pending", "running"):
+            raise DutyError(f"Rig '{rig_id}' is already running '{current.plan.duty}'")
+        execution = self.executions[rig_id] = DutyExecution(rig_id, plan, handler)
+        execution.task = asyncio.create_task(execution.run(self.jitter))
+        return execution
+
+    async def cancel(self, rig_id: str) -> Optional[DutyExecution]:
+        execution = self.executions.get(rig_id)
+        if execution is None or execution.task is None or execution.task.done():
+            return execution
+        execution.task.cancel()
+        try:
+            await execution.task
+        except asyncio.CancelledError:
+            pass
+        return execution
+
+    async def stop(self):
+        for rig_id in list(self.executions):
+            await self.cancel(rig_id)
+
+    def snapshot(self) -> dict:
+        statuses: Dict[str, int] = {}
+        for execution in self.executions.values():
+            statuses[execution.status] = statuses.get(execution.status, 0) + 1
+        cache = compile_duty.cache_info()
+        return {
+            "rigs": statuses,
+            "jitter_ms": self.jitter.to_dict(),
+            "plan_cache": {"hits": cache.hits, "misses": cache.misses, "size": cache.currsize},
+        }
+
+
+duty_sequencer = DutySequencer()
@@ -0,0 +1,262 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+LIVE_QUEUE_FRAMES = int(os.getenv("LIVE_QUEUE_FRAMES", 8))
+LIVE_MAX_PX = int(os.getenv("LIVE_MAX_PX", 4096))
+
+# Live frame layout (all little-endian):
+#   magic "MCBL" | version u8 | kind u8 | channels u8 | flags u8 |
+#   sequence u32 | first_sample u64 | samples_per_bucket u32 | buckets u32 | payload
+# Waveform payload: float32 (channels, buckets, 2), i.e. min then max per
+# bucket, already scaled to engineering units. Status payload: UTF-8 JSON.
+LIVE_MAGIC = b"MCBL"
+LIVE_VERSION = 1
+LIVE_HEADER = struct.Struct("<4sBBBBIQII")
+
+KIND_WAVEFORM = 1
+KIND_STATUS = 2
+
+# Set on the first frame a client receives after frames were dropped for it
+FLAG_GAP = 0x01
+
+
+def decimate_minmax(samples: np.ndarray, samples_per_bucket: int) -> np.ndarray:
+    """(channels, n) samples to (channels, n // samples_per_bucket, 2) min/max pairs"""
+    channels, count = samples.shape
+    buckets = count // samples_per_bucket
+    blocks = samples[:, :buckets * samples_per_bucket].reshape(channels, buckets, samples_per_bucket)
+    return np.stack([blocks.min(axis=2), blocks.max(axis=2)], axis=-1)
+
+
+def encode_live_frame(
+    kind: int, sequence: int, payload: bytes, channels: int = 0,
+    first_sample: int = 0, samples_per_bucket: int = 0, buckets: int = 0, flags: int = 0,
+) -> bytes:
+    header = LIVE_HEADER.pack(
+        LIVE_MAGIC, LIVE_VERSION, kind, channels, flags, sequence, first_sample, samples_per_bucket, buckets
+    )
+    return header + payload
+
+
+def with_flags(frame: bytes, flags: int) -> bytes:
+    """Copy of an encoded frame with extra flag bits set"""
+    offset = 7
+    return frame[:offset] + bytes([frame[offset] | flags]) + frame[offset + 1:]
+
+
+class Decimator:
+    """Min/max decimation at one resolution, carrying partial buckets across blocks"""
+
+    def __init__(self, samples_per_bucket: int, scale: Optional[List[float]] = None):
+        self.samples_per_bucket = samples_per_bucket
+        self.scale = np.asarray(scale, dtype=np.float32)[:, None, None] if scale else None
+        self._pending: Optional[np.ndarray] = None
+        self._pending_start = 0
+
+    def feed(self, start_sample: int, samples: np.ndarray):
+        """Returns (first_sample, (channels, buckets, 2) float32) or None if no bucket closed"""
+        pending = self._pending
+        if pending is not None and self._pending_start + pending.shape[1] == start_sample:
+            samples = np.concatenate([pending, samples], axis=1)
+            start_sample = self._pending_start
+        # A gap in start_sample discards the partial bucket
+
+        buckets = samples.shape[1] // self.samples_per_bucket
+        used = buckets * self.samples_per_bucket
+        self._pending = samples[:, used:].copy() if used < samples.shape[1] else None
+        self._pending_start = start_sample + used
+        if buckets == 0:
+            return None
+
+        decimated = decimate_minmax(samples, self.samples_per_bucket).astype(np.float32)
+        if self.scale is not None:
+            decimated *= self.scale
+            # A negative scale swaps which end of the bucket is the minimum
+            decimated.sort(axis=2)
+        return start_sample, decimated
+
+
+class LiveSubscriber:
+    """One viewer's bounded send queue
+
+    publish() never waits: when the queue is full the oldest waveform frame
+    is dropped, so a slow browser only loses resolution in time and never
+    holds up ingest or other viewers. Status frames are never dropped.
+    """
+
+    def __init__(self, samples_per_bucket: int, max_frames: int = LIVE_QUEUE_FRAMES):
+        self.samples_per_bucket = samples_per_bucket
+        self.max_frames = max(1, max_frames)
+        self.sent = 0
+        self.dropped = 0
+        self._frames: Deque[tuple] = deque()
+        self._ready = asyncio.Event()
+        self._gap = False
+        self.closed = False
+
+    def publish(self, kind: int, frame: bytes):
+        if len(self._frames) >= self.max_frames:
+            for index, (queued_kind, _) in enumerate(self._frames):
+                if queued_kind == KIND_WAVEFORM:
+                    del self._frames[index]
+                    self.dropped += 1
+                    self._gap = True
+                    break
+            else:
+                if kind == KIND_WAVEFORM:
+                    self.dropped += 1
+                    self._gap = True
+                    return
+        self._frames.append((kind, frame))
+        self._ready.set()
+
+    async def next_frame(self) -> Optional[bytes]:
+        """Wait for the next frame; None once the subscriber is closed"""
+        while not self._frames:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        kind, frame = self._frames.popleft()
+        if kind == KIND_WAVEFORM and self._gap:
+            self._gap = False
+            frame = with_flags(frame, FLAG_GAP)
+        self.sent += 1
+        return frame
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+
+class RunFeed:
+    """Live subscribers of one run; frames are decimated and encoded once per resolution"""
+
+    def __init__(self, run: dict):
+        self.run_id = run["_id"]
+        self.scale = run.get("scale")
+        self.subscribers: List[LiveSubscriber] = []
+        self._decimators: Dict[int, Decimator] = {}
+        self.sequence = 0
+
+    def _next_sequence(self) -> int:
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        return self.sequence
+
+    def add(self, subscriber: LiveSubscriber):
+        self.subscribers.append(subscriber)
+        if subscriber.samples_per_bucket not in self._decimators:
+            self._decimators[subscriber.samples_per_bucket] = Decimator(subscriber.samples_per_bucket, self.scale)
+
+    def remove(self, subscriber: LiveSubscriber):
+        if subscriber in self.subscribers:
+            self.subscribers.remove(subscriber)
+        if not any(s.samples_per_bucket == subscriber.samples_per_bucket for s in self.subscribers):
+            self._decimators.pop(subscriber.samples_per_bucket, None)
+
+    def publish_samples(self, start_sample: int, samples: np.ndarray) -> int:
+        frames = {}
+        for samples_per_bucket, decimator in self._decimators.items():
+            decimated = decimator.feed(start_sample, samples)
+            if decimated is None:
+                continue
+            first_sample, values = decimated
+            channels, buckets, _ = values.shape
+            frames[samples_per_bucket] = encode_live_frame(
+                KIND_WAVEFORM, self._next_sequence(), values.tobytes(),
+                channels, first_sample, samples_per_bucket, buckets,
+            )
+        for subscriber in self.subscribers:
+            frame = frames.get(subscriber.samples_per_bucket)
+            if frame is not None:
+                subscriber.publish(KIND_WAVEFORM, frame)
+        return len(frames)
+
+    def status_frame(self, status: dict) -> bytes:
+        return encode_live_frame(KIND_STATUS, self._next_sequence(), json.dumps(status, default=str).encode())
+
+    def publish_status(self, status: dict):
+        frame = self.status_frame(status)
+        for subscriber in self.subscribers:
+            subscriber.publish(KIND_STATUS, frame)
+
+
+class LiveTelemetryHub:
+    """Fans ingest blocks out to the dashboards watching each run
+
+    Publishing to a run nobody watches is a dict miss. Feeds live in this
+    process only, so viewers must reach the worker that ingests the run.
+    """
+
+    def __init__(self, max_px: int = LIVE_MAX_PX, queue_frames: int = LIVE_QUEUE_FRAMES):
+        self.max_px = max_px
+        self.queue_frames = queue_frames
+        self.feeds: Dict[str, RunFeed] = {}
+        self.frames_published = 0
+
+    def resolution(self, run: dict, px: int, window_s: float) -> int:
+        """Samples per bucket so that window_s seconds span px buckets"""
+        px = min(max(1, px), self.max_px)
+        return max(1, int(run["sample_rate"] * window_s / px))
+
+    def subscribe(self, run: dict, samples_per_bucket: int, status: Optional[dict] = None) -> LiveSubscriber:
+        """Register a viewer; status, if given, is queued as its first frame"""
+        feed = self.feeds.get(run["_id"])
+        if feed is None:
+            feed = self.feeds[run["_id"]] = RunFeed(run)
+        subscriber = LiveSubscriber(samples_per_bucket, self.queue_frames)
+        if status is not None:
+            subscriber.publish(KIND_STATUS, feed.status_frame(status))
+        feed.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, run_id: str, subscriber: LiveSubscriber):
+        subscriber.close()
+        feed = self.feeds.get(run_id)
+        if feed is None:
+            return
+        feed.remove(subscriber)
+        if not feed.subscribers:
+            del self.feeds[run_id]
+
+    def publish_samples(self, run_id: str, start_sample: int, samples: np.ndarray):
+        feed = self.feeds.get(run_id)
+        if feed is not None:
+            self.frames_published += feed.publish_samples(start_sample, samples)
+
+    def publish_status(self, run_id: str, status: dict):
+        feed = self.feeds.get(run_id)
+        if feed is not None:
+            feed.publish_status(status)
+            self.frames_published += 1
+
+    def samples_listener(self, run_id: str) -> Callable[[int, np.ndarray], None]:
+        """Callback for IngestSession that forwards each decoded frame"""
+        return lambda start_sample, samples: self.publish_samples(run_id, start_sample, samples)
+
+    def snapshot(self) -> dict:
+        subscribers = [s for feed in self.feeds.values() for s in feed.subscribers]
+        return {
+            "runs": len(self.feeds),
+            "subscribers": len(subscribers),
+            "frames_published": self.frames_published,
+            "frames_sent": sum(s.sent for s in subscribers),
+            "frames_dropped": sum(s.dropped for s in subscribers),
+            "queued": sum(len(s) for s in subscribers),
+        }
+
+
+live_telemetry = LiveTelemetryHub()
@@ -0,0 +1,571 @@
+import asyncio
+import csv
+import hashlib
+import html
+import io
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from app.database.operations import TestResultRepository
+from app.services.settings_catalog import settings_catalog
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", "report_cache")
+REPORT_CACHE_MAX_BYTES = int(os.getenv("REPORT_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+REPORT_BATCH_SIZE = int(os.getenv("REPORT_BATCH_SIZE", 500))
+REPORT_MAX_JOBS = int(os.getenv("REPORT_MAX_JOBS", 2))
+REPORT_JOB_RETENTION_SECONDS = float(os.getenv("REPORT_JOB_RETENTION_SECONDS", 3600))
+
+# Bump when any format's layout changes so cached reports are regenerated
+REPORT_LAYOUT_VERSION = 1
+REPORT_TITLE = "IEC 60898-1 Short-Circuit Compliance Report"
+
+COLUMNS = (
+    ("run_id", "Run"),
+    ("setting_id", "Setting"),
+    ("mcbModel", "MCB model"),
+    ("testDesignation", "Test"),
+    ("analyzed_at", "Analyzed (UTC)"),
+    ("peak_current_A", "Peak (A)"),
+    ("i2t_A2s", "I²t (A²s)"),
+    ("pre_arcing_time_s", "Pre-arc (ms)"),
+    ("arcing_time_s", "Arcing (ms)"),
+    ("break_time_s", "Break (ms)"),
+    ("power_factor", "cos φ"),
+    ("recovery_voltage_V", "Recovery (V)"),
+    ("verdict", "Verdict"),
+)
+MILLISECOND_FIELDS = ("pre_arcing_time_s", "arcing_time_s", "break_time_s")
+
+
+@dataclass(frozen=True)
+class ReportQuery:
+    """Which stored results a report covers"""
+    setting_id: Optional[str] = None
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    passed: Optional[bool] = None
+
+    def filter(self) -> dict:
+        query = {}
+        if self.setting_id:
+            query["setting_id"] = self.setting_id
+        if self.since or self.until:
+            query["analyzed_at"] = {}
+            if self.since:
+                query["analyzed_at"]["$gte"] = self.since
+            if self.until:
+                query["analyzed_at"]["$lt"] = self.until
+        if self.passed is not None:
+            query["passed"] = self.passed
+        return query
+
+    def to_dict(self) -> dict:
+        return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in asdict(self).items()}
+
+
+def report_row(document: dict) -> List[str]:
+    """One stored result as display strings, in COLUMNS order"""
+    result = document.get("result") or {}
+    setting = settings_catalog.get(document.get("setting_id")) or {}
+    cells = []
+    for field, _ in COLUMNS:
+        if field == "verdict":
+            value = "PASS" if document.get("passed") else "FAIL"
+        elif field in ("run_id", "setting_id"):
+            value = document.get(field) or ""
+        elif field in ("mcbModel", "testDesignation"):
+            value = setting.get(field, "")
+        elif field == "analyzed_at":
+            analyzed = document.get("analyzed_at")
+            value = analyzed.strftime("%Y-%m-%d %H:%M:%S") if analyzed else ""
+        else:
+            number = result.get(field)
+            if number is None:
+                value = ""
+            elif field in MILLISECOND_FIELDS:
+                value = f"{number * 1000:.2f}"
+            elif field == "power_factor":
+                value = f"{number:.3f}"
+            else:
+                value = f"{number:.1f}"
+        cells.append(str(value))
+    return cells
+
+
+class ReportSummary:
+    def __init__(self):
+        self.rows = 0
+        self.passed = 0
+
+    def add(self, document: dict):
+        self.rows += 1
+        self.passed += bool(document.get("passed"))
+
+    @property
+    def compliance_rate(self) -> float:
+        return round(100.0 * self.passed / self.rows, 1) if self.rows else 0.0
+
+    def lines(self) -> List[str]:
+        return [
+            f"Results: {self.rows}",
+            f"Passed: {self.passed}",
+            f"Failed: {self.rows - self.passed}",
+            f"Compliance rate: {self.compliance_rate}%",
+        ]
+
+
+class CsvReportWriter:
+    media_type = "text/csv"
+    extension = "csv"
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._csv = csv.writer(self._buffer)
+
+    def _drain(self) -> bytes:
+        text = self._buffer.getvalue()
+        self._buffer.seek(0)
+        self._buffer.truncate()
+        return text.encode("utf-8")
+
+    def begin(self, meta: List[str]) -> bytes:
+        self._buffer.write("\ufeff")  # lets spreadsheet apps detect UTF-8
+        self._csv.writerow([label for _, label in COLUMNS])
+        return self._drain()
+
+    def write(self, rows: List[List[str]]) -> bytes:
+        self._csv.writerows(rows)
+        return self._drain()
+
+    def end(self, summary: ReportSummary) -> bytes:
+        self._csv.writerow([])
+        for line in summary.lines():
+            self._csv.writerow([f"# {line}"])
+        return self._drain()
+
+
+class HtmlReportWriter:
+    media_type = "text/html"
+    extension = "html"
+
+    def begin(self, meta: List[str]) -> bytes:
+        header = "".join(f"<th>{html.escape(label)}</th>" for _, label in COLUMNS)
+        details = "".join(f"<li>{html.escape(line)}</li>" for line in meta)
+        return (
+            "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\">"
+            f"<title>{html.escape(REPORT_TITLE)}</title>"
+            "<style>body{font-family:sans-serif;font-size:12px}table{border-collapse:collapse}"
+            "th,td{border:1px solid #ccc;padding:2px 6px}td.FAIL{color:#b00020;font-weight:bold}</style>"
+            f"</head><body><h1>{html.escape(REPORT_TITLE)}</h1><ul>{details}</ul>"
+            f"<table><thead><tr>{header}</tr></thead><tbody>\n"
+        ).encode("utf-8")
+
+    def write(self, rows: List[List[str]]) -> bytes:
+        lines = []
+        for row in rows:
+            cells = "".join(f"<td>{html.escape(cell)}</td>" for cell in row[:-1])
+            lines.append(f"<tr>{cells}<td class=\"{row[-1]}\">{row[-1]}</td></tr>\n")
+        return "".join(lines).encode("utf-8")
+
+    def end(self, summary: ReportSummary) -> bytes:
+        items = "".join(f"<li>{html.escape(line)}</li>" for line in summary.lines())
+        return f"</tbody></table><h2>Summary</h2><ul>{items}</ul></body></html>\n".encode("utf-8")
+
+
+class PdfReportWriter:
+    """Minimal text-only PDF written page by page
+
+    Objects are emitted as soon as a page fills up and their byte offsets
+    are kept for the cross-reference table, so memory holds one page of
+    rows whatever the report size. The page tree object is written last,
+    when every page is known.
+    """
+
+    media_type = "application/pdf"
+    extension = "pdf"
+
+    PAGE_WIDTH = 842  # A4 landscape, in points
+    PAGE_HEIGHT = 595
+    MARGIN = 30
+    FONT_SIZE = 7
+    LINE_HEIGHT = 10
+    WIDTHS = (120, 105, 75, 95, 70, 40, 50, 40, 40, 40, 30, 45, 32)
+
+    def __init__(self):
+        self._offset = 0
+        self._offsets: Dict[int, int] = {}
+        self._pages: List[int] = []
+        self._next_id = 5  # 1 catalog, 2 page tree, 3 and 4 fonts
+        self._lines: List[str] = []
+        self._y = 0.0
+
+    @staticmethod
+    def _text(value: str) -> str:
+        # The standard fonts only cover WinAnsi; spell out the one Greek letter used
+        encoded = value.replace("φ", "phi").encode("cp1252", errors="replace").decode("latin-1")
+        return encoded.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+    def _object(self, number: int, body: bytes) -> bytes:
+        data = f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+        self._offsets[number] = self._offset
+        self._offset += len(data)
+        return data
+
+    def _emit(self, data: bytes) -> bytes:
+        self._offset += len(data)
+        return data
+
+    def _new_page(self):
+        self._lines = ["BT", f"/F1 {self.FONT_SIZE} Tf"]
+        self._y = self.PAGE_HEIGHT - self.MARGIN
+        self._line([label for _, label in COLUMNS], bold=True)
+
+    def _line(self, cells: List[str], bold: bool = False):
+        self._y -= self.LINE_HEIGHT
+        x = self.MARGIN
+        self._lines.append(f"/F{2 if bold else 1} {self.FONT_SIZE} Tf")
+        for cell, width in zip(cells, self.WIDTHS):
+            limit = max(1, int(width / (self.FONT_SIZE * 0.5)))
+            text = cell if len(cell) <= limit else cell[:limit - 1] + "…"
+            self._lines.append(f"1 0 0 1 {x} {self._y:.0f} Tm ({self._text(text)}) Tj")
+            x += width
+
+    def _page_full(self) -> bool:
+        return self._y - self.LINE_HEIGHT < self.MARGIN
+
+    def _flush_page(self) -> bytes:
+        self._lines.append("ET")
+        stream = "\n".join(self._lines).encode("latin-1")
+        content_id, page_id = self._next_id, self._next_id + 1
+        self._next_id += 2
+        self._pages.append(page_id)
+        data = self._object(content_id, f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+        data += self._object(page_id, (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {self.PAGE_WIDTH} {self.PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode())
+        self._lines = []
+        return data
+
+    def begin(self, meta: List[str]) -> bytes:
+        data = self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        data += self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        data += self._object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        data += self._object(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+        self._lines = ["BT"]
+        self._y = self.PAGE_HEIGHT - self.MARGIN - 6
+        self._lines.append(f"/F2 14 Tf 1 0 0 1 {self.MARGIN} {self._y:.0f} Tm ({self._text(REPORT_TITLE)}) Tj")
+        self._y -= 8
+        for line in meta:
+            self._y -= self.LINE_HEIGHT
+            self._lines.append(f"/F1 {self.FONT_SIZE + 1} Tf 1 0 0 1 {self.MARGIN} {self._y:.0f} Tm ({self._text(line)}) Tj")
+        self._y -= self.LINE_HEIGHT
+        self._line([label for _, label in COLUMNS], bold=True)
+        return data
+
+    def write(self, rows: List[List[str]]) -> bytes:
+        data = b""
+        for row in rows:
+            if self._page_full():
+                data += self._flush_page()
+                self._new_page()
+            self._line(row)
+        return data
+
+    def end(self, summary: ReportSummary) -> bytes:
+        data = b""
+        lines = ["", "Summary"] + summary.lines()
+        for line in lines:
+            if self._page_full():
+                data += self._flush_page()
+                self._lines = ["BT"]
+                self._y = self.PAGE_HEIGHT - self.MARGIN
+            self._y -= self.LINE_HEIGHT
+            self._lines.append(f"/F1 {self.FONT_SIZE + 1} Tf 1 0 0 1 {self.MARGIN} {self._y:.0f} Tm ({self._text(line)}) Tj")
+        data += self._flush_page()
+        kids = " ".join(f"{page} 0 R" for page in self._pages)
+        data += self._object(2, f"<< /Type /Pages /Kids [{kids}] /Count {len(self._pages)} >>".encode())
+
+        xref_offset = self._offset
+        entries = ["0000000000 65535 f "] + [f"{self._offsets[number]:010d} 00000 n " for number in range(1, self._next_id)]
+        data += self._emit((
+            f"xref\n0 {self._next_id}\n" + "\n".join(entries) + "\n"
+            f"trailer\n<< /Size {self._next_id} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n"
+        ).encode())
+        return data
+
+
+WRITERS = {"csv": CsvReportWriter, "html": HtmlReportWriter, "pdf": PdfReportWriter}
+
+
+async def report_key(database, query: ReportQuery, report_format: str) -> str:
+    """Content address of a report: its inputs, the data it covers and the settings version"""
+    fingerprint = await TestResultRepository.for_database(database).fingerprint(query.filter())
+    material = {
+        "layout": REPORT_LAYOUT_VERSION,
+        "format": report_format,
+        "query": query.to_dict(),
+        "results": fingerprint,
+        "settings_version": settings_catalog.version,
+    }
+    return hashlib.sha256(json.dumps(material, sort_keys=True, default=str).encode()).hexdigest()
+
+
+async def generate_report(
+    database,
+    query: ReportQuery,
+    report_format: str,
+    progress: Optional[Callable[[int], None]] = None,
+) -> AsyncIterator[bytes]:
+    """Report bytes, produced one cursor batch at a time"""
+    writer = WRITERS[report_format]()
+    summary = ReportSummary()
+    meta = [
+        f"Generated: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} UTC",
+        f"Filter: {json.dumps({k: v for k, v in query.to_dict().items() if v is not None}) or 'all results'}",
+        f"Settings catalog version: {settings_catalog.version}",
+    ]
+    yield writer.begin(meta)
+
+    batch = []
+    async for document in TestResultRepository.for_database(database).iter_analyzed(query.filter(), REPORT_BATCH_SIZE):
+        summary.add(document)
+        batch.append(report_row(document))
+        if len(batch) == REPORT_BATCH_SIZE:
+            yield writer.write(batch)
+            batch = []
+            if progress is not None:
+                progress(summary.rows)
+    if batch:
+        yield writer.write(batch)
+    if progress is not None:
+        progress(summary.rows)
+    yield writer.end(summary)
+
+
+class ReportCache:
+    """Finished reports on disk, named by their content address
+
+    Files are written under a temporary name and renamed once complete, so
+    a reader never sees a partial report. Least recently used files are
+    removed once the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory: str = REPORT_CACHE_DIR, max_bytes: int = REPORT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def path(self, key: str, report_format: str) -> str:
+        return os.path.join(self.directory, f"{key}.{WRITERS[report_format].extension}")
+
+    def get(self, key: str, report_format: str) -> Optional[str]:
+        path = self.path(key, report_format)
+        try:
+            os.utime(path)  # marks it recently used
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    async def store(self, key: str, report_format: str, chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+        """Pass chunks through while writing them to the cache; kept only if all of them arrive"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(key, report_format)
+        temporary = f"{path}.{uuid.uuid4().hex}.part"
+        complete = False
+        try:
+            with open(temporary, "wb") as file:
+                async for chunk in chunks:
+                    file.write(chunk)
+                    yield chunk
+            os.replace(temporary, path)
+            complete = True
+        finally:
+            if not complete:
+                try:
+                    os.remove(temporary)
+                except FileNotFoundError:
+                    pass
+        self.evict()
+
+    def _files(self) -> List[os.DirEntry]:
+        try:
+            return [entry for entry in os.scandir(self.directory) if entry.is_file() and not entry.name.endswith(".part")]
+        except FileNotFoundError:
+            return []
+
+    def evict(self):
+        files = sorted(self._files(), key=lambda entry: entry.stat().st_mtime)
+        total = sum(entry.stat().st_size for entry in files)
+        for entry in files:
+            if total <= self.max_bytes:
+                break
+            total -= entry.stat().st_size
+            try:
+                os.remove(entry.path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+
+    def snapshot(self) -> dict:
+        files = self._files()
+        return {
+            "directory": self.directory,
+            "files": len(files),
+            "bytes": sum(entry.stat().st_size for entry in files),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+report_cache = ReportCache()
+
+
+class ReportJob:
+    def __init__(self, key: str, report_format: str, query: ReportQuery, requested_by: str):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.format = report_format
+        self.query = query
+        self.requested_by = requested_by
+        self.status = "queued"
+        self.rows_done = 0
+        self.rows_total: Optional[int] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def path(self) -> str:
+        return report_cache.path(self.key, self.format)
+
+    def to_dict(self) -> dict:
+        progress = None
+        if self.status == "completed":
+            progress = 100.0
+        elif self.rows_total:
+            progress = round(100.0 * min(self.rows_done, self.rows_total) / self.rows_total, 1)
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "format": self.format,
+            "query": self.query.to_dict(),
+            "rows_done": self.rows_done,
+            "rows_total": self.rows_total,
+            "progress_pct": progress,
+            "error": self.error,
+            "created_at": datetime.utcfromtimestamp(self.created_at).isoformat(),
+            "finished_at": datetime.utcfromtimestamp(self.finished_at).isoformat() if self.finished_at else None,
+        }
+
+
+class ReportJobs:
+    """Background report generation with progress polling
+
+    At most max_concurrent reports are generated at once; later jobs wait
+    as "queued". A job whose report is already cached completes at
+    submission, and a job identical to one still running is joined instead
+    of started again. Jobs live in this worker's memory, so poll the
+    worker that accepted the job or use the cached file it leaves behind.
+    """
+
+    def __init__(self, max_concurrent: int = REPORT_MAX_JOBS, retention: float = REPORT_JOB_RETENTION_SECONDS):
+        self.retention = retention
+        self.jobs: Dict[str, ReportJob] = {}
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self.completed = 0
+        self.failed = 0
+        self.cached = 0
+
+    def _prune(self):
+        expiry = time.time() - self.retention
+        for job_id, job in list(self.jobs.items()):
+            if job.finished_at is not None and job.finished_at < expiry:
+                del self.jobs[job_id]
+
+    async def submit(self, database, query: ReportQuery, report_format: str, requested_by: str) -> ReportJob:
+        self._prune()
+        key = await report_key(database, query, report_format)
+        for job in self.jobs.values():
+            if job.key == key and job.status in ("queued", "running"):
+                return job
+
+        job = ReportJob(key, report_format, query, requested_by)
+        self.jobs[job.id] = job
+        if report_cache.get(key, report_format) is not None:
+            job.status = "completed"
+            job.finished_at = time.time()
+            self.cached += 1
+        else:
+            job.task = asyncio.create_task(self._run(database, job))
+        return job
+
+    async def _run(self, database, job: ReportJob):
+        async with self._slots:
+            job.status = "running"
+            try:
+                job.rows_total = await TestResultRepository.for_database(database).count_matching(job.query.filter())
+
+                def progress(rows: int):
+                    job.rows_done = rows
+
+                async for _ in report_cache.store(
+                    job.key, job.format, generate_report(database, job.query, job.format, progress)
+                ):
+                    pass
+                job.status = "completed"
+                self.completed += 1
+            except asyncio.CancelledError:
+                job.status = "cancelled"
+                raise
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+                self.failed += 1
+                logger.error(f"Report job {job.id} failed: {e}")
+            finally:
+                job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[ReportJob]:
+        return self.jobs.get(job_id)
+
+    async def stop(self):
+        tasks = [job.task for job in self.jobs.values() if job.task is not None and not job.task.done()]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def snapshot(self) -> dict:
+        statuses: Dict[str, int] = {}
+        for job in self.jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "jobs": statuses,
+            "completed": self.completed,
+            "failed": self.failed,
+            "served_from_cache": self.cached,
+            "cache": report_cache.snapshot(),
+        }
+
+
+report_jobs = ReportJobs()
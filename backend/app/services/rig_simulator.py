@@ -0,0 +1,207 @@
+import math
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.duty_sequencer import CLOSE_OPEN, compile_duty
+from app.services.waveform_ingest import FRAME_HEADER, FRAME_MAGIC, FRAME_VERSION, DTYPE_NAMES
+
+LINE_FREQUENCY_HZ = 50.0
+SIMULATED_CHANNELS = ("voltage", "current", "source_voltage")
+
+# Breaker model defaults, in seconds unless noted
+PRE_FAULT_S = 0.02
+POST_CLEAR_S = 0.04
+PRE_ARCING_S = (0.0015, 0.004)
+ARCING_S = (0.002, 0.006)
+ARC_VOLTAGE_V = (60.0, 180.0)
+# The MCB closes onto the fault itself during CO, adding a contact bounce delay
+CO_CLOSING_DELAY_S = 0.001
+# Calibration shots replace the MCB with a link; the making switch opens after this long
+CALIBRATION = "calibration"
+CALIBRATION_S = 0.1
+NOISE_FRACTION = 0.002
+
+
+class ShotParameters:
+    """Random breaker behaviour for one operation, drawn once so shots are reproducible"""
+
+    __slots__ = ("closing_angle", "pre_arcing_s", "arcing_s", "arc_voltage_v")
+
+    def __init__(self, rng: np.random.Generator):
+        self.closing_angle = rng.uniform(0, 2 * math.pi)
+        self.pre_arcing_s = rng.uniform(*PRE_ARCING_S)
+        self.arcing_s = rng.uniform(*ARCING_S)
+        self.arc_voltage_v = rng.uniform(*ARC_VOLTAGE_V)
+
+
+def synthesize_shot(
+    setting: dict,
+    sample_rate: float,
+    operation: str = "O",
+    channels: Sequence[str] = SIMULATED_CHANNELS,
+    rng: Optional[np.random.Generator] = None,
+    parameters: Optional[ShotParameters] = None,
+) -> np.ndarray:
+    """One short-circuit operation as a (channels, n) float32 array
+
+    The prospective current follows the RL transient for the setting's
+    power factor: a symmetrical component plus a DC offset decaying with
+    tau = L/R = tan(phi) / omega, set by the closing angle. The MCB starts
+    arcing after its pre-arcing time; the arc voltage drives the current
+    to zero over the arcing time, after which the recovery voltage appears
+    across the contacts. operation="calibration" keeps the circuit closed
+    for CALIBRATION_S so the achieved power factor can be measured.
+    Unknown channel names are filled with noise.
+    """
+    rng = rng or np.random.default_rng()
+    parameters = parameters or ShotParameters(rng)
+    omega = 2 * math.pi * LINE_FREQUENCY_HZ
+    phi = math.acos(min(1.0, max(0.0, setting.get("powerFactor_cos_phi", 1.0))))
+    tau = math.tan(phi) / omega
+    current_rms = setting.get("prospectiveCurrent_A", 0)
+    source_peak = math.sqrt(2) * setting.get("testVoltage_V", 230)
+    recovery_peak = math.sqrt(2) * setting.get("recoveryVoltage_V", setting.get("testVoltage_V", 230))
+
+    fault_start = PRE_FAULT_S + (CO_CLOSING_DELAY_S if operation == CLOSE_OPEN else 0.0)
+    if operation == CALIBRATION:
+        separation = fault_start + CALIBRATION_S
+        clearing = separation + 1 / sample_rate
+    else:
+        separation = fault_start + parameters.pre_arcing_s
+        clearing = separation + parameters.arcing_s
+    samples = int(round((clearing + POST_CLEAR_S) * sample_rate))
+    t = np.arange(samples) / sample_rate
+
+    # Source voltage phase chosen so the fault starts at the closing angle
+    psi = parameters.closing_angle
+    phase = omega * (t - fault_start) + psi
+    source = source_peak * np.sin(phase)
+
+    since_fault = np.maximum(t - fault_start, 0.0)
+    prospective = math.sqrt(2) * current_rms * (
+        np.sin(phase - phi) - math.sin(psi - phi) * (np.exp(-since_fault / tau) if tau > 0 else 0.0)
+    )
+    # Arc quenching: the current collapses linearly to zero over the arcing time
+    quench = np.clip((clearing - t) / (clearing - separation), 0.0, 1.0)
+    current = np.where(t < fault_start, 0.0, prospective * np.where(t < separation, 1.0, quench))
+
+    conducting = (t >= fault_start) & (t < separation)
+    arcing = (t >= separation) & (t < clearing)
+    recovered = t >= clearing
+    arc = (0.0 if operation == CALIBRATION else parameters.arc_voltage_v) * np.sign(current)
+    voltage = np.select(
+        [conducting, arcing, recovered],
+        [0.0, arc, recovery_peak * np.sin(phase)],
+        default=0.0,
+    )
+
+    known = {"voltage": voltage, "current": current, "source_voltage": source}
+    output = np.empty((len(channels), samples), dtype=np.float32)
+    for index, name in enumerate(channels):
+        signal = known.get(name)
+        scale = NOISE_FRACTION * max(source_peak, math.sqrt(2) * current_rms if name == "current" else 0.0)
+        noise = rng.standard_normal(samples, dtype=np.float32) * scale
+        output[index] = noise if signal is None else signal + noise
+    return output
+
+
+def quantize(samples: np.ndarray, full_scale: Sequence[float]) -> np.ndarray:
+    """Float samples to int16 ADC counts; full_scale is the value of 32767 per channel"""
+    scale = np.asarray(full_scale, dtype=np.float32)[:, None] / 32767
+    return np.clip(np.rint(samples / scale), -32768, 32767).astype(np.int16)
+
+
+class RigSimulator:
+    """Local stand-in for the acquisition hardware
+
+    Synthesizes every operation of the setting's operating duty and
+    encodes it with the ingest frame protocol. Payload bytes are produced
+    once per shot, so streaming repeated shots only packs a header per
+    frame, fast enough to saturate the ingest path from one process.
+    """
+
+    def __init__(
+        self,
+        setting: dict,
+        sample_rate: float = 1_000_000,
+        channels: Sequence[str] = SIMULATED_CHANNELS,
+        dtype: str = "float32",
+        frame_samples: int = 16384,
+        seed: Optional[int] = None,
+    ):
+        self.setting = setting
+        self.sample_rate = sample_rate
+        self.channels = list(channels)
+        self.dtype = dtype
+        self.frame_samples = frame_samples
+        self.rng = np.random.default_rng(seed)
+        self._payloads: Dict[int, List[bytes]] = {}
+        self.scale: Optional[List[float]] = None
+        if dtype == "int16":
+            current_peak = 2 * math.sqrt(2) * max(setting.get("prospectiveCurrent_A", 0), 1)
+            voltage_peak = 1.2 * math.sqrt(2) * max(setting.get("testVoltage_V", 230), setting.get("recoveryVoltage_V", 0))
+            full_scale = [current_peak if name == "current" else voltage_peak for name in self.channels]
+            self.scale = [value / 32767 for value in full_scale]
+            self._full_scale = full_scale
+
+    @property
+    def operations(self) -> List[str]:
+        return [step.operation for step in compile_duty(self.setting["operatingDuty"]).steps]
+
+    def run_options(self, operation: Optional[str] = None) -> dict:
+        """Body for POST /api/runs matching what this simulator streams"""
+        return {
+            "setting_id": self.setting["_id"],
+            "sample_rate": self.sample_rate,
+            "channels": self.channels,
+            "dtype": self.dtype,
+            "scale": self.scale,
+            "notes": f"simulated {operation}" if operation else "simulated",
+        }
+
+    def shot(self, operation: str = "O") -> np.ndarray:
+        samples = synthesize_shot(self.setting, self.sample_rate, operation, self.channels, self.rng)
+        return quantize(samples, self._full_scale) if self.dtype == "int16" else samples
+
+    def payloads(self, samples: np.ndarray) -> List[bytes]:
+        """Planar payload bytes of each frame of a shot"""
+        return [
+            np.ascontiguousarray(samples[:, start:start + self.frame_samples]).tobytes()
+            for start in range(0, samples.shape[1], self.frame_samples)
+        ]
+
+    def _shot_payloads(self, shot: int) -> List[bytes]:
+        """Payloads of the duty's shot-th operation (wrapping), synthesized on first use"""
+        key = shot % len(self.operations)
+        cached = self._payloads.get(key)
+        if cached is None:
+            cached = self._payloads[key] = self.payloads(self.shot(self.operations[key]))
+        return cached
+
+    def frames(self, shots: Optional[int] = None, start_sample: int = 0, first_shot: int = 0) -> Iterator[bytes]:
+        """Encoded frames for `shots` operations (default: one pass of the duty)
+
+        Shots follow each other on one continuous sample clock, which makes
+        a load stream rather than one test: analysis expects one operation
+        per run, so use operation_frames() for runs that will be analyzed.
+        Beyond the duty's own operations, shots are re-sent with new start
+        samples instead of being synthesized again.
+        """
+        shots = len(self.operations) if shots is None else shots
+        dtype_code = DTYPE_NAMES[self.dtype]
+        itemsize = 2 if self.dtype == "int16" else 4
+        sequence = 0
+        for shot in range(first_shot, first_shot + shots):
+            for payload in self._shot_payloads(shot):
+                count = len(payload) // (itemsize * len(self.channels))
+                header = FRAME_HEADER.pack(
+                    FRAME_MAGIC, FRAME_VERSION, dtype_code, len(self.channels), 0, sequence, start_sample, count
+                )
+                yield header + payload
+                sequence = (sequence + 1) & 0xFFFFFFFF
+                start_sample += count
+
+    def operation_frames(self, shot: int) -> Iterator[bytes]:
+        """Encoded frames of the duty's shot-th operation alone, from sample 0, for a run of its own"""
+        return self.frames(1, first_shot=shot)
@@ -0,0 +1,226 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.database.operations import SETTING_CATALOG_FIELDS, SettingsRepository
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+SETTINGS_CATALOG_POLL_SECONDS = float(os.getenv("SETTINGS_CATALOG_POLL_SECONDS", 10))
+# Change events arriving within this window share one reload (e.g. an import's bulk_write)
+SETTINGS_CATALOG_DEBOUNCE_MS = float(os.getenv("SETTINGS_CATALOG_DEBOUNCE_MS", 250))
+
+CATALOG_META_COLLECTION = "catalog_meta"
+CATALOG_META_ID = "settings"
+
+
+def serialize(payload) -> bytes:
+    """Compact JSON bytes for a response body"""
+    return json.dumps(payload, default=str, separators=(",", ":")).encode()
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+async def bump_catalog_version(database) -> int:
+    """Signal every worker's catalog to reload; call after writing settings"""
+    meta = await database[CATALOG_META_COLLECTION].find_one_and_update(
+        {"_id": CATALOG_META_ID},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return meta["version"]
+
+
+class CachedBody:
+    """A serialized response body and its ETag"""
+
+    __slots__ = ("body", "etag")
+
+    def __init__(self, payload):
+        self.body = serialize(payload)
+        self.etag = make_etag(self.body)
+
+
+class SettingsCatalog:
+    """In-memory copy of the settings collection with secondary indexes.
+
+    Lookups by _id, mcbModel and testDesignation are dict reads. Response
+    bodies are serialized once per catalog version, so a poll that sends a
+    matching If-None-Match never serializes or queries anything. The catalog
+    reloads when the shared version counter in catalog_meta changes, or
+    shortly after change stream events when the deployment supports them;
+    a burst of events is coalesced into one reload.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = SETTINGS_CATALOG_POLL_SECONDS,
+        debounce_ms: float = SETTINGS_CATALOG_DEBOUNCE_MS,
+    ):
+        self.poll_interval = poll_interval
+        self.debounce = debounce_ms / 1000
+        self.by_id: Dict[str, dict] = {}
+        self.by_model: Dict[str, List[str]] = {}
+        self.by_designation: Dict[str, List[str]] = {}
+        self.version: Optional[int] = None
+        self.reloads = 0
+        self.change_events = 0
+        self._bodies: Dict[tuple, CachedBody] = {}
+        self._database = None
+        self._changed: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def load(self, settings: List[dict], version: Optional[int] = None):
+        """Replace the catalog contents and drop every cached body"""
+        by_id, by_model, by_designation = {}, {}, {}
+        for setting in sorted(settings, key=lambda s: str(s["_id"])):
+            setting_id = setting["_id"]
+            by_id[setting_id] = setting
+            by_model.setdefault(setting.get("mcbModel"), []).append(setting_id)
+            by_designation.setdefault(setting.get("testDesignation"), []).append(setting_id)
+
+        self.by_id, self.by_model, self.by_designation = by_id, by_model, by_designation
+        self.version = version
+        self._bodies = {}
+        self.reloads += 1
+
+    async def reload(self):
+        """Read the version counter and the whole settings collection"""
+        meta = await self._database[CATALOG_META_COLLECTION].find_one({"_id": CATALOG_META_ID})
+        version = meta["version"] if meta else 0
+        settings = await SettingsRepository.for_database(self._database).find({}, SETTING_CATALOG_FIELDS)
+        self.load(settings, version)
+        logger.info(f"Settings catalog loaded {len(self.by_id)} settings (version {version})")
+
+    def get(self, setting_id: str) -> Optional[dict]:
+        return self.by_id.get(setting_id)
+
+    def find(self, mcb_model: Optional[str] = None, test_designation: Optional[str] = None) -> List[dict]:
+        """Settings matching the given fields, answered from the secondary indexes"""
+        ids = None
+        if mcb_model is not None:
+            ids = self.by_model.get(mcb_model, [])
+        if test_designation is not None:
+            matching = self.by_designation.get(test_designation, [])
+            if ids is None:
+                ids = matching
+            else:
+                matching = set(matching)
+                ids = [i for i in ids if i in matching]
+        if ids is None:
+            ids = list(self.by_id)
+        return [self.by_id[i] for i in ids]
+
+    def list_body(self, mcb_model: Optional[str] = None, test_designation: Optional[str] = None) -> CachedBody:
+        """Serialized list response, built once per catalog version and filter
+
+        Only filters on values present in the catalog are cached, so the
+        cache is bounded by the catalog rather than by what clients send.
+        """
+        key = ("list", mcb_model, test_designation)
+        cached = self._bodies.get(key)
+        if cached is None:
+            settings = self.find(mcb_model, test_designation)
+            cached = CachedBody({
+                "success": True,
+                "data": settings,
+                "version": self.version,
+                "message": f"Retrieved {len(settings)} test settings",
+            })
+            if (mcb_model is None or mcb_model in self.by_model) and (
+                test_designation is None or test_designation in self.by_designation
+            ):
+                self._bodies[key] = cached
+        return cached
+
+    def item_body(self, setting_id: str) -> Optional[CachedBody]:
+        """Serialized single-setting response, built once per catalog version"""
+        key = ("item", setting_id)
+        cached = self._bodies.get(key)
+        if cached is None:
+            setting = self.by_id.get(setting_id)
+            if setting is None:
+                return None
+            cached = self._bodies[key] = CachedBody({
+                "success": True,
+                "data": setting,
+                "version": self.version,
+                "message": "Test setting retrieved successfully",
+            })
+        return cached
+
+    async def _poll_version(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                meta = await self._database[CATALOG_META_COLLECTION].find_one({"_id": CATALOG_META_ID})
+                if (meta["version"] if meta else 0) != self.version:
+                    await self.reload()
+            except PyMongoError as e:
+                logger.error(f"Settings catalog version check failed: {e}")
+
+    async def _reload_on_change(self):
+        """One reload per burst of change events, debounce seconds after the first"""
+        while True:
+            await self._changed.wait()
+            await asyncio.sleep(self.debounce)
+            # Events arriving during the reload below set the flag again and get one more
+            self._changed.clear()
+            try:
+                await self.reload()
+            except PyMongoError as e:
+                logger.error(f"Settings catalog reload after change events failed: {e}")
+
+    async def _watch_changes(self):
+        """Flag settings change events for reload; returns if change streams are unsupported"""
+        try:
+            async with self._database.settings.watch() as stream:
+                async for _ in stream:
+                    self.change_events += 1
+                    self._changed.set()
+        except OperationFailure as e:
+            logger.info(f"Change streams unavailable, settings catalog polls its version instead ({e.code})")
+        except PyMongoError as e:
+            logger.error(f"Settings change stream stopped, falling back to version polling: {e}")
+
+    async def start(self, database):
+        self._database = database
+        self._changed = asyncio.Event()
+        await self.reload()
+        self._tasks = [
+            asyncio.create_task(self._poll_version()),
+            asyncio.create_task(self._watch_changes()),
+            asyncio.create_task(self._reload_on_change()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    def snapshot(self) -> dict:
+        return {
+            "settings": len(self.by_id),
+            "version": self.version,
+            "reloads": self.reloads,
+            "change_events": self.change_events,
+            "cached_bodies": len(self._bodies),
+        }
+
+
+settings_catalog = SettingsCatalog()
@@ -0,0 +1,252 @@
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.waveform_codecs import decode_channel
+
+# Defaults for event detection
+DEFAULT_LINE_FREQUENCY_HZ = 50.0
+# Current below this fraction of the run's peak counts as "not conducting"
+CURRENT_THRESHOLD_FRACTION = 0.02
+# Length, as a fraction of a line cycle, of the blocks whose mean |i| confirms conduction
+CONDUCTION_BLOCK_CYCLES = 0.025
+# Voltage across the MCB above this means the contacts have separated and an arc burns
+ARC_VOLTAGE_THRESHOLD_V = 20.0
+
+# Verification tolerances against the settings entry
+POWER_FACTOR_TOLERANCE = 0.05
+RECOVERY_VOLTAGE_TOLERANCE = 0.05
+
+RESULT_FIELDS = (
+    "peak_current_A",
+    "i2t_A2s",
+    "fault_start_s",
+    "arc_start_s",
+    "clearing_s",
+    "pre_arcing_time_s",
+    "arcing_time_s",
+    "break_time_s",
+    "recovery_voltage_V",
+    "power_factor",
+    "cleared",
+)
+
+
+def stack_runs(arrays: Sequence[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pad 1-D captures of different lengths into a (runs, n) float64 array"""
+    lengths = np.array([len(a) for a in arrays], dtype=np.int64)
+    batch = np.zeros((len(arrays), int(lengths.max()) if len(arrays) else 0), dtype=np.float64)
+    for row, array in enumerate(arrays):
+        batch[row, :len(array)] = array
+    return batch, lengths
+
+
+def _first_true(mask: np.ndarray, default: np.ndarray) -> np.ndarray:
+    """Index of the first True per row, or default where a row has none"""
+    found = mask.any(axis=1)
+    return np.where(found, mask.argmax(axis=1), default)
+
+
+def _last_true(mask: np.ndarray, default: np.ndarray) -> np.ndarray:
+    """Index one past the last True per row, or default where a row has none"""
+    found = mask.any(axis=1)
+    return np.where(found, mask.shape[1] - mask[:, ::-1].argmax(axis=1), default)
+
+
+def _window_sum(cumulative: np.ndarray, start: np.ndarray, stop: np.ndarray) -> np.ndarray:
+    """Sum of the original values over [start, stop) per row, from a row-wise cumsum"""
+    rows = np.arange(cumulative.shape[0])
+    upper = np.where(stop > 0, cumulative[rows, np.maximum(stop - 1, 0)], 0.0)
+    lower = np.where(start > 0, cumulative[rows, np.maximum(start - 1, 0)], 0.0)
+    return np.where(stop > start, upper - lower, 0.0)
+
+
+def analyze_batch(
+    current: np.ndarray,
+    voltage: np.ndarray,
+    sample_rate: float,
+    lengths: Optional[np.ndarray] = None,
+    source_voltage: Optional[np.ndarray] = None,
+    line_frequency: float = DEFAULT_LINE_FREQUENCY_HZ,
+    arc_voltage_threshold: float = ARC_VOLTAGE_THRESHOLD_V,
+) -> Dict[str, np.ndarray]:
+    """Short-circuit quantities for a batch of captures, one row per run
+
+    current and voltage are (runs, n) arrays, voltage being the voltage
+    across the MCB terminals. source_voltage, when recorded (e.g. on
+    calibration shots), gives the achieved power factor by the phase
+    method on runs that conduct for at least one line cycle; otherwise
+    power_factor is NaN and verification leaves it out. Every quantity is
+    computed with whole-array operations; there is no per-sample Python
+    loop.
+
+    Returns a dict of (runs,) arrays keyed by RESULT_FIELDS. Times are in
+    seconds from the start of the capture.
+    """
+    current = np.atleast_2d(np.asarray(current, dtype=np.float64))
+    voltage = np.atleast_2d(np.asarray(voltage, dtype=np.float64))
+    runs, samples = current.shape
+    if lengths is None:
+        lengths = np.full(runs, samples, dtype=np.int64)
+    index = np.arange(samples)
+    valid = index[None, :] < lengths[:, None]
+
+    # Peak let-through current
+    abs_current = np.abs(current)
+    peak = abs_current.max(axis=1)
+
+    # Fault initiation and clearing: first and last conducting samples. A
+    # sample above the threshold only counts when the mean |i| of its block
+    # of CONDUCTION_BLOCK_CYCLES, or of a neighbouring block, is above it
+    # too, so lone noise spikes before the fault or after clearing are ignored.
+    cycle = max(1, int(round(sample_rate / line_frequency)))
+    threshold = CURRENT_THRESHOLD_FRACTION * peak
+    block = max(1, int(round(cycle * CONDUCTION_BLOCK_CYCLES)))
+    starts = np.arange(0, samples, block)
+    block_mean = np.add.reduceat(abs_current, starts, axis=1) / np.diff(np.append(starts, samples))
+    block_on = block_mean > threshold[:, None]
+    near = block_on.copy()
+    near[:, 1:] |= block_on[:, :-1]
+    near[:, :-1] |= block_on[:, 1:]
+    conducting = (abs_current > threshold[:, None]) & np.repeat(near, block, axis=1)[:, :samples] & valid
+    fault_start = _first_true(conducting, lengths)
+    clearing = _last_true(conducting, fault_start)
+
+    # Arc initiation: voltage across the contacts rises while current still flows
+    in_fault = (index[None, :] >= fault_start[:, None]) & (index[None, :] < clearing[:, None])
+    arcing = (np.abs(voltage) > arc_voltage_threshold) & in_fault
+    arc_start = _first_true(arcing, clearing)
+
+    # Everything fault-related lives in the columns spanned by the batch's faults
+    lo = int(fault_start.min()) if runs else 0
+    hi = max(int(clearing.max()) if runs else 0, lo)
+    fault_current = current[:, lo:hi]
+
+    # Joule integral over the fault
+    i2t = _window_sum(np.cumsum(fault_current * fault_current, axis=1), fault_start - lo, clearing - lo) / sample_rate
+
+    # Recovery voltage: RMS over the cycle starting half a cycle after clearing
+    recovery_start = np.minimum(clearing + cycle // 2, lengths)
+    recovery_stop = np.minimum(recovery_start + cycle, lengths)
+    recovery_count = recovery_stop - recovery_start
+    recovery_energy = _window_sum(np.cumsum(voltage * voltage, axis=1), recovery_start, recovery_stop)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        recovery_voltage = np.where(recovery_count > 0, np.sqrt(recovery_energy / recovery_count), np.nan)
+
+    # Achieved power factor: phase between the fundamental phasors of source
+    # voltage and current, over the whole line cycles of the conducting
+    # interval. A breaker clearing within its first cycle, as MCBs do on
+    # short-circuit shots, leaves too little waveform for a phase estimate,
+    # so power_factor is only measured on runs conducting a full cycle or
+    # more, e.g. calibration shots with the sample bridged.
+    power_factor = np.full(runs, np.nan)
+    if source_voltage is not None:
+        pf_stop = fault_start + ((clearing - fault_start) // cycle) * cycle
+        pf_window = (index[None, lo:hi] >= fault_start[:, None]) & (index[None, lo:hi] < pf_stop[:, None])
+        source_voltage = np.atleast_2d(np.asarray(source_voltage, dtype=np.float64))[:, lo:hi]
+        phasor = np.exp(-2j * np.pi * line_frequency * index[lo:hi] / sample_rate)
+        voltage_phasor = np.where(pf_window, source_voltage, 0.0) @ phasor
+        current_phasor = np.where(pf_window, fault_current, 0.0) @ phasor
+        power_factor = np.where(
+            pf_stop > fault_start, np.abs(np.cos(np.angle(voltage_phasor) - np.angle(current_phasor))), np.nan
+        )
+
+    has_fault = conducting.any(axis=1)
+    cleared = has_fault & (clearing < lengths)
+
+    to_seconds = 1.0 / sample_rate
+    return {
+        "peak_current_A": peak,
+        "i2t_A2s": i2t,
+        "fault_start_s": fault_start * to_seconds,
+        "arc_start_s": arc_start * to_seconds,
+        "clearing_s": clearing * to_seconds,
+        "pre_arcing_time_s": (arc_start - fault_start) * to_seconds,
+        "arcing_time_s": (clearing - arc_start) * to_seconds,
+        "break_time_s": (clearing - fault_start) * to_seconds,
+        "recovery_voltage_V": recovery_voltage,
+        "power_factor": power_factor,
+        "cleared": cleared,
+    }
+
+
+def rows(results: Dict[str, np.ndarray]) -> List[dict]:
+    """Split batch results into one JSON-friendly dict per run"""
+    count = len(next(iter(results.values())))
+    per_run = []
+    for row in range(count):
+        entry = {}
+        for field in RESULT_FIELDS:
+            value = results[field][row].item()
+            entry[field] = None if isinstance(value, float) and math.isnan(value) else value
+        per_run.append(entry)
+    return per_run
+
+
+def verify_against_setting(result: dict, setting: dict) -> dict:
+    """Compare one run's results with its settings entry"""
+    checks = {"cleared": bool(result["cleared"])}
+
+    target_pf = setting.get("powerFactor_cos_phi")
+    if result.get("power_factor") is not None and target_pf:
+        checks["power_factor"] = abs(result["power_factor"] - target_pf) <= POWER_FACTOR_TOLERANCE
+
+    target_recovery = setting.get("recoveryVoltage_V")
+    if result.get("recovery_voltage_V") is not None and target_recovery:
+        checks["recovery_voltage"] = (
+            abs(result["recovery_voltage_V"] - target_recovery) <= RECOVERY_VOLTAGE_TOLERANCE * target_recovery
+        )
+
+    verification = {"passed": all(checks.values()), "checks": checks}
+
+    prospective = setting.get("prospectiveCurrent_A")
+    if prospective:
+        # Let-through peak as a fraction of the symmetrical prospective peak
+        verification["peak_ratio"] = result["peak_current_A"] / (math.sqrt(2) * prospective)
+
+    return verification
+
+
+def run_arrays(run: dict, chunks: List[dict]) -> Dict[str, np.ndarray]:
+    """Reassemble a run's channels from its measurement_chunks documents"""
+    dtype = np.dtype("<f4") if run["dtype"] == "float32" else np.dtype("<i2")
+    chunks = sorted(chunks, key=lambda chunk: chunk["bucket_start"])
+    arrays = {}
+    for index, name in enumerate(run["channels"]):
+        parts = [decode_channel(chunk, name, dtype) for chunk in chunks]
+        data = np.concatenate(parts) if parts else np.empty(0, dtype=dtype)
+        if run.get("scale"):
+            data = data * run["scale"][index]
+        arrays[name] = data
+    return arrays
+
+
+def analyze_capture(
+    current: np.ndarray,
+    voltage: np.ndarray,
+    sample_rate: float,
+    source_voltage: Optional[np.ndarray] = None,
+    setting: Optional[dict] = None,
+) -> dict:
+    """Analyze one capture's 1-D channels; safe to run in a compute worker"""
+    results = analyze_batch(
+        current[None, :],
+        voltage[None, :],
+        sample_rate,
+        source_voltage=source_voltage[None, :] if source_voltage is not None else None,
+    )
+    result = rows(results)[0]
+    if setting is not None:
+        result["verification"] = verify_against_setting(result, setting)
+    return result
+
+
+def analyze_run(run: dict, chunks: List[dict], setting: Optional[dict] = None) -> dict:
+    """Analyze one stored run; expects "current" and "voltage" channels"""
+    arrays = run_arrays(run, chunks)
+    if "current" not in arrays or "voltage" not in arrays:
+        raise ValueError("Run must record 'current' and 'voltage' channels")
+    return analyze_capture(
+        arrays["current"], arrays["voltage"], run["sample_rate"], arrays.get("source_voltage"), setting
+    )
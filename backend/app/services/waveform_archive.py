@@ -0,0 +1,362 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import re
+import shutil
+import struct
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.waveform_ingest import FrameError
+from app.services.waveform_pyramid import Pyramid, build_pyramid
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+WAVEFORM_ARCHIVE_DIR = os.getenv("WAVEFORM_ARCHIVE_DIR", "waveform_archive")
+# "archive": samples go to the archive only; "mongo": measurement_chunks only; "both"
+WAVEFORM_STORAGE = os.getenv("WAVEFORM_STORAGE", "archive")
+ARCHIVE_BLOCK_SAMPLES = int(os.getenv("ARCHIVE_BLOCK_SAMPLES", 1024))
+ARCHIVE_MAX_OPEN_RUNS = int(os.getenv("ARCHIVE_MAX_OPEN_RUNS", 32))
+# Furthest a bucket may end from the run's first sample, so a corrupt start_sample cannot create a huge
+# sparse file; a run that declares duration_s is bounded by that instead, if it is shorter
+ARCHIVE_MAX_SPAN_SAMPLES = int(os.getenv("ARCHIVE_MAX_SPAN_SAMPLES", 1 << 25))
+ARCHIVE_MAX_WINDOW_SAMPLES = int(os.getenv("ARCHIVE_MAX_WINDOW_SAMPLES", 1 << 22))
+# Size of the pieces a window is streamed in
+ARCHIVE_STREAM_BYTES = 1024 * 1024
+
+SAMPLE_DTYPES = {"float32": np.dtype("<f4"), "int16": np.dtype("<i2")}
+
+# Channel files are .npy with a fixed-size header, so the sample count can be
+# rewritten in place when the run ends and np.load(mmap_mode="r") can open them
+NPY_HEADER_BYTES = 128
+NPY_MAGIC = b"\x93NUMPY\x01\x00"
+INDEX_FILE = "index.json"
+SAFE_NAME = re.compile(r"^[A-Za-z0-9_.-]{1,100}$")
+
+
+def npy_header(dtype: np.dtype, count: int) -> bytes:
+    """A version 1.0 .npy header for a 1-D array, padded to NPY_HEADER_BYTES"""
+    header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (count,)})
+    length = NPY_HEADER_BYTES - len(NPY_MAGIC) - 2
+    return NPY_MAGIC + struct.pack("<H", length) + (header.ljust(length - 1) + "\n").encode("latin1")
+
+
+def run_directory_name(run_id: str) -> str:
+    """run_id itself when it is a safe file name, otherwise its SHA-256"""
+    if SAFE_NAME.match(run_id) and not run_id.startswith("."):
+        return run_id
+    return hashlib.sha256(run_id.encode("utf-8")).hexdigest()
+
+
+def channel_file(index: int) -> str:
+    return f"ch{index:02d}.npy"
+
+
+def blocks_file(index: int) -> str:
+    return f"ch{index:02d}.blocks.npy"
+
+
+def block_extrema(data: np.ndarray, block_samples: int) -> np.ndarray:
+    """(blocks, 2) min and max of every block_samples samples; the last block may be short"""
+    count = len(data)
+    full = count - count % block_samples
+    blocks = np.empty((-(-count // block_samples), 2), dtype=data.dtype)
+    if full:
+        shaped = data[:full].reshape(-1, block_samples)
+        blocks[:full // block_samples, 0] = shaped.min(axis=1)
+        blocks[:full // block_samples, 1] = shaped.max(axis=1)
+    if full < count:
+        blocks[-1] = (data[full:].min(), data[full:].max())
+    return blocks
+
+
+def merge_extents(extents: List[Tuple[int, int]]) -> List[List[int]]:
+    """Merge written (offset, count) ranges into sorted, non-overlapping [offset, count] extents"""
+    merged: List[List[int]] = []
+    for offset, count in sorted(extents):
+        if merged and offset <= merged[-1][0] + merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], offset + count - merged[-1][0])
+        else:
+            merged.append([offset, count])
+    return merged
+
+
+def iter_window_bytes(window: Dict[str, np.ndarray], piece_bytes: int = ARCHIVE_STREAM_BYTES):
+    """Planar bytes of a window, channel after channel, one bounded piece at a time"""
+    for data in window.values():
+        view = memoryview(np.ascontiguousarray(data)).cast("B")
+        for offset in range(0, len(view), piece_bytes):
+            yield bytes(view[offset:offset + piece_bytes])
+
+
+class ArchiveWriter:
+    """Writes one run's buckets into per-channel .npy files as they close
+
+    Every channel is one contiguous array starting at the first bucket's
+    first sample. Later buckets are written at their own offset, so they
+    may arrive out of order as long as none starts before the first, and
+    a gap in start_sample leaves zeros that the index lists under "gaps".
+    A bucket before the first one or beyond max_span is a FrameError. Files are built in "<run>.part" and renamed into
+    place by finish(), after the sample counts, per-block min/max, the
+    plot pyramid (see waveform_pyramid.py) and index.json are written, so
+    readers only ever see complete runs.
+    """
+
+    def __init__(self, run: dict, directory: str, block_samples: int = ARCHIVE_BLOCK_SAMPLES):
+        self.run = run
+        self.block_samples = block_samples
+        self.dtype = SAMPLE_DTYPES[run["dtype"]]
+        self.path = os.path.join(directory, run_directory_name(run["_id"]))
+        self.partial_path = self.path + ".part"
+        self.first_sample: Optional[int] = None
+        self.max_span = ARCHIVE_MAX_SPAN_SAMPLES
+        if run.get("duration_s"):
+            self.max_span = min(self.max_span, math.ceil(run["duration_s"] * run["sample_rate"]))
+        self.length = 0
+        self.extents: List[Tuple[int, int]] = []
+        self.bytes = 0
+
+        shutil.rmtree(self.partial_path, ignore_errors=True)
+        os.makedirs(self.partial_path)
+        self._files = []
+        for index in range(len(run["channels"])):
+            file = open(os.path.join(self.partial_path, channel_file(index)), "w+b")
+            file.write(npy_header(self.dtype, 0))
+            self._files.append(file)
+
+    def write(self, bucket_start: int, samples: np.ndarray):
+        """Write a (channels, n) bucket at its position in the run"""
+        if self.first_sample is None:
+            self.first_sample = bucket_start
+        offset = bucket_start - self.first_sample
+        count = samples.shape[1]
+        if offset < 0 or offset + count > self.max_span:
+            raise FrameError(
+                f"Samples at {bucket_start} fall outside the {self.max_span} samples archivable "
+                f"from the run's first sample {self.first_sample}"
+            )
+        position = NPY_HEADER_BYTES + offset * self.dtype.itemsize
+        for index, file in enumerate(self._files):
+            file.seek(position)
+            file.write(np.ascontiguousarray(samples[index], dtype=self.dtype))
+        self.extents.append((offset, count))
+        self.length = max(self.length, offset + count)
+        self.bytes += samples.shape[0] * count * self.dtype.itemsize
+
+    def finish(self) -> Optional[dict]:
+        """Publish the run and return its index, or None if nothing was written; blocking"""
+        if not self.extents:
+            self.abort()
+            return None
+        for file in self._files:
+            file.seek(0)
+            file.write(npy_header(self.dtype, self.length))
+            # Extend the file to its full length when the run ends in a gap
+            file.truncate(NPY_HEADER_BYTES + self.length * self.dtype.itemsize)
+            file.flush()
+            os.fsync(file.fileno())
+            file.close()
+        self._files = []
+
+        channels = [
+            np.load(os.path.join(self.partial_path, channel_file(index)), mmap_mode="r")
+            for index in range(len(self.run["channels"]))
+        ]
+        for index, data in enumerate(channels):
+            np.save(os.path.join(self.partial_path, blocks_file(index)), block_extrema(data, self.block_samples))
+        extents = merge_extents(self.extents)
+        pyramid = build_pyramid(self.partial_path, channels, extents)
+        del channels
+
+        gaps = [
+            [previous[0] + previous[1], following[0] - previous[0] - previous[1]]
+            for previous, following in zip(extents, extents[1:])
+        ]
+        index = {
+            "run_id": self.run["_id"],
+            "setting_id": self.run["setting_id"],
+            "channels": self.run["channels"],
+            "dtype": self.run["dtype"],
+            "scale": self.run.get("scale"),
+            "sample_rate": self.run["sample_rate"],
+            "start_sample": self.first_sample,
+            "n_samples": self.length,
+            "block_samples": self.block_samples,
+            "pyramid": pyramid,
+            "gaps": gaps,
+            "bytes": self.bytes,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+        with open(os.path.join(self.partial_path, INDEX_FILE), "w") as file:
+            json.dump(index, file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        # Swap in the new run; a re-ingested run replaces the old files
+        previous = self.path + ".old"
+        if os.path.exists(self.path):
+            shutil.rmtree(previous, ignore_errors=True)
+            os.rename(self.path, previous)
+        os.rename(self.partial_path, self.path)
+        shutil.rmtree(previous, ignore_errors=True)
+        return index
+
+    def abort(self):
+        for file in self._files:
+            file.close()
+        self._files = []
+        shutil.rmtree(self.partial_path, ignore_errors=True)
+
+
+class ArchivedRun:
+    """Read-only memory-mapped view of one archived run
+
+    Channel arrays are np.memmap objects, so window() returns slices of the
+    page cache without reading or copying anything else.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE)) as file:
+            self.index = json.load(file)
+        self.channels: Dict[str, np.ndarray] = {
+            name: np.load(os.path.join(path, channel_file(position)), mmap_mode="r")
+            for position, name in enumerate(self.index["channels"])
+        }
+        self._blocks: Dict[str, np.ndarray] = {}
+        # Runs archived before pyramids were built have none
+        self.pyramid = Pyramid(path, self.index["channels"], self.index["pyramid"]) if "pyramid" in self.index else None
+
+    @property
+    def sample_rate(self) -> float:
+        return self.index["sample_rate"]
+
+    @property
+    def start_sample(self) -> int:
+        return self.index["start_sample"]
+
+    @property
+    def n_samples(self) -> int:
+        return self.index["n_samples"]
+
+    def scale(self, name: str) -> Optional[float]:
+        scale = self.index.get("scale")
+        return scale[self.index["channels"].index(name)] if scale else None
+
+    def sample_range(self, t0: Optional[float] = None, t1: Optional[float] = None) -> Tuple[int, int]:
+        """Offsets [start, stop) into the channel arrays for times in seconds since sample 0"""
+        start = 0 if t0 is None else int(np.floor(t0 * self.sample_rate)) - self.start_sample
+        stop = self.n_samples if t1 is None else int(np.ceil(t1 * self.sample_rate)) - self.start_sample
+        start = min(max(start, 0), self.n_samples)
+        return start, min(max(stop, start), self.n_samples)
+
+    def window(self, start: int, stop: int, names: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """Zero-copy slices [start, stop) of the named channels (all by default)"""
+        return {name: self.channels[name][start:stop] for name in (names or self.channels)}
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Whole channels in physical units, as run_arrays returns them from measurement_chunks"""
+        arrays = {}
+        for name, data in self.channels.items():
+            scale = self.scale(name)
+            arrays[name] = data * scale if scale else np.asarray(data)
+        return arrays
+
+    def blocks(self, name: str) -> np.ndarray:
+        """(blocks, 2) per-block min and max of a channel, in stored units"""
+        found = self._blocks.get(name)
+        if found is None:
+            position = self.index["channels"].index(name)
+            found = self._blocks[name] = np.load(os.path.join(self.path, blocks_file(position)), mmap_mode="r")
+        return found
+
+
+class WaveformArchive:
+    """Directory of archived runs, with the most recently used ones kept mapped"""
+
+    def __init__(
+        self,
+        directory: str = WAVEFORM_ARCHIVE_DIR,
+        storage: str = WAVEFORM_STORAGE,
+        block_samples: int = ARCHIVE_BLOCK_SAMPLES,
+        max_open: int = ARCHIVE_MAX_OPEN_RUNS,
+    ):
+        if storage not in ("archive", "mongo", "both"):
+            raise ValueError(f"WAVEFORM_STORAGE must be 'archive', 'mongo' or 'both', not '{storage}'")
+        self.directory = directory
+        self.storage = storage
+        self.block_samples = block_samples
+        self.max_open = max_open
+        self._open: "OrderedDict[str, ArchivedRun]" = OrderedDict()
+        self.runs_written = 0
+        self.bytes_written = 0
+        self.opens = 0
+        self.hits = 0
+        self.windows = 0
+        self.bytes_served = 0
+
+    @property
+    def stores_archive(self) -> bool:
+        return self.storage in ("archive", "both")
+
+    @property
+    def stores_chunks(self) -> bool:
+        return self.storage in ("mongo", "both")
+
+    def writer(self, run: dict) -> Optional[ArchiveWriter]:
+        """A writer for a run being ingested, or None when runs are not archived"""
+        if not self.stores_archive:
+            return None
+        os.makedirs(self.directory, exist_ok=True)
+        return ArchiveWriter(run, self.directory, self.block_samples)
+
+    def finish(self, writer: ArchiveWriter) -> Optional[dict]:
+        index = writer.finish()
+        self._open.pop(writer.run["_id"], None)
+        if index is not None:
+            self.runs_written += 1
+            self.bytes_written += index["bytes"]
+        return index
+
+    def open(self, run_id: str) -> Optional[ArchivedRun]:
+        """The archived run, or None if it has no archive"""
+        archived = self._open.get(run_id)
+        if archived is not None:
+            self._open.move_to_end(run_id)
+            self.hits += 1
+            return archived
+        path = os.path.join(self.directory, run_directory_name(run_id))
+        if not os.path.exists(os.path.join(path, INDEX_FILE)):
+            return None
+        archived = self._open[run_id] = ArchivedRun(path)
+        self.opens += 1
+        while len(self._open) > self.max_open:
+            self._open.popitem(last=False)
+        return archived
+
+    def record_window(self, nbytes: int):
+        self.windows += 1
+        self.bytes_served += nbytes
+
+    def snapshot(self) -> dict:
+        return {
+            "directory": self.directory,
+            "storage": self.storage,
+            "block_samples": self.block_samples,
+            "open_runs": len(self._open),
+            "runs_written": self.runs_written,
+            "bytes_written": self.bytes_written,
+            "opens": self.opens,
+            "hits": self.hits,
+            "windows": self.windows,
+            "bytes_served": self.bytes_served,
+        }
+
+
+waveform_archive = WaveformArchive()
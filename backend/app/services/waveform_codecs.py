@@ -0,0 +1,206 @@
+import lzma
+import os
+import struct
+import zlib
+from typing import Optional
+
+import numpy as np
+
+from app.services.waveform_ingest import DTYPE_FLOAT32, DTYPE_INT16, FRAME_DTYPES
+
+# Environment variables
+# "<transform>+<compressor>:<level>", e.g. "delta+zlib:1", "dd+lzma:6", or "raw" for uncompressed chunks
+WAVEFORM_CODEC = os.getenv("WAVEFORM_CODEC", "delta+zlib:1")
+
+# Encoded chunk layout (all little-endian):
+#   magic "MCBC" | version u8 | transform u8 | compressor u8 | level u8 |
+#   dtype u8 | width u8 | reserved u16 | count u32 | step f64 | payload
+# dtype is the source sample dtype (ingest frame codes). The payload
+# decompresses to count integers of width bytes for the delta transforms,
+# or to the raw samples for "raw". Differences are taken in the source
+# dtype (wrapping) for int16 samples and in int64 for quantized floats.
+# step > 0 means float samples were quantized to multiples of step before
+# the transform.
+CODEC_MAGIC = b"MCBC"
+CODEC_VERSION = 1
+CODEC_HEADER = struct.Struct("<4sBBBBBBHId")
+
+TRANSFORMS = {"raw": 0, "delta": 1, "dd": 2}
+COMPRESSORS = {"none": 0, "zlib": 1, "lzma": 2}
+INTEGER_WIDTHS = (1, 2, 4, 8)
+# Largest |sample / step| quantized: integers up to 2^53 are exact in float64,
+# and second differences of them stay well inside int64
+MAX_QUANTIZED = float(2 ** 53)
+
+
+class CodecError(ValueError):
+    """Raised for an unknown codec spec or a chunk that cannot be decoded"""
+
+
+def _integer_width(values: np.ndarray) -> int:
+    """Fewest bytes per value that hold every value of an int64 array"""
+    if not len(values):
+        return 1
+    low, high = int(values.min()), int(values.max())
+    for width in INTEGER_WIDTHS:
+        info = np.iinfo(f"i{width}")
+        if info.min <= low and high <= info.max:
+            return width
+    return 8
+
+
+class ChunkCodec:
+    """Encodes one channel of a chunk as a self-describing byte string
+
+    Samples become integers first: int16 counts as they are, float samples
+    by rounding to multiples of step (the ADC resolution, so nothing real
+    is lost). "delta" then stores first differences and "dd" second
+    differences, which keeps smooth sinusoids and flat tails to a few
+    small values that zlib or lzma pack tightly. int16 differences wrap
+    around like the ADC's own arithmetic, so they always fit 16 bits and
+    decoding with the same wrap-around restores every count exactly.
+    Float chunks with no step fall back to the raw bytes, and so do chunks
+    holding NaN or infinity or a sample beyond MAX_QUANTIZED steps, which
+    rounding to int64 would corrupt; the codec never loses precision that
+    was not declared.
+    """
+
+    def __init__(self, transform: str = "delta", compressor: str = "zlib", level: int = 1):
+        if transform not in TRANSFORMS:
+            raise CodecError(f"Unknown transform '{transform}', expected one of {', '.join(TRANSFORMS)}")
+        if compressor not in COMPRESSORS:
+            raise CodecError(f"Unknown compressor '{compressor}', expected one of {', '.join(COMPRESSORS)}")
+        if not 0 <= level <= 9:
+            raise CodecError(f"Compression level {level} is outside 0..9")
+        self.transform = transform
+        self.compressor = compressor
+        self.level = level
+
+    @classmethod
+    def parse(cls, spec: str) -> "ChunkCodec":
+        """ChunkCodec from "<transform>+<compressor>:<level>"; parts may be left out"""
+        spec = spec.strip().lower()
+        level = 1
+        if ":" in spec:
+            spec, level_text = spec.split(":", 1)
+            try:
+                level = int(level_text)
+            except ValueError:
+                raise CodecError(f"Bad compression level '{level_text}'")
+        transform, compressor = "raw", "none"
+        for part in filter(None, spec.split("+")):
+            if part in TRANSFORMS:
+                transform = part
+            elif part in COMPRESSORS:
+                compressor = part
+            else:
+                raise CodecError(f"Unknown codec part '{part}'")
+        return cls(transform, compressor, level)
+
+    @property
+    def name(self) -> str:
+        name = "+".join(part for part in (self.transform, self.compressor) if part not in ("raw", "none")) or "raw"
+        return f"{name}:{self.level}" if self.compressor != "none" else name
+
+    def _compress(self, payload: bytes) -> bytes:
+        if self.compressor == "zlib":
+            return zlib.compress(payload, self.level)
+        if self.compressor == "lzma":
+            return lzma.compress(payload, preset=self.level, check=lzma.CHECK_NONE)
+        return payload
+
+    def encode(self, samples: np.ndarray, step: Optional[float] = None) -> bytes:
+        """Encode a 1-D float32 or int16 array; step is the resolution float samples are quantized to"""
+        if samples.dtype == np.int16:
+            dtype_code = DTYPE_INT16
+        elif samples.dtype == np.float32:
+            dtype_code = DTYPE_FLOAT32
+        else:
+            raise CodecError(f"Unsupported sample dtype {samples.dtype}")
+
+        transform = self.transform
+        quantized = dtype_code == DTYPE_FLOAT32 and bool(step) and transform != "raw"
+        values = samples
+        if quantized:
+            with np.errstate(invalid="ignore", over="ignore"):
+                scaled = np.rint(samples.astype(np.float64) / step)
+            # NaN fails the comparison, so it goes raw like infinities do
+            if not len(scaled) or np.abs(scaled).max() <= MAX_QUANTIZED:
+                values = scaled.astype(np.int64)
+            else:
+                quantized = False
+        if dtype_code == DTYPE_FLOAT32 and not quantized:
+            transform = "raw"
+
+        if transform == "raw":
+            width = 0
+            payload = np.ascontiguousarray(samples, dtype=FRAME_DTYPES[dtype_code]).tobytes()
+            step = 0.0
+        else:
+            work = values.dtype
+            for _ in range(2 if transform == "dd" else 1):
+                values = np.diff(values, prepend=work.type(0))
+            width = _integer_width(values)
+            payload = values.astype(f"<i{width}").tobytes()
+            step = float(step) if quantized else 0.0
+
+        header = CODEC_HEADER.pack(
+            CODEC_MAGIC, CODEC_VERSION, TRANSFORMS[transform], COMPRESSORS[self.compressor], self.level,
+            dtype_code, width, 0, len(samples), step,
+        )
+        return header + self._compress(payload)
+
+
+def decode(data: bytes) -> np.ndarray:
+    """Samples of a chunk written by ChunkCodec.encode, in their source dtype"""
+    if len(data) < CODEC_HEADER.size:
+        raise CodecError("Encoded chunk is shorter than its header")
+    magic, version, transform, compressor, _, dtype_code, width, _, count, step = CODEC_HEADER.unpack_from(data)
+    if magic != CODEC_MAGIC or version != CODEC_VERSION:
+        raise CodecError("Bad encoded chunk magic or version")
+    payload = memoryview(data)[CODEC_HEADER.size:]
+    try:
+        if compressor == COMPRESSORS["zlib"]:
+            payload = zlib.decompress(payload)
+        elif compressor == COMPRESSORS["lzma"]:
+            payload = lzma.decompress(payload)
+        elif compressor != COMPRESSORS["none"]:
+            raise CodecError(f"Unknown compressor code {compressor}")
+    except (zlib.error, lzma.LZMAError) as e:
+        raise CodecError(f"Corrupt encoded chunk: {e}")
+
+    dtype = FRAME_DTYPES.get(dtype_code)
+    if dtype is None:
+        raise CodecError(f"Unknown sample dtype code {dtype_code}")
+    if transform == TRANSFORMS["raw"]:
+        width = dtype.itemsize
+    elif transform not in TRANSFORMS.values():
+        raise CodecError(f"Unknown transform code {transform}")
+    elif width not in INTEGER_WIDTHS:
+        raise CodecError(f"Bad integer width {width}")
+    if len(payload) != count * width:
+        raise CodecError(f"Encoded chunk holds {len(payload)} payload bytes, expected {count} × {width}")
+    if transform == TRANSFORMS["raw"]:
+        return np.frombuffer(payload, dtype=dtype, count=count)
+
+    work = np.dtype(np.int64) if step else dtype
+    values = np.frombuffer(payload, dtype=f"<i{width}", count=count).astype(work)
+    for _ in range(2 if transform == TRANSFORMS["dd"] else 1):
+        values = np.cumsum(values, dtype=work)
+    if step:
+        return (values * step).astype(dtype)
+    return values.astype(dtype)
+
+
+def decode_channel(chunk: dict, name: str, dtype: np.dtype) -> np.ndarray:
+    """One channel of a measurement_chunks document, encoded or stored as raw bytes"""
+    data = chunk["channels"][name]
+    if chunk.get("codec"):
+        return decode(data)
+    return np.frombuffer(data, dtype=dtype)
+
+
+# None keeps chunks as plain sample bytes, as before codecs existed
+chunk_codec: Optional[ChunkCodec] = ChunkCodec.parse(WAVEFORM_CODEC)
+if chunk_codec.name == "raw":
+    chunk_codec = None
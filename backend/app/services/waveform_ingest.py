@@ -0,0 +1,310 @@
+import logging
+import os
+import struct
+import time
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from bson import Binary
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+INGEST_BUCKET_SAMPLES = int(os.getenv("INGEST_BUCKET_SAMPLES", 65536))
+
+# Frame layout (all little-endian):
+#   magic "MCBW" | version u8 | dtype u8 | channels u8 | flags u8 |
+#   sequence u32 | start_sample u64 | samples_per_channel u32 | payload
+# The payload is planar: every channel's samples are contiguous, in the
+# channel order declared when the run was opened.
+FRAME_MAGIC = b"MCBW"
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("<4sBBBBIQI")
+
+DTYPE_FLOAT32 = 1
+DTYPE_INT16 = 2
+FRAME_DTYPES = {
+    DTYPE_FLOAT32: np.dtype("<f4"),
+    DTYPE_INT16: np.dtype("<i2"),
+}
+DTYPE_NAMES = {"float32": DTYPE_FLOAT32, "int16": DTYPE_INT16}
+
+# Largest payload accepted in one frame, to bound memory per connection
+MAX_FRAME_BYTES = 16 * 1024 * 1024
+
+
+class FrameError(ValueError):
+    """Raised when an ingest stream contains a malformed frame"""
+
+
+class Frame:
+    """One decoded frame; samples is a (channels, n) view over the received bytes"""
+
+    __slots__ = ("sequence", "start_sample", "dtype_code", "samples")
+
+    def __init__(self, sequence: int, start_sample: int, dtype_code: int, samples: np.ndarray):
+        self.sequence = sequence
+        self.start_sample = start_sample
+        self.dtype_code = dtype_code
+        self.samples = samples
+
+
+def encode_frame(samples: np.ndarray, start_sample: int, sequence: int = 0) -> bytes:
+    """Encode a (channels, n) float32 or int16 array as one frame"""
+    samples = np.ascontiguousarray(samples)
+    if samples.dtype == np.float32:
+        dtype_code = DTYPE_FLOAT32
+    elif samples.dtype == np.int16:
+        dtype_code = DTYPE_INT16
+    else:
+        raise FrameError(f"Unsupported sample dtype {samples.dtype}")
+    channels, count = samples.shape
+    header = FRAME_HEADER.pack(FRAME_MAGIC, FRAME_VERSION, dtype_code, channels, 0, sequence, start_sample, count)
+    return header + samples.astype(FRAME_DTYPES[dtype_code], copy=False).tobytes()
+
+
+def _frame_size(view: memoryview, offset: int) -> Tuple[int, tuple]:
+    header = FRAME_HEADER.unpack_from(view, offset)
+    magic, version, dtype_code, channels, _, _, _, count = header
+    if magic != FRAME_MAGIC or version != FRAME_VERSION:
+        raise FrameError("Bad frame magic or version")
+    dtype = FRAME_DTYPES.get(dtype_code)
+    if dtype is None or channels == 0:
+        raise FrameError(f"Bad frame dtype {dtype_code} or channel count {channels}")
+    payload = channels * count * dtype.itemsize
+    if payload > MAX_FRAME_BYTES:
+        raise FrameError(f"Frame payload of {payload} bytes exceeds {MAX_FRAME_BYTES}")
+    return FRAME_HEADER.size + payload, header
+
+
+def parse_frames(data, offset: int = 0) -> Tuple[List[Frame], int]:
+    """Decode every complete frame in data starting at offset
+
+    Returns the frames and the offset of the first unconsumed byte. Sample
+    arrays are np.frombuffer views over data, so nothing is copied.
+    """
+    view = memoryview(data)
+    frames = []
+    end = len(view)
+    while end - offset >= FRAME_HEADER.size:
+        size, header = _frame_size(view, offset)
+        if end - offset < size:
+            break
+        _, _, dtype_code, channels, _, sequence, start_sample, count = header
+        samples = np.frombuffer(
+            view, dtype=FRAME_DTYPES[dtype_code], count=channels * count, offset=offset + FRAME_HEADER.size
+        ).reshape(channels, count)
+        frames.append(Frame(sequence, start_sample, dtype_code, samples))
+        offset += size
+    return frames, offset
+
+
+class FrameDecoder:
+    """Incremental decoder for frames arriving in arbitrary byte chunks
+
+    Whole frames inside a chunk are parsed in place. Only a frame split
+    across chunk boundaries is copied, into a carry-over buffer that grows
+    by just the bytes that frame still needs, so a frame arriving in many
+    small chunks costs time linear in its size.
+    """
+
+    def __init__(self):
+        self._pending = bytearray()
+
+    def _pending_size(self) -> int:
+        """Bytes the split frame needs: its header first, then its whole length"""
+        if len(self._pending) < FRAME_HEADER.size:
+            return FRAME_HEADER.size
+        return _frame_size(self._pending, 0)[0]
+
+    def feed(self, chunk: bytes) -> List[Frame]:
+        view = memoryview(chunk)
+        frames = []
+        while self._pending and view:
+            needed = self._pending_size() - len(self._pending)
+            self._pending += view[:needed]
+            view = view[needed:]
+            if len(self._pending) >= FRAME_HEADER.size and len(self._pending) == self._pending_size():
+                # The split frame is complete; parse it from its own copy so the buffer can be reused
+                frames, _ = parse_frames(bytes(self._pending))
+                self._pending = bytearray()
+        if view:
+            parsed, consumed = parse_frames(view)
+            frames.extend(parsed)
+            self._pending += view[consumed:]
+        return frames
+
+    @property
+    def pending_bytes(self) -> int:
+        return len(self._pending)
+
+
+class ChunkAccumulator:
+    """Packs frames into fixed time buckets of bucket_samples per channel
+
+    Samples are copied into one preallocated (channels, bucket_samples)
+    array with slice assignment, so there are no per-sample Python objects.
+    A gap in start_sample closes the current bucket early.
+    """
+
+    def __init__(self, channels: int, dtype: np.dtype, bucket_samples: int = INGEST_BUCKET_SAMPLES):
+        self.channels = channels
+        self.dtype = dtype
+        self.bucket_samples = bucket_samples
+        self._buffer = np.empty((channels, bucket_samples), dtype=dtype)
+        self._bucket_start: Optional[int] = None
+        self._filled = 0
+
+    def add(self, start_sample: int, samples: np.ndarray) -> List[Tuple[int, np.ndarray]]:
+        """Add a (channels, n) block; returns (bucket_start, samples) for each closed bucket"""
+        closed = []
+        if self._bucket_start is not None and start_sample != self._bucket_start + self._filled:
+            closed.extend(self.flush())
+
+        count = samples.shape[1]
+        offset = 0
+        while offset < count:
+            if self._bucket_start is None:
+                self._bucket_start = start_sample + offset
+                self._filled = 0
+            take = min(count - offset, self.bucket_samples - self._filled)
+            self._buffer[:, self._filled:self._filled + take] = samples[:, offset:offset + take]
+            self._filled += take
+            offset += take
+            if self._filled == self.bucket_samples:
+                closed.extend(self.flush())
+        return closed
+
+    def flush(self) -> List[Tuple[int, np.ndarray]]:
+        """Close the current bucket, even if partially filled"""
+        if self._bucket_start is None or self._filled == 0:
+            return []
+        bucket = (self._bucket_start, self._buffer[:, :self._filled].copy())
+        self._bucket_start = None
+        self._filled = 0
+        return [bucket]
+
+
+class IngestSession:
+    """Turns a run's frame stream into measurement chunk documents
+
+    on_samples, if given, is called with (start_sample, samples) for every
+    decoded frame, e.g. to forward it to live viewers. archive, if given,
+    receives every closed bucket through write(bucket_start, samples);
+    store_chunks=False then keeps the samples out of measurement_chunks.
+    codec, if given, encodes each channel of a chunk document (see
+    waveform_codecs.py), quantizing float channels to the run's resolution.
+
+    feed() and finish() do everything inline. An async caller can split
+    them instead: take() and drain() decode and bucket the samples, which
+    is cheap and calls on_samples, and store() does the archive writes and
+    codec compression of the closed buckets, which can then run in a worker
+    thread. store() must be called in bucket order, one call at a time.
+    """
+
+    def __init__(
+        self,
+        run: dict,
+        bucket_samples: int = INGEST_BUCKET_SAMPLES,
+        on_samples: Optional[Callable[[int, np.ndarray], None]] = None,
+        archive=None,
+        store_chunks: bool = True,
+        codec=None,
+    ):
+        self.run = run
+        self.on_samples = on_samples
+        self.archive = archive
+        self.store_chunks = store_chunks
+        self.codec = codec
+        self.resolution: List[Optional[float]] = run.get("resolution") or [None] * len(run["channels"])
+        self.channel_names: List[str] = run["channels"]
+        self.dtype_code = DTYPE_NAMES[run["dtype"]]
+        self.accumulator = ChunkAccumulator(
+            len(self.channel_names), FRAME_DTYPES[self.dtype_code], bucket_samples
+        )
+        self.decoder = FrameDecoder()
+        self.frames = 0
+        self.samples = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+
+    def _check(self, frame: Frame):
+        if frame.dtype_code != self.dtype_code or frame.samples.shape[0] != len(self.channel_names):
+            raise FrameError(
+                f"Frame has {frame.samples.shape[0]} channels of dtype {frame.dtype_code}, "
+                f"run expects {len(self.channel_names)} of {self.run['dtype']}"
+            )
+
+    def _encode(self, index: int, samples: np.ndarray) -> bytes:
+        if self.codec is None:
+            return samples[index].tobytes()
+        return self.codec.encode(samples[index], self.resolution[index])
+
+    def _to_document(self, bucket_start: int, samples: np.ndarray) -> dict:
+        sample_rate = self.run["sample_rate"]
+        return {
+            "run_id": self.run["_id"],
+            "setting_id": self.run["setting_id"],
+            "bucket_start": bucket_start,
+            "t0": bucket_start / sample_rate,
+            "n_samples": samples.shape[1],
+            "sample_rate": sample_rate,
+            "dtype": self.run["dtype"],
+            "channels": {name: Binary(self._encode(index, samples)) for index, name in enumerate(self.channel_names)},
+            "codec": self.codec.name if self.codec is not None else None,
+            "created_at": datetime.utcnow(),
+        }
+
+    def _store(self, buckets: List[Tuple[int, np.ndarray]]) -> List[dict]:
+        documents = []
+        for bucket_start, samples in buckets:
+            if self.archive is not None:
+                self.archive.write(bucket_start, samples)
+            if self.store_chunks:
+                documents.append(self._to_document(bucket_start, samples))
+        return documents
+
+    def store(self, buckets: List[Tuple[int, np.ndarray]]) -> List[dict]:
+        """Archive closed buckets and encode their chunk documents; blocking"""
+        return self._store(buckets)
+
+    def add_frames(self, frames: List[Frame]) -> List[Tuple[int, np.ndarray]]:
+        """Bucket decoded frames; returns the buckets they closed"""
+        buckets = []
+        for frame in frames:
+            self._check(frame)
+            self.frames += 1
+            self.samples += frame.samples.shape[1]
+            if self.on_samples is not None:
+                self.on_samples(frame.start_sample, frame.samples)
+            buckets.extend(self.accumulator.add(frame.start_sample, frame.samples))
+        return buckets
+
+    def take(self, chunk: bytes) -> List[Tuple[int, np.ndarray]]:
+        """Decode a raw byte chunk; returns the buckets it closed, not yet stored"""
+        self.bytes += len(chunk)
+        return self.add_frames(self.decoder.feed(chunk))
+
+    def drain(self) -> List[Tuple[int, np.ndarray]]:
+        """Close the last bucket at the end of the stream; not yet stored"""
+        if self.decoder.pending_bytes:
+            raise FrameError(f"Stream ended inside a frame ({self.decoder.pending_bytes} bytes left)")
+        return self.accumulator.flush()
+
+    def feed(self, chunk: bytes) -> List[dict]:
+        """Decode a raw byte chunk; returns the chunk documents it completed"""
+        return self._store(self.take(chunk))
+
+    def finish(self) -> List[dict]:
+        return self._store(self.drain())
+
+    def stats(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "frames": self.frames,
+            "samples_per_channel": self.samples,
+            "bytes": self.bytes,
+            "elapsed_s": round(elapsed, 3),
+            "samples_per_s": round(self.samples / elapsed) if elapsed > 0 else 0,
+        }
@@ -0,0 +1,318 @@
+import os
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Environment variables
+PYRAMID_BASE_SAMPLES = int(os.getenv("PYRAMID_BASE_SAMPLES", 4))
+PYRAMID_FACTOR = int(os.getenv("PYRAMID_FACTOR", 4))
+# The coarsest level kept has at least this many buckets
+PYRAMID_MIN_POINTS = int(os.getenv("PYRAMID_MIN_POINTS", 512))
+# Raw samples read at a time while building; raised to PYRAMID_BLOCK_POINTS coarsest buckets if smaller
+PYRAMID_BLOCK_SAMPLES = int(os.getenv("PYRAMID_BLOCK_SAMPLES", 1 << 20))
+# Coarsest-level points per block, so the first and last points LTTB keeps in each block stay a small share
+PYRAMID_BLOCK_POINTS = 16
+WAVEFORM_MAX_PX = int(os.getenv("WAVEFORM_MAX_PX", 8192))
+
+# Outputs up to this many points use exact sequential LTTB, larger ones the vectorized approximation
+LTTB_SEQUENTIAL_MAX_POINTS = int(os.getenv("LTTB_SEQUENTIAL_MAX_POINTS", 4096))
+# Scoring passes of the vectorized LTTB
+LTTB_PASSES = 2
+
+
+def minmax_file(channel: int, bucket: int) -> str:
+    return f"ch{channel:02d}.minmax-{bucket}.npy"
+
+
+def lttb_files(channel: int, bucket: int) -> Tuple[str, str]:
+    return f"ch{channel:02d}.lttb-{bucket}.idx.npy", f"ch{channel:02d}.lttb-{bucket}.npy"
+
+
+def level_buckets(n_samples: int, base: int = PYRAMID_BASE_SAMPLES, factor: int = PYRAMID_FACTOR,
+                  min_points: int = PYRAMID_MIN_POINTS) -> List[int]:
+    """Bucket sizes of the levels for a run of n_samples, finest first"""
+    buckets = []
+    bucket = base
+    while -(-n_samples // bucket) >= min_points:
+        buckets.append(bucket)
+        bucket *= factor
+    return buckets
+
+
+def reduce_minmax(values: np.ndarray, factor: int) -> np.ndarray:
+    """(n, 2) min/max pairs, or a plain (n,) series, to (ceil(n / factor), 2) pairs
+
+    A short last group is padded with its own last value, which leaves its
+    min and max unchanged.
+    """
+    if values.ndim == 1:
+        values = np.stack([values, values], axis=1)
+    pad = -len(values) % factor
+    if pad:
+        values = np.concatenate([values, np.repeat(values[-1:], pad, axis=0)])
+    groups = values.reshape(-1, factor, 2)
+    return np.stack([groups[:, :, 0].min(axis=1), groups[:, :, 1].max(axis=1)], axis=1)
+
+
+def _segment_argmax(values: np.ndarray, starts: np.ndarray, bucket_of: np.ndarray) -> np.ndarray:
+    """Position of the first maximum of values within each segment beginning at starts"""
+    peaks = np.maximum.reduceat(values, starts)
+    positions = np.where(values == peaks[bucket_of], np.arange(len(values)), len(values))
+    return np.minimum.reduceat(positions, starts)
+
+
+def _lttb_edges(count: int, points: int) -> np.ndarray:
+    """Bucket boundaries over samples 1 .. count - 2 for points - 2 buckets"""
+    return 1 + (np.arange(points - 1) * (count - 2)) // (points - 2)
+
+
+def lttb_sequential(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Classic LTTB, one bucket at a time: one NumPy step per kept point"""
+    count = len(y)
+    edges = _lttb_edges(count, points)
+    picks = np.empty(points, dtype=np.int64)
+    picks[0], picks[-1] = 0, count - 1
+    for bucket in range(points - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        following = edges[bucket + 2] if bucket < points - 3 else count
+        cx, cy = x[stop:following].mean(), y[stop:following].mean()
+        ax, ay = x[picks[bucket]], y[picks[bucket]]
+        area = np.abs((ax - cx) * (y[start:stop] - ay) - (ax - x[start:stop]) * (cy - ay))
+        picks[bucket + 1] = start + area.argmax()
+    return picks
+
+
+def lttb_vectorized(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """LTTB with every bucket scored at once, in O(n) NumPy work
+
+    The previous-pick dependency is approximated: a first pass anchors on
+    the previous bucket's mean, and later passes re-score with the
+    previous pass's picks as anchors. Picks can differ from the sequential
+    algorithm's, mostly between near-equal candidates in noise.
+    """
+    count = len(y)
+    edges = _lttb_edges(count, points)
+    starts = edges[:-1] - 1
+    sizes = np.diff(edges)
+    bucket_of = np.repeat(np.arange(points - 2), sizes)
+    inner_x, inner_y = x[1:-1], y[1:-1]
+    mean_x = np.add.reduceat(inner_x, starts) / sizes
+    mean_y = np.add.reduceat(inner_y, starts) / sizes
+    # Right anchor: the next bucket's mean, or the last point for the last bucket
+    right_x = np.append(mean_x[1:], x[-1])[bucket_of]
+    right_y = np.append(mean_y[1:], y[-1])[bucket_of]
+
+    left_x = np.concatenate([x[:1], mean_x[:-1]])
+    left_y = np.concatenate([y[:1], mean_y[:-1]])
+    picks = None
+    for _ in range(LTTB_PASSES):
+        ax, ay = left_x[bucket_of], left_y[bucket_of]
+        area = np.abs((ax - right_x) * (inner_y - ay) - (ax - inner_x) * (right_y - ay))
+        picks = _segment_argmax(area, starts, bucket_of) + 1
+        left_x = np.concatenate([x[:1], x[picks[:-1]]])
+        left_y = np.concatenate([y[:1], y[picks[:-1]]])
+    return np.concatenate([[0], picks, [count - 1]])
+
+
+def lttb(x: np.ndarray, y: np.ndarray, points: int) -> np.ndarray:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps out of (x, y)
+
+    The first and last points are always kept; the rest are split into
+    points - 2 buckets, and each bucket keeps the point forming the largest
+    triangle with the point kept in the previous bucket and the mean of the
+    next one. Plot-sized outputs use the exact sequential algorithm; above
+    LTTB_SEQUENTIAL_MAX_POINTS its per-point Python step costs more than
+    the vectorized approximation.
+    """
+    count = len(y)
+    if points >= count or points < 3:
+        return np.arange(count)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if points <= LTTB_SEQUENTIAL_MAX_POINTS:
+        return lttb_sequential(x, y, points)
+    return lttb_vectorized(x, y, points)
+
+
+def pyramid_blocks(n_samples: int, block_samples: int, extents: Optional[Sequence[Sequence[int]]] = None
+                   ) -> Iterator[Tuple[int, int]]:
+    """(start, stop) of every block_samples block holding written samples, in order
+
+    extents are the run's merged [offset, count] ranges; blocks that fall
+    entirely inside a gap are skipped. Without extents every block is.
+    """
+    if extents is None:
+        extents = [[0, n_samples]]
+    last = -1
+    for offset, count in extents:
+        for block in range(max(offset // block_samples, last + 1), (offset + count - 1) // block_samples + 1):
+            yield block * block_samples, min((block + 1) * block_samples, n_samples)
+            last = block
+
+
+def build_pyramid(directory: str, channels: List[np.ndarray],
+                  extents: Optional[Sequence[Sequence[int]]] = None) -> List[int]:
+    """Write min/max and LTTB levels for every channel; returns the levels' bucket sizes
+
+    Channels are read in blocks of PYRAMID_BLOCK_SAMPLES, a multiple of
+    every level's bucket, and each block goes through all levels before
+    the next is read: each min/max level is reduced from the one below
+    it, and each LTTB level is picked from the one below it, with x
+    implicit in the block's sample offsets. Memory is bounded by the block
+    size, not the run length. Blocks entirely inside a gap in extents are
+    never read; their min/max buckets stay zero, as the gap's samples are,
+    and they have no LTTB points. LTTB keeps the first and last point of
+    every block.
+    """
+    if not channels:
+        return []
+    n_samples = len(channels[0])
+    buckets = level_buckets(n_samples)
+    if not buckets:
+        return []
+    block_samples = max(PYRAMID_BLOCK_SAMPLES, PYRAMID_BLOCK_POINTS * buckets[-1])
+    block_samples = -(-block_samples // buckets[-1]) * buckets[-1]
+    blocks = list(pyramid_blocks(n_samples, block_samples, extents))
+    # Points each LTTB level gets, known up front so its files can be written in place
+    lttb_sizes = [sum(-(-(stop - start) // bucket) for start, stop in blocks) for bucket in buckets]
+
+    for position, data in enumerate(channels):
+        minmax_levels, lttb_levels = [], []
+        for bucket, size in zip(buckets, lttb_sizes):
+            minmax_levels.append(np.lib.format.open_memmap(
+                os.path.join(directory, minmax_file(position, bucket)), mode="w+",
+                dtype=data.dtype, shape=(-(-n_samples // bucket), 2),
+            ))
+            index_file, values_file = lttb_files(position, bucket)
+            lttb_levels.append((
+                np.lib.format.open_memmap(os.path.join(directory, index_file), mode="w+", dtype="<u4", shape=(size,)),
+                np.lib.format.open_memmap(os.path.join(directory, values_file), mode="w+", dtype=data.dtype, shape=(size,)),
+            ))
+        filled = [0] * len(buckets)
+
+        for start, stop in blocks:
+            pairs = ys = np.asarray(data[start:stop])
+            xs = np.arange(stop - start)
+            previous = 1
+            for level, bucket in enumerate(buckets):
+                pairs = reduce_minmax(pairs, bucket // previous)
+                minmax_levels[level][start // bucket:start // bucket + len(pairs)] = pairs
+
+                points = -(-(stop - start) // bucket)
+                # A tail block too short for LTTB keeps its first points
+                keep = lttb(xs, ys, points) if points >= 3 else np.arange(points)
+                xs, ys = xs[keep], ys[keep]
+                offsets, values = lttb_levels[level]
+                offsets[filled[level]:filled[level] + points] = start + xs
+                values[filled[level]:filled[level] + points] = ys
+                filled[level] += points
+                previous = bucket
+
+        for level in minmax_levels:
+            level.flush()
+        for offsets, values in lttb_levels:
+            offsets.flush()
+            values.flush()
+        del minmax_levels, lttb_levels
+    return buckets
+
+
+class Pyramid:
+    """Memory-mapped pyramid levels of one archived run"""
+
+    def __init__(self, directory: str, channel_names: List[str], buckets: List[int]):
+        self.directory = directory
+        self.positions = {name: position for position, name in enumerate(channel_names)}
+        self.buckets = buckets
+        self._levels: Dict[tuple, tuple] = {}
+
+    def select(self, start: int, stop: int, px: int) -> Optional[int]:
+        """Bucket size of the coarsest level with at least px points in [start, stop), or None for raw"""
+        for bucket in reversed(self.buckets):
+            if (stop - 1) // bucket - start // bucket + 1 >= px:
+                return bucket
+        return None
+
+    def _load(self, mode: str, name: str, bucket: int) -> tuple:
+        key = (mode, name, bucket)
+        found = self._levels.get(key)
+        if found is None:
+            position = self.positions[name]
+            if mode == "minmax":
+                files = (minmax_file(position, bucket),)
+            else:
+                files = lttb_files(position, bucket)
+            found = self._levels[key] = tuple(
+                np.load(os.path.join(self.directory, file), mmap_mode="r") for file in files
+            )
+        return found
+
+    def minmax(self, name: str, bucket: int, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """First sample offset of each bucket overlapping [start, stop), and its (min, max) pairs"""
+        (pairs,) = self._load("minmax", name, bucket)
+        first, last = start // bucket, (stop - 1) // bucket + 1
+        return np.arange(first, last) * bucket, pairs[first:last]
+
+    def lttb(self, name: str, bucket: int, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Sample offsets and values of the LTTB points in [start, stop)"""
+        offsets, values = self._load("lttb", name, bucket)
+        first, last = np.searchsorted(offsets, [start, stop])
+        return offsets[first:last], values[first:last]
+
+
+def render(archived, start: int, stop: int, px: int, mode: str, names: List[str]) -> dict:
+    """At least px points per channel over [start, stop) from the coarsest level that has them
+
+    Values are in physical units. Runs archived without a pyramid, or
+    windows too short for any level, are decimated from the raw samples.
+    """
+    pyramid = archived.pyramid
+    bucket = pyramid.select(start, stop, px) if pyramid is not None else None
+    if bucket is None and (stop - start) > px * PYRAMID_BASE_SAMPLES:
+        # No stored level qualifies although the window is long: decimate the raw window
+        bucket = max(1, (stop - start) // px)
+        source = "computed"
+    else:
+        source = "pyramid" if bucket is not None else "raw"
+
+    sample_rate = archived.sample_rate
+    first_sample = archived.start_sample
+    channels = {}
+    for name in names:
+        scale = archived.scale(name) or 1.0
+        if source == "raw":
+            offsets = np.arange(start, stop)
+            values = archived.channels[name][start:stop]
+        elif mode == "minmax" and source == "pyramid":
+            offsets, pairs = pyramid.minmax(name, bucket, start, stop)
+        elif mode == "minmax":
+            window = archived.channels[name][start:stop]
+            offsets = start + np.arange(0, len(window), bucket)
+            pairs = reduce_minmax(window, bucket)
+        elif source == "pyramid":
+            offsets, values = pyramid.lttb(name, bucket, start, stop)
+        else:
+            window = archived.channels[name][start:stop]
+            keep = lttb(np.arange(len(window)), window, -(-len(window) // bucket))
+            offsets, values = start + keep, window[keep]
+
+        entry = {"t": ((first_sample + offsets) / sample_rate).tolist()}
+        if mode == "minmax" and source != "raw":
+            scaled = pairs.astype(np.float64) * scale
+            # A negative scale swaps which end of the bucket is the minimum
+            scaled.sort(axis=1)
+            entry["min"] = scaled[:, 0].tolist()
+            entry["max"] = scaled[:, 1].tolist()
+        else:
+            entry["y"] = (values.astype(np.float64) * scale).tolist()
+        channels[name] = entry
+
+    return {
+        "mode": mode if source != "raw" else "raw",
+        "source": source,
+        "samples_per_point": bucket or 1,
+        "sample_rate": sample_rate,
+        "start_sample": first_sample + start,
+        "samples": stop - start,
+        "channels": channels,
+    }
@@ -1,14 +1,16 @@
 from datetime import datetime, timedelta
 from typing import Optional, Union
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from app.config.database import get_database
+from app.database.operations import USER_AUTH_FIELDS, USER_PUBLIC_FIELDS, UserRepository
+from app.utils.hashing import HasherSaturated, password_hasher, pwd_context
+from app.utils.permissions import has_permissions, permission_bits_for_role
+from app.utils.principal_cache import principal_cache
+from app.utils.revocation import revocation_store
 import os
-
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+import uuid
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
@@ -17,6 +19,10 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-this-in-production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", 30))
+REFRESH_TOKEN_EXPIRE_MINUTES = int(os.getenv("REFRESH_TOKEN_EXPIRE_MINUTES", 12 * 60))
+
+# Revoked tokens must stop resolving from the principal cache as well
+revocation_store.add_listener(principal_cache.invalidate_jti)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
@@ -26,33 +32,99 @@ def get_password_hash(password: str) -> str:
     """Hash a password"""
     return pwd_context.hash(password)
 
+def hasher_unavailable() -> HTTPException:
+    """503 returned when the password hashing pool is saturated"""
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service is busy, please retry shortly",
+        headers={"Retry-After": "1"},
+    )
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the hashing pool instead of the event loop"""
+    try:
+        return await password_hasher.verify(plain_password, hashed_password)
+    except HasherSaturated:
+        raise hasher_unavailable()
+
+async def get_password_hash_async(password: str) -> str:
+    """Hash a password on the hashing pool instead of the event loop"""
+    try:
+        return await password_hasher.hash(password)
+    except HasherSaturated:
+        raise hasher_unavailable()
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
-    """Create a JWT access token"""
+    """Create a JWT access token
+    
+    When data carries a "role", the role's permission bitset is embedded as
+    the "perms" claim so permission checks need no database read.
+    """
     to_encode = data.copy()
+    now = datetime.utcnow()
     if expires_delta:
-        expire = datetime.utcnow() + expires_delta
+        expire = now + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(minutes=15)
+        expire = now + timedelta(minutes=15)
+    
+    if "role" in to_encode and "perms" not in to_encode:
+        to_encode["perms"] = permission_bits_for_role(to_encode["role"])
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "iat": now, "type": "access", "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-async def get_user_by_username(db, username: str):
-    """Get user from database by username"""
+def create_refresh_token(username: str, expires_delta: Optional[timedelta] = None):
+    """Create a long-lived refresh token that can only be exchanged at /refresh"""
+    now = datetime.utcnow()
+    expire = now + (expires_delta or timedelta(minutes=REFRESH_TOKEN_EXPIRE_MINUTES))
+    to_encode = {"sub": username, "exp": expire, "iat": now, "type": "refresh", "jti": uuid.uuid4().hex}
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+def decode_token(token: str, token_type: str = "access") -> dict:
+    """Decode and validate a JWT of the given type, raising 401 if invalid"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise credentials_exception
+    if payload.get("sub") is None or payload.get("type", "access") != token_type:
+        raise credentials_exception
+    if revocation_store.is_revoked(payload.get("jti")):
+        raise credentials_exception
+    return payload
+
+async def revoke_token(payload: dict):
+    """Revoke a decoded token until it expires"""
+    if payload.get("jti") is not None:
+        await revocation_store.revoke(payload["jti"], payload["exp"])
+
+async def get_user_by_username(db, username: str, projection: Optional[dict] = USER_PUBLIC_FIELDS):
+    """Get user from database by username (without the password hash by default)"""
+    try:
+        return await UserRepository.for_database(db).get_by_username(username, projection)
+    except Exception as e:
+        print(f"Error getting user: {e}")
+        return None
+
+async def load_user_by_username(db, username: str):
+    """Get user by username, coalescing concurrent lookups into one query"""
     try:
-        user = await db.users.find_one({"username": username})
-        return user
+        return await UserRepository.for_database(db).load_by_username(username)
     except Exception as e:
         print(f"Error getting user: {e}")
         return None
 
 async def authenticate_user(db, username: str, password: str):
     """Authenticate user with username and password"""
-    user = await get_user_by_username(db, username)
+    user = await get_user_by_username(db, username, USER_AUTH_FIELDS)
     if not user:
         return False
-    if not verify_password(password, user["hashed_password"]):
+    if not await verify_password_async(password, user["hashed_password"]):
         return False
     return user
 
@@ -64,13 +136,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_d
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+    # Tokens already resolved to a user skip decoding and the database entirely
+    cached_user = principal_cache.get(token)
+    if cached_user is not None:
+        return cached_user
+    
+    payload = decode_token(token)
+    username: str = payload.get("sub")
     
     # For demo admin user
     if username == "admin":
@@ -81,11 +153,41 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db=Depends(get_d
             "role": "admin"
         }
     
-    user = await get_user_by_username(db, username)
-    if user is None:
+    user = await load_user_by_username(db, username)
+    if user is None or not user.get("is_active", True):
         raise credentials_exception
     
     # Convert ObjectId to string for serialization
     user["_id"] = str(user["_id"])
     
+    principal_cache.put(token, user, token_expires_at=payload.get("exp"), jti=payload.get("jti"))
+    
     return user
+
+async def get_token_claims(token: str = Depends(oauth2_scheme)) -> dict:
+    """Validated access token claims, without any database access"""
+    return decode_token(token)
+
+def authorize_token(token: str, *permissions: int) -> dict:
+    """Validate a token passed outside the Authorization header (e.g. WebSocket query)"""
+    claims = decode_token(token)
+    required = 0
+    for permission in permissions:
+        required |= permission
+    if not has_permissions(claims.get("perms", 0), required):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return claims
+
+def require_permission(*permissions: int):
+    """Dependency factory enforcing permissions from the token's "perms" claim
+    
+    The check is a single bitmask comparison against the claims; it never
+    reads the database, so role changes take effect when the token is refreshed.
+    """
+    async def permission_checker(token: str = Depends(oauth2_scheme)) -> dict:
+        return authorize_token(token, *permissions)
+    
+    return permission_checker
@@ -0,0 +1,156 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+# Password hashing
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+# Environment variables
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", min(4, os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", 32))
+
+
+class HasherSaturated(Exception):
+    """Raised when the hashing pool has no free worker or queue slot"""
+
+
+def hash_password(password: str) -> str:
+    """Hash a password (runs inside a pool worker)"""
+    return pwd_context.hash(password)
+
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against a hash (runs inside a pool worker)"""
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class CallStats:
+    """Running timing statistics for one kind of hashing call"""
+
+    def __init__(self):
+        self.calls = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.max_run_ms = 0.0
+
+    def record(self, wait_ms: float, run_ms: float):
+        self.calls += 1
+        self.total_wait_ms += wait_ms
+        self.total_run_ms += run_ms
+        self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+        self.max_run_ms = max(self.max_run_ms, run_ms)
+
+    def to_dict(self) -> dict:
+        calls = self.calls or 1
+        return {
+            "calls": self.calls,
+            "avg_wait_ms": round(self.total_wait_ms / calls, 3),
+            "avg_run_ms": round(self.total_run_ms / calls, 3),
+            "max_wait_ms": round(self.max_wait_ms, 3),
+            "max_run_ms": round(self.max_run_ms, 3),
+        }
+
+
+def _timed(fn, submitted_at: float, *args):
+    """Run fn in the worker and report how long it queued and ran"""
+    started_at = time.perf_counter()
+    result = fn(*args)
+    return result, started_at - submitted_at, time.perf_counter() - started_at
+
+
+class PasswordHasher:
+    """Bounded worker pool that keeps bcrypt off the event loop.
+
+    At most ``workers + queue_size`` calls are admitted at once; any call
+    beyond that fails immediately with HasherSaturated instead of queueing
+    without limit, so the route can answer 503 while the pool catches up.
+    """
+
+    def __init__(
+        self,
+        workers: int = PASSWORD_HASH_WORKERS,
+        queue_size: int = PASSWORD_HASH_QUEUE_SIZE,
+        executor: str = PASSWORD_HASH_EXECUTOR,
+    ):
+        self.workers = max(1, workers)
+        self.queue_size = max(0, queue_size)
+        self.executor_kind = executor
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self.rejected = 0
+        self.stats = {"hash": CallStats(), "verify": CallStats()}
+
+    @property
+    def capacity(self) -> int:
+        return self.workers + self.queue_size
+
+    def start(self):
+        """Create the worker pool"""
+        if self._executor is not None:
+            return
+        if self.executor_kind == "process":
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers, thread_name_prefix="password-hasher"
+            )
+        logger.info(
+            f"Password hasher started ({self.executor_kind}, "
+            f"{self.workers} workers, queue {self.queue_size})"
+        )
+
+    def shutdown(self):
+        """Stop the worker pool, waiting for calls already admitted"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def _submit(self, kind: str, fn, *args):
+        if self._in_flight >= self.capacity:
+            self.rejected += 1
+            raise HasherSaturated("Password hashing pool is saturated")
+
+        self.start()
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result, wait_s, run_s = await loop.run_in_executor(
+                self._executor, _timed, fn, time.perf_counter(), *args
+            )
+        finally:
+            self._in_flight -= 1
+
+        self.stats[kind].record(wait_s * 1000, run_s * 1000)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password without blocking the event loop"""
+        return await self._submit("hash", hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        """Verify a password without blocking the event loop"""
+        return await self._submit("verify", check_password, plain_password, hashed_password)
+
+    def snapshot(self) -> dict:
+        """Current pool state and per-call timing metrics"""
+        return {
+            "executor": self.executor_kind,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "in_flight": self._in_flight,
+            "rejected": self.rejected,
+            "hash": self.stats["hash"].to_dict(),
+            "verify": self.stats["verify"].to_dict(),
+        }
+
+
+password_hasher = PasswordHasher()
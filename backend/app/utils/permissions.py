@@ -0,0 +1,68 @@
+from enum import IntFlag
+from typing import Dict
+
+
+class Permission(IntFlag):
+    """Individual capabilities, packed into a single integer JWT claim"""
+    VIEW_DASHBOARD = 1 << 0
+    VIEW_SETTINGS = 1 << 1
+    MANAGE_SETTINGS = 1 << 2
+    VIEW_RESULTS = 1 << 3
+    RUN_TESTS = 1 << 4
+    INGEST_DATA = 1 << 5
+    GENERATE_REPORTS = 1 << 6
+    MANAGE_USERS = 1 << 7
+    VIEW_METRICS = 1 << 8
+
+
+VIEWER_PERMISSIONS = (
+    Permission.VIEW_DASHBOARD
+    | Permission.VIEW_SETTINGS
+    | Permission.VIEW_RESULTS
+)
+
+OPERATOR_PERMISSIONS = (
+    VIEWER_PERMISSIONS
+    | Permission.RUN_TESTS
+    | Permission.INGEST_DATA
+)
+
+ENGINEER_PERMISSIONS = (
+    OPERATOR_PERMISSIONS
+    | Permission.MANAGE_SETTINGS
+    | Permission.GENERATE_REPORTS
+)
+
+ADMIN_PERMISSIONS = Permission(0)
+for _permission in Permission:
+    ADMIN_PERMISSIONS |= _permission
+
+# Central role -> permission table (roles from create_first_user.py; "user"
+# is the role every self-registered account gets)
+ROLE_PERMISSIONS: Dict[str, Permission] = {
+    "admin": ADMIN_PERMISSIONS,
+    "engineer": ENGINEER_PERMISSIONS,
+    "operator": OPERATOR_PERMISSIONS,
+    "viewer": VIEWER_PERMISSIONS,
+    "user": Permission.VIEW_DASHBOARD,
+}
+
+# Precomputed once at import so token issuing is a dict lookup
+ROLE_PERMISSION_BITS: Dict[str, int] = {
+    role: int(permissions) for role, permissions in ROLE_PERMISSIONS.items()
+}
+
+
+def permission_bits_for_role(role: str) -> int:
+    """Permission bitset for a role; unknown roles get no permissions"""
+    return ROLE_PERMISSION_BITS.get(role, 0)
+
+
+def has_permissions(bits: int, required: int) -> bool:
+    """True if every bit in required is set in bits"""
+    return bits & required == required
+
+
+def permission_names(bits: int) -> list:
+    """Readable names for a permission bitset"""
+    return [permission.name for permission in Permission if bits & permission]
@@ -0,0 +1,115 @@
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set
+
+# Environment variables
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", 1024))
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", 60))
+
+
+class PrincipalCache:
+    """In-process TTL/LRU cache of authenticated users keyed by token.
+
+    An entry never outlives the token it was resolved from, and the least
+    recently used entry is evicted once the cache is full. Entries are also
+    indexed by username so every token of a user can be dropped at once when
+    that user is updated or deactivated.
+    """
+
+    def __init__(self, max_size: int = PRINCIPAL_CACHE_SIZE, ttl_seconds: float = PRINCIPAL_CACHE_TTL_SECONDS):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[str, Set[str]] = {}
+        self._token_by_jti: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, token: str) -> Optional[dict]:
+        """Return a copy of the cached user for token, or None"""
+        entry = self._entries.get(token)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, user, _ = entry
+        if expires_at <= time.time():
+            self._remove(token)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return dict(user)
+
+    def put(self, token: str, user: dict, token_expires_at: Optional[float] = None, jti: Optional[str] = None):
+        """Cache user for token until the TTL or the token expiry, whichever is first"""
+        expires_at = time.time() + self.ttl_seconds
+        if token_expires_at is not None:
+            expires_at = min(expires_at, token_expires_at)
+        if self.max_size <= 0 or expires_at <= time.time():
+            return
+
+        if token in self._entries:
+            self._remove(token)
+        self._entries[token] = (expires_at, dict(user), jti)
+        self._tokens_by_user.setdefault(user["username"], set()).add(token)
+        if jti is not None:
+            self._token_by_jti[jti] = token
+
+        while len(self._entries) > self.max_size:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def invalidate_token(self, token: str):
+        """Drop a single token, e.g. on logout"""
+        if token in self._entries:
+            self._remove(token)
+            self.invalidations += 1
+
+    def invalidate_jti(self, jti: str):
+        """Drop the token with this id, e.g. when it is revoked by another worker"""
+        token = self._token_by_jti.get(jti)
+        if token is not None:
+            self.invalidate_token(token)
+
+    def invalidate_user(self, username: str):
+        """Drop every cached token of a user, e.g. after an update or deactivation"""
+        for token in list(self._tokens_by_user.get(username, ())):
+            self._remove(token)
+            self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens_by_user.clear()
+        self._token_by_jti.clear()
+
+    def _remove(self, token: str):
+        _, user, jti = self._entries.pop(token)
+        if jti is not None:
+            self._token_by_jti.pop(jti, None)
+        tokens = self._tokens_by_user.get(user["username"])
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[user["username"]]
+
+    def snapshot(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+principal_cache = PrincipalCache()
@@ -0,0 +1,135 @@
+import asyncio
+import heapq
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Environment variables
+REVOCATION_SYNC_SECONDS = float(os.getenv("REVOCATION_SYNC_SECONDS", 5))
+
+REVOKED_TOKENS_COLLECTION = "revoked_tokens"
+
+
+def _to_epoch(value: datetime) -> float:
+    """Epoch seconds for the naive UTC datetimes pymongo returns"""
+    return value.replace(tzinfo=timezone.utc).timestamp()
+
+
+class RevocationStore:
+    """In-process set of revoked token ids (jti) with automatic expiry.
+
+    Membership checks are a dict lookup and never touch MongoDB. Revocations
+    are written through to the ``revoked_tokens`` collection, whose TTL index
+    removes them once the token would have expired anyway, and a background
+    task pulls revocations made by other workers into the local set.
+    """
+
+    def __init__(self, sync_interval: float = REVOCATION_SYNC_SECONDS):
+        self.sync_interval = sync_interval
+        self._revoked: Dict[str, float] = {}
+        self._expiry_heap: List[tuple] = []
+        self._listeners: List[Callable[[str], None]] = []
+        self._collection = None
+        self._sync_task: Optional[asyncio.Task] = None
+        self._last_sync: Optional[datetime] = None
+
+    def __len__(self):
+        return len(self._revoked)
+
+    def add_listener(self, listener: Callable[[str], None]):
+        """Call listener(jti) whenever a token is revoked, locally or by another worker"""
+        self._listeners.append(listener)
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        """O(1) check whether a token id has been revoked"""
+        if jti is None:
+            return False
+        expires_at = self._revoked.get(jti)
+        return expires_at is not None and expires_at > time.time()
+
+    def _add(self, jti: str, expires_at: float):
+        if jti in self._revoked:
+            return
+        self._revoked[jti] = expires_at
+        heapq.heappush(self._expiry_heap, (expires_at, jti))
+        for listener in self._listeners:
+            listener(jti)
+
+    def prune(self):
+        """Forget revocations whose tokens have expired"""
+        now = time.time()
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            _, jti = heapq.heappop(self._expiry_heap)
+            self._revoked.pop(jti, None)
+
+    async def revoke(self, jti: str, expires_at: float):
+        """Revoke a token until its expiry (epoch seconds) and persist it"""
+        if expires_at <= time.time():
+            return
+        self._add(jti, expires_at)
+        self.prune()
+
+        if self._collection is not None:
+            try:
+                await self._collection.update_one(
+                    {"_id": jti},
+                    {"$setOnInsert": {
+                        "expires_at": datetime.utcfromtimestamp(expires_at),
+                        "revoked_at": datetime.utcnow(),
+                    }},
+                    upsert=True,
+                )
+            except Exception as e:
+                logger.error(f"Failed to persist token revocation: {e}")
+
+    async def _pull(self):
+        """Load revocations recorded since the last pull"""
+        query = {"expires_at": {"$gt": datetime.utcnow()}}
+        if self._last_sync is not None:
+            # Overlap one interval so clock skew between workers loses nothing
+            query["revoked_at"] = {"$gte": self._last_sync - timedelta(seconds=self.sync_interval)}
+        pulled_at = datetime.utcnow()
+
+        async for doc in self._collection.find(query, {"expires_at": 1}):
+            self._add(doc["_id"], _to_epoch(doc["expires_at"]))
+        self._last_sync = pulled_at
+        self.prune()
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                await self._pull()
+            except Exception as e:
+                logger.error(f"Token revocation sync failed: {e}")
+
+    async def start(self, database):
+        """Load live revocations from MongoDB and start the background sync"""
+        # The TTL index on expires_at comes from app.database.indexes
+        self._collection = database[REVOKED_TOKENS_COLLECTION]
+        await self._pull()
+        self._sync_task = asyncio.create_task(self._sync_loop())
+        logger.info(f"Token revocation store loaded {len(self)} revoked tokens")
+
+    async def stop(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+
+    def snapshot(self) -> dict:
+        return {
+            "revoked": len(self._revoked),
+            "sync_interval_seconds": self.sync_interval,
+            "last_sync": self._last_sync.isoformat() if self._last_sync else None,
+        }
+
+
+revocation_store = RevocationStore()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+R/XL bank solver benchmark for SIH MCB Testing System
+Compares the sorted impedance index with a vectorized brute-force scan of
+every (R, XL) tap pair, over random short-circuit targets, and checks that
+both find the same best error.
+
+Usage: python benchmarks/bench_bank_solver.py [steps_per_bank] [queries]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.bank_solver import BankIndex
+
+def brute_force(index: BankIndex, current_a: float, power_factor: float, voltage_v: float) -> float:
+    """Best score over every combination, for reference"""
+    total_r = index.r_values[:, None] + index.x_winding[None, :] + index.source_r
+    total_x = index.x_values[None, :] + index.source_x
+    total_z = np.hypot(total_r, total_x)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score = np.abs(voltage_v / total_z / current_a - 1) + np.abs(total_r / total_z - power_factor)
+    return float(np.nanmin(score))
+
+def main():
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 11
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = np.random.default_rng(7)
+
+    print("⚡ R/XL Bank Solver Benchmark")
+    print("=" * 50)
+    started = time.perf_counter()
+    index = BankIndex(
+        [0.001 * 2 ** k for k in range(steps)],
+        [(0.001 * 2 ** k, 0.00005 * 2 ** k) for k in range(steps)],
+    )
+    print(f"Index:       {steps}+{steps} steps, {index.combinations:,} combinations, built in {(time.perf_counter() - started) * 1000:.1f} ms")
+
+    targets = [
+        (rng.uniform(100, 10000), rng.uniform(0.3, 1.0), rng.choice([230.0, 252.0, 400.0]))
+        for _ in range(queries)
+    ]
+
+    started = time.perf_counter()
+    indexed = [index.solve(*target, top_k=1)[0] for target in targets]
+    index_s = time.perf_counter() - started
+
+    brute_queries = max(1, queries // 10)
+    started = time.perf_counter()
+    reference = [brute_force(index, *target) for target in targets[:brute_queries]]
+    brute_s = (time.perf_counter() - started) * queries / brute_queries
+
+    misses = sum(
+        1 for solution, best in zip(indexed, reference)
+        if solution["current_error_pct"] / 100 + solution["power_factor_error"] > best + 1e-3
+    )
+    print(f"Index query: {index_s / queries * 1e6:8.1f} µs")
+    print(f"Brute force: {brute_s / queries * 1e6:8.1f} µs ({brute_s / index_s:.0f}x slower)")
+    print(f"Worse than brute force by >0.1%: {misses}/{brute_queries}")
+
+if __name__ == "__main__":
+    main()
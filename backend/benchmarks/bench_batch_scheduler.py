@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Batch scheduler benchmark for SIH MCB Testing System
+Plans random test queues over the settings in mongodb_test_settings.json
+and compares makespan, bank switches and throughput of the grouped plan
+with FIFO dispatch.
+
+Usage: python benchmarks/bench_batch_scheduler.py [rigs] [queue_length] [trials]
+"""
+
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.batch_scheduler import plan_batch
+
+SETTINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mongodb_test_settings.json")
+
+def main():
+    rigs = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    queue_length = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    trials = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+
+    with open(SETTINGS_FILE, "r", encoding="utf-8") as file:
+        settings = json.load(file)
+    rng = random.Random(42)
+
+    print("🗓️  Batch Scheduler Benchmark")
+    print("=" * 50)
+    print(f"{rigs} rigs, {queue_length} queued tests of 1-5 samples, {trials} random queues")
+
+    gains, fifo_switches, grouped_switches, fifo_rate, grouped_rate, plan_ms = [], [], [], [], [], []
+    for _ in range(trials):
+        tests = [(rng.choice(settings), rng.randint(1, 5)) for _ in range(queue_length)]
+        started = time.perf_counter()
+        plan = plan_batch(tests, [(f"RIG_{index}", (None, None)) for index in range(rigs)])
+        plan_ms.append((time.perf_counter() - started) * 1000)
+        gains.append(plan["fifo_makespan_s"] / plan["makespan_s"])
+        fifo_switches.append(plan["fifo_switches"])
+        grouped_switches.append(plan["switches"])
+        fifo_rate.append(plan["samples"] * 3600 / plan["fifo_makespan_s"])
+        grouped_rate.append(plan["samples_per_hour"])
+
+    mean = lambda values: sum(values) / len(values)
+    print(f"{'':10} {'samples/h':>10} {'switches':>10}")
+    print(f"{'FIFO':10} {mean(fifo_rate):10.2f} {mean(fifo_switches):10.1f}")
+    print(f"{'Grouped':10} {mean(grouped_rate):10.2f} {mean(grouped_switches):10.1f}")
+    print(f"Throughput gain: {mean(gains):.2f}x (min {min(gains):.2f}x, max {max(gains):.2f}x)")
+    print(f"Planning time:   {mean(plan_ms):.1f} ms per queue (both strategies)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Password hashing benchmark for SIH MCB Testing System
+Simulates a burst of concurrent logins and measures how long the event loop
+stalls, first with bcrypt called inline and then through the hashing pool.
+
+Usage: python benchmarks/bench_password_hashing.py [concurrent_logins]
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.hashing import HasherSaturated, PasswordHasher, check_password, hash_password
+
+TICK_INTERVAL_S = 0.005
+
+async def measure_loop_lag(stop: asyncio.Event, samples: list):
+    """Record how late a 5 ms ticker wakes up while logins are running"""
+    while not stop.is_set():
+        expected = time.perf_counter() + TICK_INTERVAL_S
+        await asyncio.sleep(TICK_INTERVAL_S)
+        samples.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+async def run_scenario(name: str, verify, logins: int, hashed: str):
+    """Fire `logins` concurrent verifications and report loop lag"""
+    stop = asyncio.Event()
+    samples = []
+    ticker = asyncio.create_task(measure_loop_lag(stop, samples))
+    await asyncio.sleep(TICK_INTERVAL_S * 2)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(verify("operator123", hashed) for _ in range(logins)),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - started
+
+    stop.set()
+    await ticker
+
+    rejected = sum(1 for r in results if isinstance(r, HasherSaturated))
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1] if samples else 0.0
+    print(f"\n📊 {name}")
+    print(f"  • Logins:          {logins} ({rejected} rejected with 503)")
+    print(f"  • Wall time:       {elapsed * 1000:.1f} ms")
+    print(f"  • Loop lag max:    {max(samples, default=0.0):.1f} ms")
+    print(f"  • Loop lag p99:    {p99:.1f} ms")
+
+async def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+
+    print("🔐 Password Hashing Benchmark")
+    print("=" * 50)
+    hashed = hash_password("operator123")
+
+    async def inline_verify(plain, hashed_password):
+        return check_password(plain, hashed_password)
+
+    await run_scenario("Inline bcrypt (current behaviour)", inline_verify, logins, hashed)
+
+    hasher = PasswordHasher(queue_size=logins)
+    hasher.start()
+    try:
+        await run_scenario("Thread pool hasher", hasher.verify, logins, hashed)
+        print(f"  • Pool metrics:    {hasher.snapshot()['verify']}")
+    finally:
+        hasher.shutdown()
+
+    bounded = PasswordHasher(queue_size=4)
+    bounded.start()
+    try:
+        await run_scenario("Thread pool hasher, queue of 4", bounded.verify, logins, hashed)
+    finally:
+        bounded.shutdown()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Rig simulator benchmark for SIH MCB Testing System
+Measures how fast the simulator synthesizes and encodes frames, and how
+fast IngestSession decodes them, to show one simulator process can keep
+the ingest path busy.
+
+Usage: python benchmarks/bench_rig_simulator.py [shots] [sample_rate]
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.rig_simulator import RigSimulator
+from app.services.waveform_ingest import IngestSession
+
+SETTINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mongodb_test_settings.json")
+
+def main():
+    shots = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    sample_rate = float(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+
+    with open(SETTINGS_FILE, "r", encoding="utf-8") as file:
+        setting = next(s for s in json.load(file) if s["_id"] == "TC_ICS_6000A_16A_C")
+
+    print("⚡ Rig Simulator Benchmark")
+    print("=" * 50)
+    for dtype in ("float32", "int16"):
+        simulator = RigSimulator(setting, sample_rate=sample_rate, dtype=dtype, seed=1)
+
+        started = time.perf_counter()
+        synthesized = simulator.shot("O")
+        synth_s = time.perf_counter() - started
+
+        started = time.perf_counter()
+        frames = list(simulator.frames(shots))
+        stream_s = time.perf_counter() - started
+        total = sum(len(frame) for frame in frames)
+
+        run = {"_id": "bench", "setting_id": setting["_id"], **simulator.run_options()}
+        session = IngestSession(run)
+        started = time.perf_counter()
+        for frame in frames:
+            session.feed(frame)
+        session.finish()
+        ingest_s = time.perf_counter() - started
+        samples = session.samples
+
+        print(f"\n📊 {dtype}, {len(simulator.channels)} channels at {sample_rate:,.0f} S/s, {shots} shots")
+        print(f"  • Synthesize one shot:  {synth_s * 1000:.1f} ms ({synthesized.shape[1]:,} samples/channel)")
+        print(f"  • Simulator stream:     {total / stream_s / 1e6:.0f} MB/s ({samples / stream_s / 1e6:.1f} M samples/s/channel)")
+        print(f"  • IngestSession decode: {total / ingest_s / 1e6:.0f} MB/s ({samples / ingest_s / 1e6:.1f} M samples/s/channel)")
+
+if __name__ == "__main__":
+    main()
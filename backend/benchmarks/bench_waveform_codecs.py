@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Waveform codec benchmark for SIH MCB Testing System
+Encodes simulated short-circuit captures chunk by chunk with each codec
+and reports compression ratio, encode and decode throughput (MB/s of raw
+samples) and the largest reconstruction error, to choose WAVEFORM_CODEC
+for a deployment.
+
+Usage: python benchmarks/bench_waveform_codecs.py [shots] [codec ...]
+"""
+
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.rig_simulator import RigSimulator
+from app.services.waveform_codecs import ChunkCodec, decode
+from app.services.waveform_ingest import INGEST_BUCKET_SAMPLES
+
+SETTINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mongodb_test_settings.json")
+SAMPLE_RATE = 1_000_000
+DEFAULT_CODECS = [
+    "raw", "zlib:1", "zlib:6",
+    "delta+none", "delta+zlib:1", "delta+zlib:6", "delta+lzma:0", "delta+lzma:6",
+    "dd+zlib:1", "dd+zlib:6", "dd+lzma:0", "dd+lzma:6",
+]
+
+def captures(setting: dict, shots: int):
+    """float32 and int16 captures of the same shots, plus the ADC resolution of each channel"""
+    counts = RigSimulator(setting, sample_rate=SAMPLE_RATE, dtype="int16", seed=1)
+    samples = np.concatenate([counts.shot(operation) for operation in (counts.operations * shots)[:shots]], axis=1)
+    resolution = counts.scale
+    physical = (samples * np.asarray(resolution)[:, None]).astype(np.float32)
+    return {"int16": (samples, [None] * len(resolution)), "float32": (physical, resolution)}
+
+def chunks(samples: np.ndarray):
+    for start in range(0, samples.shape[1], INGEST_BUCKET_SAMPLES):
+        yield samples[:, start:start + INGEST_BUCKET_SAMPLES]
+
+def measure(codec: ChunkCodec, samples: np.ndarray, resolution: list) -> dict:
+    started = time.perf_counter()
+    encoded = [
+        [codec.encode(np.ascontiguousarray(chunk[index]), resolution[index]) for index in range(chunk.shape[0])]
+        for chunk in chunks(samples)
+    ]
+    encode_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    decoded = [[decode(data) for data in chunk] for chunk in encoded]
+    decode_s = time.perf_counter() - started
+
+    restored = np.concatenate([np.stack(chunk) for chunk in decoded], axis=1)
+    error = float(np.abs(restored.astype(np.float64) - samples.astype(np.float64)).max())
+    stored = sum(len(data) for chunk in encoded for data in chunk)
+    return {
+        "ratio": samples.nbytes / stored,
+        "encode_mb_s": samples.nbytes / encode_s / 1e6,
+        "decode_mb_s": samples.nbytes / decode_s / 1e6,
+        "max_error": error,
+    }
+
+def main():
+    shots = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    specs = sys.argv[2:] or DEFAULT_CODECS
+
+    with open(SETTINGS_FILE, "r", encoding="utf-8") as file:
+        setting = next(s for s in json.load(file) if s["_id"] == "TC_ICS_6000A_16A_C")
+
+    print("🗜️  Waveform Codec Benchmark")
+    print("=" * 50)
+    for dtype, (samples, resolution) in captures(setting, shots).items():
+        print(f"\n📊 {dtype}: {samples.shape[0]} channels × {samples.shape[1]:,} samples, "
+              f"{samples.nbytes / 1e6:.1f} MB in chunks of {INGEST_BUCKET_SAMPLES:,}")
+        if dtype == "float32":
+            print("  (quantized to the ADC resolution of each channel; max error is at most half a step)")
+        print(f"  {'codec':<14}{'ratio':>8}{'encode MB/s':>14}{'decode MB/s':>14}{'max error':>12}")
+        for spec in specs:
+            result = measure(ChunkCodec.parse(spec), samples, resolution)
+            print(
+                f"  {spec:<14}{result['ratio']:>7.2f}×{result['encode_mb_s']:>14.0f}"
+                f"{result['decode_mb_s']:>14.0f}{result['max_error']:>12.3g}"
+            )
+
+if __name__ == "__main__":
+    main()
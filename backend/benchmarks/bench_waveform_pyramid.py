@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Waveform pyramid benchmark for SIH MCB Testing System
+Archives simulated million-sample shots, then compares what
+/api/runs/{id}/waveform returns from the pyramid against serving the raw
+series: response build time and JSON payload size, over full and zoomed
+windows. Also times exact sequential LTTB against the vectorized
+approximation used for large outputs, and how far each strays from the
+raw series. Finally it archives a sparse run of two frames far apart to check
+that finishing it costs time and memory by samples written, not by span.
+
+Usage: python benchmarks/bench_waveform_pyramid.py [shots] [px]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.rig_simulator import RigSimulator
+from app.services.waveform_archive import ArchivedRun, ArchiveWriter
+from app.services.waveform_ingest import IngestSession
+from app.services.waveform_pyramid import lttb_sequential, lttb_vectorized, render
+
+SETTINGS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "mongodb_test_settings.json")
+SAMPLE_RATE = 1_000_000
+REPEATS = 5
+# Distance between the two frames of the sparse run
+SPARSE_SPAN = 32_000_000
+
+def line_error(y: np.ndarray, keep: np.ndarray) -> float:
+    """Mean distance between the raw series and the line through the kept points"""
+    x = np.arange(len(y))
+    return float(np.abs(np.interp(x, keep, y[keep]) - y).mean())
+
+def timed_render(archived: ArchivedRun, start: int, stop: int, px: int, mode: str):
+    elapsed = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        data = render(archived, start, stop, px, mode, list(archived.channels))
+        body = json.dumps(data).encode()
+        elapsed.append(time.perf_counter() - started)
+    return min(elapsed), len(body), data
+
+def timed_raw(archived: ArchivedRun, start: int, stop: int):
+    started = time.perf_counter()
+    data = {
+        name: (np.asarray(archived.channels[name][start:stop], dtype=np.float64) * (archived.scale(name) or 1.0)).tolist()
+        for name in archived.channels
+    }
+    body = json.dumps(data).encode()
+    return time.perf_counter() - started, len(body)
+
+def main():
+    shots = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    px = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+
+    with open(SETTINGS_FILE, "r", encoding="utf-8") as file:
+        setting = next(s for s in json.load(file) if s["_id"] == "TC_ICS_6000A_16A_C")
+
+    print("📈 Waveform Pyramid Benchmark")
+    print("=" * 50)
+    directory = tempfile.mkdtemp(prefix="pyramid-bench-")
+    try:
+        simulator = RigSimulator(setting, sample_rate=SAMPLE_RATE, dtype="int16", seed=1)
+        run = {"_id": "bench", "setting_id": setting["_id"], **simulator.run_options()}
+        writer = ArchiveWriter(run, directory)
+        session = IngestSession(run, archive=writer, store_chunks=False)
+        for frame in simulator.frames(shots):
+            session.feed(frame)
+        session.finish()
+        started = time.perf_counter()
+        index = writer.finish()
+        finish_s = time.perf_counter() - started
+        archived = ArchivedRun(writer.path)
+        count = archived.n_samples
+
+        print(f"\n📊 {len(run['channels'])} channels × {count:,} int16 samples ({shots} shots at {SAMPLE_RATE:,} S/s)")
+        print(f"  • Finish archive + pyramid: {finish_s * 1000:.0f} ms, levels {index['pyramid']}")
+
+        windows = [("full run", 0, count), ("10% zoom", count // 3, count // 3 + count // 10),
+                   ("1% zoom", count // 3, count // 3 + count // 100), ("0.1% zoom", count // 3, count // 3 + count // 1000)]
+        print(f"\n📊 Responses at px={px} (JSON, all channels)")
+        for label, start, stop in windows:
+            raw_s, raw_bytes = timed_raw(archived, start, stop)
+            print(f"  • {label:<10} raw series: {raw_s * 1000:8.1f} ms {raw_bytes / 1e6:8.2f} MB")
+            for mode in ("lttb", "minmax"):
+                render_s, size, data = timed_render(archived, start, stop, px, mode)
+                print(
+                    f"    {mode:<6} {data['source']:<8} level {data['samples_per_point']:>5}: "
+                    f"{render_s * 1000:6.2f} ms {size / 1e3:8.1f} kB "
+                    f"({raw_s / render_s:,.1f}× faster, {raw_bytes / size:,.1f}× smaller)"
+                )
+
+        current = np.asarray(archived.channels["current"], dtype=np.float64)
+        x = np.arange(len(current), dtype=np.float64)
+        for points in (2000, 20000, count // 16):
+            print(f"\n📊 LTTB of 'current' to {points:,} points")
+            picks = {}
+            for label, fn in (("Sequential", lttb_sequential), ("Vectorized", lttb_vectorized)):
+                started = time.perf_counter()
+                picks[label] = fn(x, current, points)
+                elapsed = time.perf_counter() - started
+                print(f"  • {label}: {elapsed * 1000:7.1f} ms, mean line error {line_error(current, picks[label]):.3f} counts")
+            print(f"  • Same pick in {np.mean(picks['Sequential'] == picks['Vectorized']) * 100:.0f}% of buckets")
+
+        sparse = {"_id": "sparse", "setting_id": setting["_id"], **simulator.run_options()}
+        writer = ArchiveWriter(sparse, directory)
+        frame = np.asarray(archived.channels["current"][:65536])
+        for start in (0, SPARSE_SPAN):
+            writer.write(start, np.stack([frame] * len(sparse["channels"])))
+        tracemalloc.start()
+        started = time.perf_counter()
+        index = writer.finish()
+        finish_s = time.perf_counter() - started
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print(f"\n📊 Sparse run: 2 frames of 65,536 samples, {SPARSE_SPAN:,} samples apart")
+        print(f"  • Finish archive + pyramid: {finish_s * 1000:.0f} ms, peak {peak / 1e6:.1f} MB allocated, levels {index['pyramid']}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+MongoDB Index Checker for SIH MCB Testing System
+Applies the index registry and verifies with explain() that no known query
+shape falls back to a collection scan. Exits non-zero if any query does.
+
+Usage: python check_indexes.py [--no-apply]
+"""
+
+import asyncio
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.database import close_mongo_connection, connect_to_mongo
+from app.database.indexes import ensure_indexes, explain_query_shapes
+
+async def check_indexes() -> bool:
+    """Ensure indexes, then explain every registered query shape"""
+    try:
+        database = await connect_to_mongo()
+
+        print("🔍 SIH MCB Testing System - Index Check")
+        print("=" * 60)
+
+        if "--no-apply" not in sys.argv:
+            created = await ensure_indexes(database)
+            for collection_name, names in created.items():
+                print(f"📁 {collection_name}: {', '.join(names)}")
+
+        print("\n📋 Query plans:")
+        report = await explain_query_shapes(database)
+        for entry in report:
+            marker = "❌" if entry["collscan"] else "✅"
+            print(f"  {marker} {entry['collection']} {entry['filter']} -> {' > '.join(entry['stages'])}")
+
+        collscans = [entry for entry in report if entry["collscan"]]
+        if collscans:
+            print(f"\n❌ {len(collscans)} query shape(s) use COLLSCAN")
+            return False
+
+        print("\n✅ All query shapes use an index")
+        return True
+
+    except Exception as e:
+        print(f"❌ Index check failed: {e}")
+        return False
+    finally:
+        await close_mongo_connection()
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(check_indexes()) else 1)
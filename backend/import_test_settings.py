@@ -1,57 +1,90 @@
 #!/usr/bin/env python3
 """
 Import MCB test settings into MongoDB
-This script imports the test configuration data into the MongoDB settings collection.
+Streams the JSON array from disk, compares content hashes with the settings
+already stored and writes only the added, changed and removed settings in one
+ordered bulk_write. The collection is never cleared, so the catalog stays
+available while an import runs.
+
+Usage: python import_test_settings.py [--file PATH] [--dry-run] [--keep-missing] [--verify]
 """
 
-import json
-import sys
+import argparse
 import asyncio
-from datetime import datetime
-from pymongo import MongoClient
-from app.config.database import get_database
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.config.database import close_mongo_connection, connect_to_mongo
+from app.database.operations import SETTING_CATALOG_FIELDS
+from app.database.settings_import import apply_import, plan_import
+from app.services.settings_catalog import bump_catalog_version
+
+DEFAULT_SETTINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mongodb_test_settings.json")
+DIFF_PREVIEW_LIMIT = 20
 
-async def import_test_settings():
-    """Import test settings from JSON file into MongoDB"""
+def print_ids(label: str, ids: list):
+    print(f"{label} ({len(ids)}):")
+    for setting_id in ids[:DIFF_PREVIEW_LIMIT]:
+        print(f"  • {setting_id}")
+    if len(ids) > DIFF_PREVIEW_LIMIT:
+        print(f"  … and {len(ids) - DIFF_PREVIEW_LIMIT} more")
+
+async def print_changed_fields(settings_collection, plan):
+    """Field-level diff for the first changed settings"""
+    preview = plan.changed[:DIFF_PREVIEW_LIMIT]
+    if not preview:
+        return
+    stored = {
+        doc["_id"]: doc
+        async for doc in settings_collection.find({"_id": {"$in": preview}}, SETTING_CATALOG_FIELDS)
+    }
+    print("\n🔍 Changed fields:")
+    for setting_id in preview:
+        old, new = stored.get(setting_id, {}), plan.changed_documents.get(setting_id, {})
+        for field in sorted(set(old) | set(new)):
+            if field.startswith("_"):
+                continue
+            if old.get(field) != new.get(field):
+                print(f"  • {setting_id}.{field}: {old.get(field)!r} -> {new.get(field)!r}")
+
+async def import_test_settings(path: str, dry_run: bool = False, delete_missing: bool = True) -> bool:
+    """Diff the settings file against MongoDB and apply only the changes"""
     try:
-        # Get database connection
-        db = await get_database()
-        settings_collection = db.settings
-        
-        # Read the JSON file
-        with open('mongodb_test_settings.json', 'r') as file:
-            test_settings = json.load(file)
-        
-        print(f"Loading {len(test_settings)} test settings into MongoDB...")
-        
-        # Clear existing settings (optional - remove this if you want to append)
-        existing_count = await settings_collection.count_documents({})
-        if existing_count > 0:
-            print(f"Found {existing_count} existing settings. Clearing collection...")
-            await settings_collection.delete_many({})
-        
-        # Insert the test settings
-        result = await settings_collection.insert_many(test_settings)
-        
-        print(f"✅ Successfully imported {len(result.inserted_ids)} test settings!")
-        
-        # Verify the import
-        total_settings = await settings_collection.count_documents({})
-        print(f"📊 Total test settings in database: {total_settings}")
-        
-        # Display summary of imported settings
-        print("\n📋 Imported Test Settings Summary:")
+        database = await connect_to_mongo()
+        settings_collection = database.settings
+
+        with open(path, "r") as file:
+            plan = await plan_import(settings_collection, file, delete_missing=delete_missing)
+
+        print(f"\n📋 Import plan for {os.path.basename(path)}:")
         print("-" * 50)
-        for setting in test_settings:
-            print(f"• {setting['_id']}: {setting['mcbModel']} - {setting['testDesignation']}")
-        
+        print_ids("➕ Added", plan.added)
+        print_ids("✏️  Changed", plan.changed)
+        print_ids("➖ Deleted", plan.deleted)
+        print(f"✔️  Unchanged: {plan.unchanged}")
+
+        if dry_run:
+            await print_changed_fields(settings_collection, plan)
+            print("\n💡 Dry run - nothing was written")
+        elif plan.has_changes:
+            await apply_import(settings_collection, plan)
+            version = await bump_catalog_version(database)
+            print(f"\n✅ Applied {len(plan.operations)} operations in one bulk write (catalog version {version})")
+        else:
+            print("\n✅ Settings already up to date - nothing to write")
+
+        print("\n📊 Throughput:")
+        for key, value in plan.summary().items():
+            print(f"  • {key}: {value}")
         return True
-        
+
     except FileNotFoundError:
-        print("❌ Error: mongodb_test_settings.json file not found!")
+        print(f"❌ Error: {path} file not found!")
         print("Make sure you're running this script from the backend directory.")
         return False
-        
+
     except Exception as e:
         print(f"❌ Error importing test settings: {str(e)}")
         return False
@@ -59,15 +92,13 @@ async def import_test_settings():
 async def verify_settings():
     """Verify the imported settings by displaying them"""
     try:
-        db = await get_database()
-        settings_collection = db.settings
-        
+        database = await connect_to_mongo()
+        settings_collection = database.settings
+
         print("\n🔍 Verifying Test Settings in Database:")
         print("=" * 60)
-        
-        settings = await settings_collection.find({}).to_list(None)
-        
-        for setting in settings:
+
+        async for setting in settings_collection.find({}, SETTING_CATALOG_FIELDS):
             print(f"\nTest ID: {setting['_id']}")
             print(f"MCB Model: {setting['mcbModel']}")
             print(f"Test: {setting['testDesignation']}")
@@ -79,28 +110,37 @@ async def verify_settings():
             print(f"XL Config: {setting['xl_config_code']}")
             print(f"Mimic - R Blinks: {setting['mimic']['r_blinks']}, XL Blinks: {setting['mimic']['xl_blinks']}")
             print("-" * 40)
-        
+
         return True
-        
+
     except Exception as e:
         print(f"❌ Error verifying settings: {str(e)}")
         return False
 
-async def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Import MCB test settings into MongoDB")
+    parser.add_argument("--file", default=DEFAULT_SETTINGS_FILE, help="JSON array of settings documents")
+    parser.add_argument("--dry-run", action="store_true", help="Report the diff without writing")
+    parser.add_argument("--keep-missing", action="store_true", help="Do not delete settings absent from the file")
+    parser.add_argument("--verify", action="store_true", help="Display all settings after importing")
+    return parser.parse_args(argv)
+
+async def main(argv=None):
     """Main async function"""
+    args = parse_args(argv)
     print("🔧 MCB Test Settings Import Tool")
     print("=" * 40)
-    
-    # Import the settings
-    if await import_test_settings():
-        
-        # Ask if user wants to verify
-        if len(sys.argv) > 1 and sys.argv[1] == "--verify":
-            await verify_settings()
-        else:
-            print("\n💡 Use --verify flag to display all imported settings")
-            print("Example: python import_test_settings.py --verify")
-    
+
+    try:
+        if await import_test_settings(args.file, args.dry_run, not args.keep_missing):
+            if args.verify:
+                await verify_settings()
+            else:
+                print("\n💡 Use --verify flag to display all imported settings")
+                print("Example: python import_test_settings.py --verify")
+    finally:
+        await close_mongo_connection()
+
     print("\n✨ Import process completed!")
 
 if __name__ == "__main__":
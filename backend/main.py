@@ -1,7 +1,17 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, dashboard
+from app.routes import admin, auth, banks, dashboard, events, live, reports, runs, scheduler, sequencer, settings
 from app.config.database import connect_to_mongo, close_mongo_connection
+from app.database.group_commit import group_commit
+from app.database.spool import write_spool
+from app.database.indexes import ensure_indexes
+from app.services.compute import compute_executor
+from app.services.dashboard_stats import dashboard_stats
+from app.services.duty_sequencer import duty_sequencer
+from app.services.reports import report_jobs
+from app.services.settings_catalog import settings_catalog
+from app.utils.hashing import password_hasher
+from app.utils.revocation import revocation_store
 
 app = FastAPI(
     title="SIH MCB Testing API",
@@ -29,14 +39,41 @@ app.add_middleware(
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["authentication"])
 app.include_router(dashboard.router, prefix="/api/dashboard", tags=["dashboard"])
+app.include_router(settings.router, prefix="/api/settings", tags=["settings"])
+app.include_router(runs.router, prefix="/api/runs", tags=["runs"])
+app.include_router(sequencer.router, prefix="/api/sequencer", tags=["sequencer"])
+app.include_router(reports.router, prefix="/api/reports", tags=["reports"])
+app.include_router(scheduler.router, prefix="/api/scheduler", tags=["scheduler"])
+app.include_router(banks.router, prefix="/api/banks", tags=["banks"])
+app.include_router(events.router, prefix="/api/events", tags=["events"])
+app.include_router(live.router, prefix="/ws", tags=["live"])
+app.include_router(admin.router, prefix="/api/admin", tags=["admin"])
 
 @app.on_event("startup")
 async def startup_event():
-    await connect_to_mongo()
+    database = await connect_to_mongo()
+    await ensure_indexes(database)
+    await revocation_store.start(database)
+    await settings_catalog.start(database)
+    await dashboard_stats.start(database)
+    await write_spool.start(database)
+    group_commit.start(database, spool=write_spool)
+    password_hasher.start()
+    compute_executor.start()
 
 @app.on_event("shutdown")
 async def shutdown_event():
+    await duty_sequencer.stop()
+    await report_jobs.stop()
+    await revocation_store.stop()
+    await settings_catalog.stop()
+    await dashboard_stats.stop()
+    # Everything queued for a group commit is written before the client closes
+    await group_commit.stop()
+    await write_spool.stop()
     await close_mongo_connection()
+    password_hasher.shutdown()
+    compute_executor.shutdown()
 
 @app.get("/")
 async def root():
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+MCB test rig simulator
+Synthesizes short-circuit waveforms for a test setting and streams them to
+the backend's ingest endpoint with the same binary frame protocol as the
+acquisition hardware. Use it for load tests and CI without a physical rig.
+
+Usage: python simulate_rig.py [--setting ID] [--sample-rate HZ] [--dtype float32|int16]
+                              [--shots N] [--runs N] [--url URL] [--output FILE]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.duty_sequencer import DutyError
+from app.services.rig_simulator import SIMULATED_CHANNELS, RigSimulator
+
+DEFAULT_SETTINGS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "mongodb_test_settings.json")
+
+def load_setting(path: str, setting_id: str) -> dict:
+    with open(path, "r", encoding="utf-8") as file:
+        for setting in json.load(file):
+            if setting["_id"] == setting_id:
+                return setting
+    raise SystemExit(f"❌ Setting '{setting_id}' not found in {path}")
+
+def request_json(url: str, payload: dict, token: str = None) -> dict:
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), headers=headers, method="POST")
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+def stream_run(base_url: str, token: str, simulator: RigSimulator, shot: int) -> dict:
+    """Open a run for one operation of the duty and stream its frames as one chunked HTTP body"""
+    operation = simulator.operations[shot % len(simulator.operations)]
+    run = request_json(f"{base_url}/api/runs", simulator.run_options(operation), token)["data"]
+    request = urllib.request.Request(
+        f"{base_url}/api/runs/{run['_id']}/ingest",
+        data=simulator.operation_frames(shot),
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/octet-stream"},
+        method="POST",
+    )
+    with urllib.request.urlopen(request) as response:
+        return {"run_id": run["_id"], "operation": operation, **json.loads(response.read())["data"]}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Stream simulated MCB short-circuit waveforms")
+    parser.add_argument("--file", default=DEFAULT_SETTINGS_FILE, help="JSON array of settings documents")
+    parser.add_argument("--setting", default="TC_ICS_6000A_16A_C", help="Setting _id to simulate")
+    parser.add_argument("--sample-rate", type=float, default=1_000_000, help="Samples per second per channel")
+    parser.add_argument("--channels", default=",".join(SIMULATED_CHANNELS), help="Comma-separated channel names")
+    parser.add_argument("--dtype", choices=["float32", "int16"], default="float32")
+    parser.add_argument("--frame-samples", type=int, default=16384, help="Samples per channel in each frame")
+    parser.add_argument("--shots", type=int, default=None, help="Operations to stream, one run each (default: the setting's duty)")
+    parser.add_argument("--runs", type=int, default=1, help="Times to repeat the operations")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--url", default="http://localhost:8000", help="Backend base URL")
+    parser.add_argument("--username", default=os.getenv("SIM_USERNAME", "admin"))
+    parser.add_argument("--password", default=os.getenv("SIM_PASSWORD", "admin"))
+    parser.add_argument("--output", help="Write all operations to this file as one continuous frame stream instead of posting them")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    setting = load_setting(args.file, args.setting)
+    try:
+        simulator = RigSimulator(
+            setting,
+            sample_rate=args.sample_rate,
+            channels=[name.strip() for name in args.channels.split(",") if name.strip()],
+            dtype=args.dtype,
+            frame_samples=args.frame_samples,
+            seed=args.seed,
+        )
+        operations = simulator.operations
+    except DutyError as e:
+        raise SystemExit(f"❌ Cannot simulate {args.setting}: {e}")
+
+    print("⚡ MCB Rig Simulator")
+    print("=" * 50)
+    print(f"Setting:   {setting['_id']} ({setting['prospectiveCurrent_A']} A, cos φ {setting['powerFactor_cos_phi']}, {setting['testVoltage_V']} V)")
+    print(f"Duty:      {setting['operatingDuty']} → {' '.join(operations)}")
+    print(f"Channels:  {', '.join(simulator.channels)} as {args.dtype} at {args.sample_rate:,.0f} S/s")
+
+    if args.output:
+        started = time.perf_counter()
+        written = 0
+        with open(args.output, "wb") as file:
+            for frame in simulator.frames(args.shots):
+                written += file.write(frame)
+        elapsed = time.perf_counter() - started
+        print(f"💾 Wrote {written / 1e6:.1f} MB to {args.output} in {elapsed:.2f}s ({written / elapsed / 1e6:.0f} MB/s)")
+        return
+
+    token = request_json(f"{args.url}/api/auth/login", {"username": args.username, "password": args.password})["token"]
+    shots = len(operations) if args.shots is None else args.shots
+    for _ in range(args.runs):
+        for shot in range(shots):
+            started = time.perf_counter()
+            result = stream_run(args.url, token, simulator, shot)
+            elapsed = time.perf_counter() - started
+            print(f"✅ Run {result['run_id']} ({result['operation']}): {result['samples_per_channel']:,} samples/channel, "
+                  f"{result['bytes'] / 1e6:.1f} MB in {elapsed:.2f}s ({result['samples_per_s']:,} samples/s server-side)")
+
+if __name__ == "__main__":
+    main()